@@ -0,0 +1,100 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from benchmark_utils import (
+  DiscardingDocumentService,
+  FakeEmbeddingsService,
+  TimedEmbeddingsService,
+  git_revision,
+  peak_rss_mb,
+  write_report,
+  write_synthetic_corpus,
+)
+from ecommerce_agent.application.services.extract_service.loader import LoaderService
+from ecommerce_agent.application.services.extract_service.splitter import SplitterService
+from ecommerce_agent.application.services.ingest_service.pipeline import IngestionPipeline
+from ecommerce_agent.config import settings
+
+parser = argparse.ArgumentParser(description='Benchmark the document ingestion pipeline')
+parser.add_argument('--directory', type=str, help='Directory to ingest documents from', default=settings.DATA_FAQS_DIR)
+parser.add_argument('--synthetic-mb', type=float, help='Ingest a synthetic corpus of this many MB instead of --directory', default=None)
+parser.add_argument('--offline', action='store_true', help='Use a fake embedder and a local database stand-in')
+parser.add_argument('--embed-latency-ms', type=float, help='Simulated embedding latency per chunk in offline mode', default=0.0)
+parser.add_argument('--write-latency-ms', type=float, help='Simulated database latency per batch in offline mode', default=0.0)
+parser.add_argument('--pdf-loader-mode', type=str, choices=['thread', 'process'], default=settings.PDF_LOADER_MODE)
+parser.add_argument('--split-workers', type=int, default=settings.INGEST_SPLIT_WORKERS)
+parser.add_argument('--embed-workers', type=int, default=settings.INGEST_EMBED_WORKERS)
+parser.add_argument('--write-workers', type=int, default=settings.INGEST_WRITE_WORKERS)
+parser.add_argument('--embed-batch-size', type=int, default=settings.INGEST_EMBED_BATCH_SIZE)
+parser.add_argument('--output', type=str, help='Path of the JSON report. Printed to stdout if omitted', default=None)
+args = parser.parse_args()
+
+class IngestionBenchmark:
+  def __init__(self):
+    if args.offline:
+      embeddings_service = FakeEmbeddingsService(settings.EMBEDDING_DIMENSION, args.embed_latency_ms / 1000)
+      self.document_service = DiscardingDocumentService(latency_per_batch=args.write_latency_ms / 1000)
+    else:
+      from ecommerce_agent.application.services.document_service import DocumentService
+      from ecommerce_agent.application.services.rag.embeddings import EmbeddingsService
+      embeddings_service = EmbeddingsService()
+      self.document_service = DocumentService()
+      self.document_service._create_extensions()
+      self.document_service._create_table()
+      self.document_service._create_index()
+    self.embeddings_service = TimedEmbeddingsService(embeddings_service)
+    self.pipeline = IngestionPipeline(
+      loader_service=LoaderService(pdf_loader_mode=args.pdf_loader_mode),
+      splitter_service=SplitterService(),
+      embeddings_service=self.embeddings_service,
+      document_service=self.document_service,
+      split_workers=args.split_workers,
+      embed_workers=args.embed_workers,
+      write_workers=args.write_workers,
+      embed_batch_size=args.embed_batch_size
+    )
+
+  def run(self, directory: Path) -> dict:
+    corpus_bytes = sum(path.stat().st_size for path in self.pipeline.loader_service.iter_document_paths(directory))
+    start = time.perf_counter()
+    stats = self.pipeline.run(directory)
+    wall_seconds = time.perf_counter() - start
+    stages = stats["stages"]
+    return {
+      "revision": git_revision(),
+      "config": {
+        "directory": str(directory),
+        "synthetic_mb": args.synthetic_mb,
+        "offline": args.offline,
+        "pdf_loader_mode": args.pdf_loader_mode,
+        "split_workers": args.split_workers,
+        "embed_workers": args.embed_workers,
+        "write_workers": args.write_workers,
+        "embed_batch_size": args.embed_batch_size,
+        "queue_size": self.pipeline.queue_size,
+      },
+      "corpus_mb": corpus_bytes / (1024 * 1024),
+      "wall_seconds": wall_seconds,
+      "stages": {
+        name: {**stage, "items_per_busy_second": stage["items"] / stage["busy_seconds"] if stage["busy_seconds"] else 0.0}
+        for name, stage in stages.items()
+      },
+      "throughput": {
+        "docs_per_second": stages["load"]["items"] / wall_seconds,
+        "chunks_per_second": stages["split"]["items"] / wall_seconds,
+        "rows_per_second": stages["write"]["items"] / wall_seconds,
+        "mb_per_second": corpus_bytes / (1024 * 1024) / wall_seconds,
+      },
+      "embedding": self.embeddings_service.stats(),
+      "peak_rss_mb": peak_rss_mb(),
+    }
+
+benchmark = IngestionBenchmark()
+if args.synthetic_mb:
+  with tempfile.TemporaryDirectory(prefix="ingest_bench_") as tmp_directory:
+    write_synthetic_corpus(Path(tmp_directory), args.synthetic_mb)
+    report = benchmark.run(Path(tmp_directory))
+else:
+  report = benchmark.run(Path(args.directory))
+write_report(report, args.output)
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import time
+from benchmark_utils import git_revision, percentiles, write_report
+from ecommerce_agent.application.services.conversation_service.workflow.chains import get_llm
+from ecommerce_agent.application.services.conversation_service.workflow.hedged_llm import HedgedChatModel, llm_latency_tracker
+from ecommerce_agent.config import settings
+
+parser = argparse.ArgumentParser(
+  description='Compare LLM tail latency with and without hedging. Point GROQ_BASE_URL at scripts/stub_llm_server.py to run it offline'
+)
+parser.add_argument('--requests', type=int, help='Requests per mode', default=200)
+parser.add_argument('--concurrency', type=int, help='Requests in flight at once', default=8)
+parser.add_argument('--stream', action='store_true', help='Measure time to first token of streamed answers instead of full answers')
+parser.add_argument('--output', type=str, help='Path of the JSON report. Printed to stdout if omitted', default=None)
+args = parser.parse_args()
+
+MESSAGES = [("human", "¿Cuánto se demora un envío a Medellín?")]
+
+async def measure(llm) -> dict:
+  semaphore = asyncio.Semaphore(args.concurrency)
+  latencies, errors = [], 0
+
+  async def request():
+    nonlocal errors
+    async with semaphore:
+      start = time.perf_counter()
+      try:
+        if args.stream:
+          async for _ in llm.astream(MESSAGES):
+            break
+        else:
+          await llm.ainvoke(MESSAGES)
+        latencies.append((time.perf_counter() - start) * 1000)
+      except Exception:
+        errors += 1
+
+  start = time.perf_counter()
+  await asyncio.gather(*(request() for _ in range(args.requests)))
+  return {"latency_ms": percentiles(latencies), "errors": errors, "wall_seconds": time.perf_counter() - start}
+
+async def main():
+  primary = get_llm()
+  secondary = get_llm(model_name=settings.GROQ_LLM_MODEL_SECONDARY or settings.GROQ_LLM_MODEL)
+  plain = await measure(primary)
+  hedged = await measure(HedgedChatModel(primary=primary, secondary=secondary, request_timeout=settings.LLM_REQUEST_TIMEOUT))
+  write_report({
+    "revision": git_revision(),
+    "config": {
+      "base_url": settings.GROQ_BASE_URL,
+      "primary": primary.model_name,
+      "secondary": secondary.model_name,
+      "requests": args.requests,
+      "concurrency": args.concurrency,
+      "stream": args.stream,
+      "hedge_percentile": settings.LLM_HEDGE_PERCENTILE,
+      "hedge_min_delay": settings.LLM_HEDGE_MIN_DELAY,
+    },
+    "plain": plain,
+    "hedged": hedged,
+    "tracker": llm_latency_tracker.metrics(),
+  }, args.output)
+
+asyncio.run(main())
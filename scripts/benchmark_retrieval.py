@@ -0,0 +1,203 @@
+import argparse
+import io
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import numpy as np
+from benchmark_utils import SyntheticRetrievalCorpus, git_revision, percentiles, write_report
+from ecommerce_agent.application.services.document_service import DocumentService
+from ecommerce_agent.application.services.products_service import ProductsService
+from ecommerce_agent.config import settings
+from ecommerce_agent.infrastructure.database.postgresql.postgres_client import db_client, db_transaction
+
+parser = argparse.ArgumentParser(
+  description='Benchmark vector, text and hybrid retrieval latency and QPS on synthetic tables of growing size. '
+  'Run it against a dedicated benchmark database (set POSTGRES_DB): it fills the documents and products tables'
+)
+parser.add_argument('--scales', type=str, help='Comma-separated table sizes, measured in increasing order', default='10000,100000,1000000')
+parser.add_argument('--targets', type=str, help='Comma-separated tables to benchmark: documents, products', default='documents,products')
+parser.add_argument('--modes', type=str, help='Comma-separated retrieval modes: vector, text, hybrid', default='vector,text,hybrid')
+parser.add_argument('--top-k', type=str, help='Comma-separated top_k values', default='5,20')
+parser.add_argument('--queries', type=int, help='Measured queries per table size, mode and top_k', default=200)
+parser.add_argument('--warmup-queries', type=int, help='Unmeasured queries run first for each mode and top_k', default=10)
+parser.add_argument('--concurrency', type=int, help='Queries in flight at once. Keep it within POSTGRES_POOL_MAX_SIZE', default=1)
+parser.add_argument('--load-batch-size', type=int, help='Rows per COPY batch when loading', default=5000)
+parser.add_argument('--topics', type=int, help='Topics (embedding clusters) in the synthetic corpus', default=64)
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--reset', action='store_true', help='Empty the tables first')
+parser.add_argument('--reuse', action='store_true', help='Keep rows left by a previous run with the same seed and grow from there')
+parser.add_argument('--verbose', action='store_true', help='Log loading and measurement progress')
+parser.add_argument('--output', type=str, help='Path of the JSON report. Printed to stdout if omitted', default=None)
+args = parser.parse_args()
+
+TARGETS = {
+  "documents": {
+    "service": DocumentService,
+    "columns": "(content, embedding, window_content, source)",
+    "bm25_index": "documents_search_idx",
+  },
+  "products": {
+    "service": ProductsService,
+    "columns": "(code, name, description, embedding, price, image_url, stock_level, is_active)",
+    "bm25_index": "products_search_idx",
+  },
+}
+
+# One format operation per vector is far faster than formatting each float on its own
+VECTOR_FORMAT = "[" + ",".join(["%.6f"] * settings.EMBEDDING_DIMENSION) + "]"
+
+def copy_field(value: Any) -> str:
+  """
+  Formats a value as a field of PostgreSQL's COPY text format.
+  """
+  if value is None:
+    return "\\N"
+  if isinstance(value, np.ndarray):
+    return VECTOR_FORMAT % tuple(value)
+  return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def table_count(table: str) -> int:
+  return db_client.execute_query(f"SELECT COUNT(*) AS count FROM {table}", fetch_one=True)["count"]
+
+def table_stats(table: str) -> dict[str, Any]:
+  """
+  Returns the total size of the table and the indexes defined on it.
+  """
+  size = db_client.execute_query("SELECT pg_total_relation_size(%s) AS bytes", (table,), fetch_one=True)["bytes"]
+  indexes = db_client.execute_query("SELECT indexdef FROM pg_indexes WHERE tablename = %s", (table,), fetch_all=True) or []
+  return {"total_size_mb": size / (1024 * 1024), "indexes": [index["indexdef"] for index in indexes]}
+
+def grow_table(target: str, corpus: SyntheticRetrievalCorpus, current: int, scale: int) -> dict[str, float]:
+  """
+  Appends synthetic rows current..scale to the target table with COPY, rebuilding its BM25 index afterwards
+  (building it once is much faster than updating it row by row).
+
+  Returns:
+    dict[str, float]: The rows loaded and the load and index build times.
+  """
+  config = TARGETS[target]
+  rows = corpus.documents if target == "documents" else corpus.products
+  with db_transaction() as connection:
+    connection.cursor().execute(f"DROP INDEX IF EXISTS {config['bm25_index']}")
+  start = time.perf_counter()
+  for batch_start in range(current, scale, args.load_batch_size):
+    batch_size = min(args.load_batch_size, scale - batch_start)
+    buffer = io.StringIO()
+    for row in rows(batch_start, batch_size):
+      buffer.write("\t".join(copy_field(value) for value in row) + "\n")
+    buffer.seek(0)
+    with db_transaction() as connection:
+      connection.cursor().copy_expert(f"COPY {target} {config['columns']} FROM STDIN", buffer)
+    logging.info(f"Loaded {batch_start + batch_size}/{scale} rows into {target}.")
+  load_seconds = time.perf_counter() - start
+  start = time.perf_counter()
+  config["service"]()._create_index()
+  with db_transaction() as connection:
+    connection.cursor().execute(f"ANALYZE {target}")
+  return {"rows_loaded": scale - current, "load_seconds": load_seconds, "index_seconds": time.perf_counter() - start}
+
+def retrieval_modes(target: str, service: Any) -> dict[str, Callable[[str, list[float], int], list[Any]]]:
+  if target == "documents":
+    return {
+      "vector": lambda text, embedding, top_k: service.retrieve_similar_documents(embedding, top_k),
+      "text": lambda text, embedding, top_k: service.retrieve_text_search_documents(text, top_k),
+      "hybrid": lambda text, embedding, top_k: service.retrieve_hybrid_documents(embedding, text, top_k),
+    }
+  return {
+    "vector": lambda text, embedding, top_k: service.retrieve_similar_products(embedding, top_k),
+    "text": lambda text, embedding, top_k: service.retrieve_text_search_products(text, top_k),
+    "hybrid": lambda text, embedding, top_k: service.retrieve_hybrid_products(embedding, text, top_k),
+  }
+
+def measure(retrieve: Callable[[str, list[float], int], list[Any]], queries: list[tuple[str, list[float]]], top_k: int) -> dict[str, Any]:
+  """
+  Runs the queries with args.concurrency in flight and returns their latency percentiles and the throughput.
+  """
+  for text, embedding in queries[:args.warmup_queries]:
+    retrieve(text, embedding, top_k)
+  latencies, result_counts, errors = [], [], []
+
+  def run(query: tuple[str, list[float]]) -> None:
+    start = time.perf_counter()
+    try:
+      results = retrieve(query[0], query[1], top_k)
+    except Exception as e:
+      errors.append(repr(e))
+      return
+    latencies.append((time.perf_counter() - start) * 1000)
+    result_counts.append(len(results))
+
+  measured = queries[args.warmup_queries:]
+  start = time.perf_counter()
+  with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+    list(executor.map(run, measured))
+  wall_seconds = time.perf_counter() - start
+  return {
+    "latency_ms": percentiles(latencies),
+    "qps": len(latencies) / wall_seconds if wall_seconds else 0.0,
+    "errors": len(errors),
+    "first_error": errors[0] if errors else None,
+    "mean_results": float(np.mean(result_counts)) if result_counts else 0.0,
+  }
+
+def main():
+  scales = sorted(int(scale) for scale in args.scales.split(","))
+  targets = args.targets.split(",")
+  modes = args.modes.split(",")
+  top_ks = [int(top_k) for top_k in args.top_k.split(",")]
+  corpus = SyntheticRetrievalCorpus(settings.EMBEDDING_DIMENSION, seed=args.seed, n_topics=args.topics)
+  queries = corpus.queries(args.queries + args.warmup_queries)
+
+  loads, measurements = [], []
+  for target in targets:
+    service = TARGETS[target]["service"]()
+    service._create_extensions()
+    service._create_table()
+    if args.reset:
+      with db_transaction() as connection:
+        connection.cursor().execute(f"TRUNCATE {target} RESTART IDENTITY")
+    current = table_count(target)
+    if current and not args.reuse:
+      raise SystemExit(
+        f"The {target} table already holds {current} rows. Use a dedicated benchmark database (POSTGRES_DB) with --reset, "
+        "or --reuse to grow rows left by a previous run."
+      )
+    modes_by_name = retrieval_modes(target, service)
+    for scale in scales:
+      if scale < current:
+        logging.warning(f"Skipping scale {scale}: the {target} table already holds {current} rows.")
+        continue
+      load = {"target": target, "scale": scale, **grow_table(target, corpus, current, scale), **table_stats(target)}
+      loads.append(load)
+      current = scale
+      logging.info(f"{target} at {scale} rows: loaded in {load['load_seconds']:.1f} s, BM25 index built in {load['index_seconds']:.1f} s.")
+      for mode in modes:
+        for top_k in top_ks:
+          result = measure(modes_by_name[mode], queries, top_k)
+          measurements.append({"target": target, "scale": scale, "mode": mode, "top_k": top_k, **result})
+          logging.info(f"{target} scale={scale} mode={mode} top_k={top_k}: {result['latency_ms']} ms, {result['qps']:.1f} QPS.")
+
+  write_report({
+    "revision": git_revision(),
+    "config": {
+      "scales": scales,
+      "targets": targets,
+      "modes": modes,
+      "top_k": top_ks,
+      "queries": args.queries,
+      "warmup_queries": args.warmup_queries,
+      "concurrency": args.concurrency,
+      "topics": args.topics,
+      "seed": args.seed,
+      "embedding_dimension": settings.EMBEDDING_DIMENSION,
+      "database": f"{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}",
+    },
+    "loads": loads,
+    "measurements": measurements,
+  }, args.output)
+  db_client.close_connection()
+
+if args.verbose:
+  logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+main()
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+import numpy as np
+from ecommerce_agent.domain.document import Document
+
+SPANISH_WORDS = [
+  "envío", "pedido", "camisa", "talla", "devolución", "garantía", "pago", "tarjeta", "tienda", "producto",
+  "precio", "descuento", "cambio", "dirección", "ciudad", "Medellín", "Bogotá", "Cali", "días", "hábiles",
+  "puedes", "compra", "cliente", "seguimiento", "guía", "transportadora", "gratis", "costo", "algodón", "color",
+  "negro", "blanco", "disponible", "inventario", "factura", "reembolso", "solicitud", "correo", "número", "atención",
+  "el", "la", "los", "las", "de", "del", "en", "con", "para", "por", "tu", "su", "que", "si", "no", "es", "un", "una",
+]
+
+def git_revision() -> Optional[str]:
+  """
+  Returns the current git commit hash, or None outside a git checkout.
+  """
+  try:
+    return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def peak_rss_mb() -> dict[str, float]:
+  """
+  Returns the peak resident set size of this process and of its waited-for children, in MB.
+  """
+  # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+  scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+  return {
+    "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+    "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+  }
+
+def percentiles(values: list[float], points: tuple[int, ...] = (50, 95, 99)) -> dict[str, float]:
+  """
+  Computes percentiles of a list of values.
+
+  Returns:
+    dict[str, float]: The percentiles keyed as "p50", "p95"..., empty when there are no values.
+  """
+  if not values:
+    return {}
+  return {f"p{point}": float(np.percentile(values, point)) for point in points}
+
+def write_report(report: dict[str, Any], output: Optional[str]) -> None:
+  """
+  Writes a JSON report to a file, or to stdout when no output path is given.
+  """
+  content = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+  if output:
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(content, encoding="utf-8")
+  else:
+    print(content)
+
+def generate_spanish_text(rng: random.Random, n_chars: int) -> str:
+  """
+  Generates Spanish-ish FAQ text of roughly n_chars characters, with questions, sentences and paragraphs.
+  """
+  parts = []
+  length = 0
+  while length < n_chars:
+    words = [rng.choice(SPANISH_WORDS) for _ in range(rng.randint(6, 18))]
+    sentence = " ".join(words).capitalize()
+    sentence = f"¿{sentence}?" if rng.random() < 0.2 else f"{sentence}."
+    separator = "\n\n" if rng.random() < 0.15 else ("\n" if rng.random() < 0.3 else " ")
+    parts.append(sentence + separator)
+    length += len(sentence) + len(separator)
+  return "".join(parts)
+
+def write_synthetic_corpus(directory: Path, size_mb: float, seed: int = 42, file_size_mb: float = 1.0) -> list[Path]:
+  """
+  Writes a deterministic synthetic corpus of .txt files totalling about size_mb megabytes.
+
+  Returns:
+    list[Path]: The paths of the generated files.
+  """
+  rng = random.Random(seed)
+  directory.mkdir(parents=True, exist_ok=True)
+  remaining = int(size_mb * 1024 * 1024)
+  paths = []
+  while remaining > 0:
+    n_chars = min(remaining, int(file_size_mb * 1024 * 1024))
+    path = directory / f"synthetic_{len(paths):05d}.txt"
+    text = generate_spanish_text(rng, n_chars)
+    path.write_text(text, encoding="utf-8")
+    remaining -= len(text.encode("utf-8"))
+    paths.append(path)
+  return paths
+
+class FakeEmbeddingsService:
+  """
+  Deterministic stand-in for EmbeddingsService: each text maps to a unit vector seeded by its hash,
+  so benchmarks run offline and identical texts always get identical embeddings.
+  """
+  def __init__(self, dimension: int, latency_per_item: float = 0.0):
+    self.dimension = dimension
+    self.latency_per_item = latency_per_item
+
+  def embed_text(self, text: str) -> list[float]:
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(self.dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+  def embed_documents(self, documents: list[str]) -> list[list[float]]:
+    if self.latency_per_item:
+      time.sleep(self.latency_per_item * len(documents))
+    return [self.embed_text(document) for document in documents]
+
+  def embed_query(self, query: str) -> list[float]:
+    return self.embed_text(query)
+
+  def embed_queries(self, queries: list[str]) -> list[list[float]]:
+    return self.embed_documents(queries)
+
+class TimedEmbeddingsService:
+  """
+  Wraps an embeddings service and records the size and duration of every batch.
+  """
+  def __init__(self, embeddings_service: Any):
+    self.embeddings_service = embeddings_service
+    self.batch_sizes: list[int] = []
+    self.batch_seconds: list[float] = []
+    self._lock = threading.Lock()
+
+  def embed_documents(self, documents: list[str]) -> list[list[float]]:
+    start = time.perf_counter()
+    embeddings = self.embeddings_service.embed_documents(documents)
+    with self._lock:
+      self.batch_sizes.append(len(documents))
+      self.batch_seconds.append(time.perf_counter() - start)
+    return embeddings
+
+  def stats(self) -> dict[str, Any]:
+    return {
+      "batches": len(self.batch_sizes),
+      "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+      "batch_seconds": percentiles(self.batch_seconds),
+      "items_per_second": sum(self.batch_sizes) / sum(self.batch_seconds) if sum(self.batch_seconds) else 0.0,
+    }
+
+class DiscardingDocumentService:
+  """
+  Local stand-in for DocumentService: assigns sequential ids and drops the rows,
+  optionally sleeping per batch and per row to mimic database latency.
+  """
+  def __init__(self, latency_per_batch: float = 0.0, latency_per_row: float = 0.0):
+    self.latency_per_batch = latency_per_batch
+    self.latency_per_row = latency_per_row
+    self._next_id = 1
+    self._lock = threading.Lock()
+
+  def create_documents(self, documents: list[Document]) -> list[Document]:
+    documents = [document for document in documents if document.content is not None]
+    if self.latency_per_batch or self.latency_per_row:
+      time.sleep(self.latency_per_batch + self.latency_per_row * len(documents))
+    with self._lock:
+      for document in documents:
+        document.id = self._next_id
+        self._next_id += 1
+    return documents
+
+  def delete_documents(self, document_ids: list[int]) -> None:
+    pass
+
+TOPIC_WORDS = [word for word in SPANISH_WORDS if len(word) > 3]
+PRODUCT_NOUNS = ["Camisa", "Camiseta", "Pantalón", "Chaqueta", "Vestido", "Zapatos", "Gorra", "Bolso", "Medias", "Buzo"]
+
+class SyntheticRetrievalCorpus:
+  """
+  Deterministic synthetic FAQ chunks, products and queries for retrieval benchmarks.
+
+  Rows are grouped into topics: each topic has a centroid embedding and a few topic words, and every row gets
+  an embedding scattered around its topic's centroid and text that mentions its topic words. Vector and text
+  search therefore find related rows, as with real data. Rows are generated in fixed blocks seeded by the block
+  index, so row i is the same whatever range is requested, and a table can be grown from one scale to the next.
+  """
+  def __init__(self, dimension: int, seed: int = 42, n_topics: int = 64, spread: float = 1.0, block_size: int = 1000):
+    self.dimension = dimension
+    self.seed = seed
+    self.n_topics = n_topics
+    self.spread = spread
+    self.block_size = block_size
+    rng = np.random.default_rng([seed, 0])
+    centroids = rng.standard_normal((n_topics, dimension))
+    self.centroids = centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+    text_rng = random.Random(seed)
+    self.topic_words = [text_rng.sample(TOPIC_WORDS, 3) for _ in range(n_topics)]
+
+  def _embeddings_around(self, rng: np.random.Generator, topics: np.ndarray) -> np.ndarray:
+    noise = rng.standard_normal((len(topics), self.dimension)) * self.spread / np.sqrt(self.dimension)
+    embeddings = self.centroids[topics] + noise
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+  def _blocks(self, start: int, count: int):
+    """
+    Yields (row index, topic, embedding, text rng) for rows start..start+count, generated block by block.
+    """
+    end = start + count
+    for block in range(start // self.block_size, (end - 1) // self.block_size + 1 if count else 0):
+      rng = np.random.default_rng([self.seed, 1, block])
+      topics = rng.integers(self.n_topics, size=self.block_size)
+      embeddings = self._embeddings_around(rng, topics)
+      text_rng = random.Random(f"{self.seed}-{block}")
+      for offset in range(self.block_size):
+        index = block * self.block_size + offset
+        # Texts are always drawn so the rng state of a row does not depend on the requested range
+        text_seed = text_rng.getrandbits(64)
+        if start <= index < end:
+          yield index, int(topics[offset]), embeddings[offset], random.Random(text_seed)
+
+  def _topic_text(self, rng: random.Random, topic: int, n_chars: int) -> str:
+    words = self.topic_words[topic]
+    return f"{' '.join(words).capitalize()}: {generate_spanish_text(rng, n_chars)} {' '.join(rng.sample(words, 2))}."
+
+  def documents(self, start: int, count: int):
+    """
+    Yields FAQ chunks as (content, embedding, window_content, source) tuples.
+    """
+    for index, topic, embedding, rng in self._blocks(start, count):
+      content = self._topic_text(rng, topic, rng.randint(200, 600))
+      yield content, embedding, content, f"synthetic/faq_{index // 100:06d}.txt"
+
+  def products(self, start: int, count: int):
+    """
+    Yields products as (code, name, description, embedding, price, image_url, stock_level, is_active) tuples.
+    """
+    for index, topic, embedding, rng in self._blocks(start, count):
+      name = f"{rng.choice(PRODUCT_NOUNS)} {self.topic_words[topic][0]} {index}"
+      description = self._topic_text(rng, topic, rng.randint(80, 300))
+      yield f"SKU-{index:07d}", name, description, embedding, round(rng.uniform(10, 500), 2), None, rng.randint(0, 200), True
+
+  def queries(self, count: int) -> list[tuple[str, list[float]]]:
+    """
+    Returns count (query text, query embedding) pairs, each about a random topic.
+    """
+    rng = np.random.default_rng([self.seed, 2])
+    text_rng = random.Random(f"{self.seed}-queries")
+    topics = rng.integers(self.n_topics, size=count)
+    embeddings = self._embeddings_around(rng, topics)
+    return [
+      (" ".join(text_rng.sample(self.topic_words[topic], 2) + [text_rng.choice(TOPIC_WORDS)]), embedding.tolist())
+      for topic, embedding in zip(topics, embeddings)
+    ]
@@ -1,34 +1,30 @@
 import argparse
-from ecommerce_agent.domain.document import Document
 from ecommerce_agent.application.services.document_service import DocumentService
-from ecommerce_agent.application.services.extract_service.extract import ExtractService
-from ecommerce_agent.application.services.rag.embeddings import EmbeddingsService
+from ecommerce_agent.application.services.ingestion_manifest_service import IngestionManifestService
+from ecommerce_agent.application.services.ingest_service.pipeline import IngestionPipeline
 from ecommerce_agent.config import settings
 
 parser = argparse.ArgumentParser(description='Ingest documents into the database')
 parser.add_argument('--directory', type=str, help='Directory to ingest documents from', default=settings.DATA_FAQS_DIR)
+parser.add_argument('--full', action='store_true', help='Re-ingest every file, ignoring the ingestion manifest')
 args = parser.parse_args()
 
 class IngestDocumentsTable:
   def __init__(self):
     self.document_service = DocumentService()
-    self.extract_service = ExtractService()
-    self.embeddings_service = EmbeddingsService()
-    
-  def add_embedding(self, document: Document):
-    embedding = self.embeddings_service.embed_text(document.content)
-    document.embedding = embedding
-    return document
+    self.manifest_service = IngestionManifestService()
+    self.ingestion_pipeline = IngestionPipeline(
+      document_service=self.document_service,
+      manifest_service=self.manifest_service
+    )
 
-  def ingest_documents_table(self, directory: str):
-    documents = self.extract_service.extract_documents(directory)
-    for document in documents:
-      document = self.add_embedding(document)
-      self.document_service.create_document(document)
+  def ingest_documents_table(self, directory: str, force: bool = False):
+    return self.ingestion_pipeline.run_incremental(directory, force=force)
 
 ingest_documents_table = IngestDocumentsTable()
 ingest_documents_table.document_service._create_extensions()
 ingest_documents_table.document_service._create_table()
 ingest_documents_table.document_service._create_index()
+ingest_documents_table.manifest_service._create_table()
 
-ingest_documents_table.ingest_documents_table(args.directory)
\ No newline at end of file
+ingest_documents_table.ingest_documents_table(args.directory, force=args.full)
@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Optional
+import httpx
+from benchmark_utils import git_revision, percentiles, write_report
+from ecommerce_agent.config import settings
+
+parser = argparse.ArgumentParser(
+  description='Load-test the chat API or the Telegram webhook at increasing concurrency, '
+  'optionally starting the API and scripts/stub_llm_server.py so no Groq or Telegram call leaves the machine'
+)
+parser.add_argument('--target', type=str, choices=['chat', 'chat_stream', 'telegram'], default='chat')
+parser.add_argument('--concurrency', type=str, help='Comma-separated concurrency levels, each measured in turn', default='1,4,16')
+parser.add_argument('--requests', type=int, help='Requests per concurrency level', default=200)
+parser.add_argument('--messages', type=str, help='File with one user message per line. Defaults to a built-in mix of FAQ and product questions', default=None)
+parser.add_argument('--api-url', type=str, default='http://127.0.0.1:8000')
+parser.add_argument('--start-api', action='store_true', help='Start one API worker pointed at the stub server, and stop it at the end')
+parser.add_argument('--stub-url', type=str, default='http://127.0.0.1:8090')
+parser.add_argument('--start-stub', action='store_true', help='Start scripts/stub_llm_server.py, and stop it at the end')
+parser.add_argument('--stub-args', type=str, help='Extra arguments for the stub server, e.g. "--latency-ms 500 --tool-call-rate 0.7"', default='')
+parser.add_argument('--request-timeout', type=float, help='Seconds before a request counts as failed', default=120.0)
+parser.add_argument('--ready-timeout', type=float, help='Seconds to wait for the API to report ready', default=300.0)
+parser.add_argument('--drain-timeout', type=float, help='Seconds to wait for the Telegram answers after the last update is sent', default=120.0)
+parser.add_argument('--output', type=str, help='Path of the JSON report. Printed to stdout if omitted', default=None)
+
+DEFAULT_MESSAGES = [
+  "¿Cuánto se demora un envío a Medellín?",
+  "¿Cómo hago una devolución?",
+  "¿Qué métodos de pago aceptan?",
+  "¿Tienen camisas de algodón negras?",
+  "Busco zapatos talla 40",
+  "¿El envío es gratis?",
+  "Hola, ¿cómo estás?",
+  "¿Qué chaquetas tienen disponibles?",
+]
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# Update and chat ids start from the launch time, so updates of a previous run are not taken for redeliveries
+ID_BASE = int(time.time() * 1000)
+
+def start_process(command: list[str], env: Optional[dict[str, str]] = None) -> subprocess.Popen:
+  return subprocess.Popen(command, env={**os.environ, **(env or {})})
+
+async def wait_until(url: str, process: Optional[subprocess.Popen], timeout: float) -> None:
+  """
+  Polls url until it answers 200, failing if the process exits or the timeout passes.
+  """
+  deadline = time.monotonic() + timeout
+  async with httpx.AsyncClient(timeout=5.0) as client:
+    while time.monotonic() < deadline:
+      if process is not None and process.poll() is not None:
+        raise SystemExit(f"Process {process.args} exited with code {process.returncode} before {url} was ready.")
+      try:
+        if (await client.get(url)).status_code == 200:
+          return
+      except httpx.HTTPError:
+        pass
+      await asyncio.sleep(0.5)
+  raise SystemExit(f"{url} was not ready after {timeout} s.")
+
+async def send_chat(client: httpx.AsyncClient, index: int, message: str) -> dict[str, Any]:
+  start = time.perf_counter()
+  response = await client.post(f"{args.api_url}/chat", json={"message": message, "user_id": f"load-test-{index}"})
+  return {"status": response.status_code, "latency": time.perf_counter() - start}
+
+async def send_chat_stream(client: httpx.AsyncClient, index: int, message: str) -> dict[str, Any]:
+  start = time.perf_counter()
+  first_token, status, event = None, None, None
+  async with client.stream("POST", f"{args.api_url}/chat/stream", json={"message": message, "user_id": f"load-test-{index}"}) as response:
+    status = response.status_code
+    async for line in response.aiter_lines():
+      if line.startswith("event: "):
+        event = line[len("event: "):]
+        if event == "token" and first_token is None:
+          first_token = time.perf_counter() - start
+  # A stream that ends with an error event failed even though it answered 200
+  if status == 200 and event != "end":
+    status = f"stream_{event}"
+  return {"status": status, "latency": time.perf_counter() - start, "first_token": first_token}
+
+async def send_telegram_update(client: httpx.AsyncClient, index: int, message: str) -> dict[str, Any]:
+  """
+  Posts a Telegram update from a chat of its own, so each answer can be matched to its update.
+  """
+  chat_id = ID_BASE + index
+  update = {
+    "update_id": ID_BASE + index,
+    "message": {
+      "message_id": index + 1,
+      "date": int(time.time()),
+      "chat": {"id": chat_id, "type": "private"},
+      "from": {"id": chat_id, "is_bot": False, "first_name": "Load test"},
+      "text": message,
+    },
+  }
+  sent_at = time.time()
+  start = time.perf_counter()
+  response = await client.post(f"{args.api_url}/telegram_webhook/{settings.TELEGRAM_BOT_TOKEN}", json=update)
+  return {"status": response.status_code, "latency": time.perf_counter() - start, "chat_id": str(chat_id), "sent_at": sent_at}
+
+async def drain_telegram(client: httpx.AsyncClient, results: list[dict[str, Any]]) -> dict[str, Any]:
+  """
+  Waits until the stub server has received an answer for every accepted update, and measures the time
+  from posting each update to its first and last sent or edited message.
+  """
+  pending = {result["chat_id"]: result for result in results if result["status"] == 200}
+  deadline = time.monotonic() + args.drain_timeout
+  deliveries: dict[str, Any] = {}
+  while time.monotonic() < deadline:
+    deliveries = (await client.get(f"{args.stub_url}/stats")).json()["telegram"]["deliveries"]
+    if all(chat_id in deliveries for chat_id in pending):
+      break
+    await asyncio.sleep(0.5)
+  answered = [(pending[chat_id], deliveries[chat_id]) for chat_id in pending if chat_id in deliveries]
+  first_ms = [(delivery["first"] - result["sent_at"]) * 1000 for result, delivery in answered]
+  last_ms = [(delivery["last"] - result["sent_at"]) * 1000 for result, delivery in answered]
+  first_sent = min((result["sent_at"] for result in pending.values()), default=0.0)
+  last_answer = max((delivery["last"] for _, delivery in answered), default=first_sent)
+  return {
+    "answered": len(answered),
+    "unanswered": len(pending) - len(answered),
+    "first_message_ms": percentiles(first_ms),
+    "answer_ms": percentiles(last_ms),
+    "answers_per_second": len(answered) / (last_answer - first_sent) if last_answer > first_sent else 0.0,
+  }
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, messages: list[str], offset: int) -> dict[str, Any]:
+  """
+  Sends args.requests requests with `concurrency` of them in flight at once (closed loop) and summarizes them.
+  """
+  send = {"chat": send_chat, "chat_stream": send_chat_stream, "telegram": send_telegram_update}[args.target]
+  indices = iter(range(offset, offset + args.requests))
+  results: list[dict[str, Any]] = []
+
+  async def worker():
+    for index in indices:
+      try:
+        results.append(await send(client, index, messages[index % len(messages)]))
+      except httpx.HTTPError as e:
+        results.append({"status": type(e).__name__, "latency": None})
+
+  start = time.perf_counter()
+  await asyncio.gather(*(worker() for _ in range(concurrency)))
+  wall_seconds = time.perf_counter() - start
+  statuses: dict[str, int] = {}
+  for result in results:
+    statuses[str(result["status"])] = statuses.get(str(result["status"]), 0) + 1
+  succeeded = [result for result in results if result["status"] == 200]
+  summary = {
+    "concurrency": concurrency,
+    "requests": len(results),
+    "succeeded": len(succeeded),
+    "error_rate": 1 - len(succeeded) / len(results) if results else 0.0,
+    "statuses": statuses,
+    "throughput_rps": len(succeeded) / wall_seconds if wall_seconds else 0.0,
+    "latency_ms": percentiles([result["latency"] * 1000 for result in succeeded]),
+    "wall_seconds": wall_seconds,
+  }
+  if args.target == "chat_stream":
+    summary["first_token_ms"] = percentiles([result["first_token"] * 1000 for result in succeeded if result["first_token"] is not None])
+  if args.target == "telegram":
+    summary["telegram"] = await drain_telegram(client, results)
+  return summary
+
+async def get_json(client: httpx.AsyncClient, url: str) -> Optional[dict[str, Any]]:
+  try:
+    response = await client.get(url)
+    return response.json() if response.status_code == 200 else None
+  except httpx.HTTPError:
+    return None
+
+async def main():
+  messages = Path(args.messages).read_text(encoding="utf-8").splitlines() if args.messages else DEFAULT_MESSAGES
+  messages = [message for message in messages if message.strip()]
+  processes = []
+  try:
+    if args.start_stub:
+      stub_port = httpx.URL(args.stub_url).port
+      processes.append(start_process([sys.executable, str(SCRIPTS_DIR / "stub_llm_server.py"), "--port", str(stub_port), *shlex.split(args.stub_args)]))
+      await wait_until(f"{args.stub_url}/stats", processes[-1], timeout=30)
+    if args.start_api:
+      api_url = httpx.URL(args.api_url)
+      processes.append(start_process(
+        [
+          sys.executable, "-m", "uvicorn", "ecommerce_agent.infrastructure.api:app",
+          "--host", api_url.host, "--port", str(api_url.port), "--workers", "1", "--log-level", "warning"
+        ],
+        env={
+          "GROQ_BASE_URL": args.stub_url,
+          "TELEGRAM_BASE_URL": f"{args.stub_url}/bot",
+          "WEBHOOK_URL": args.api_url,
+          "TRACING_ENABLED": "false",
+          # Rate-limit each simulated user on its own, not every request from this host together
+          "ADMISSION_TRUST_USER_ID": "true",
+        }
+      ))
+    await wait_until(f"{args.api_url}/health/ready", processes[-1] if args.start_api else None, timeout=args.ready_timeout)
+
+    levels = []
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=httpx.Limits(max_connections=None)) as client:
+      for level, concurrency in enumerate(int(value) for value in args.concurrency.split(",")):
+        try:
+          await client.post(f"{args.stub_url}/reset")
+        except httpx.HTTPError:
+          pass
+        summary = await run_level(client, concurrency, messages, offset=level * args.requests)
+        summary["stub"] = await get_json(client, f"{args.stub_url}/stats")
+        if summary["stub"] is not None:
+          summary["stub"]["telegram"].pop("deliveries", None)
+        summary["admission"] = await get_json(client, f"{args.api_url}/admission/metrics")
+        levels.append(summary)
+
+    write_report({
+      "revision": git_revision(),
+      "config": {
+        "target": args.target,
+        "requests": args.requests,
+        "api_url": args.api_url,
+        "stub_url": args.stub_url,
+        "stub_args": args.stub_args,
+        "started_api": args.start_api,
+        "messages": len(messages),
+      },
+      "levels": levels,
+    }, args.output)
+  finally:
+    for process in reversed(processes):
+      process.terminate()
+      process.wait(timeout=30)
+
+if __name__ == "__main__":
+  args = parser.parse_args()
+  asyncio.run(main())
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Optional
+from urllib.parse import parse_qsl
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+parser = argparse.ArgumentParser(
+  description='Local stub of the Groq/OpenAI chat-completions API with configurable latency, errors and tool calls. '
+  'It also stubs the Telegram Bot API methods the agent uses, to load-test the webhook offline'
+)
+parser.add_argument('--host', type=str, default='127.0.0.1')
+parser.add_argument('--port', type=int, default=8090)
+parser.add_argument('--latency-ms', type=float, help='Median latency before the first token', default=300.0)
+parser.add_argument('--sigma', type=float, help='Spread of the lognormal latency distribution', default=0.3)
+parser.add_argument('--tail-rate', type=float, help='Share of requests hit by a latency spike', default=0.05)
+parser.add_argument('--tail-ms', type=float, help='Extra latency of a spike', default=3000.0)
+parser.add_argument('--error-rate', type=float, help='Share of requests answered with a 503', default=0.0)
+parser.add_argument('--tokens', type=int, help='Number of tokens in each answer', default=40)
+parser.add_argument('--token-interval-ms', type=float, help='Delay between streamed tokens', default=10.0)
+parser.add_argument('--tool-call-rate', type=float, help='Share of user turns offered tools that are answered with a call to a random offered tool', default=0.0)
+parser.add_argument(
+  '--script', type=str, default=None,
+  help='JSON file of scripted tool calls, e.g. [{"match": "envío", "tool": "document_retriever", "args": {"top_k": 3}}]. '
+  'A user turn containing "match" (case-insensitive) is answered with a call to "tool", whose "query" defaults to the user message'
+)
+parser.add_argument('--telegram-latency-ms', type=float, help='Latency of the stubbed Telegram Bot API methods', default=50.0)
+parser.add_argument('--seed', type=int, default=None)
+args = parser.parse_args()
+
+rng = random.Random(args.seed)
+app = FastAPI()
+tool_call_rules = json.loads(open(args.script, encoding="utf-8").read()) if args.script else []
+stats = {"completions": 0, "errors": 0, "tool_calls": 0, "streams": 0}
+telegram_calls: dict[str, int] = {}
+# Per chat: time of the first and last message sent or edited, and how many
+telegram_deliveries: dict[str, dict[str, float]] = {}
+
+def sample_latency() -> float:
+  """
+  Samples the time to first token in seconds: lognormal around --latency-ms, plus an occasional --tail-ms spike.
+  """
+  latency = args.latency_ms * rng.lognormvariate(0, args.sigma)
+  if rng.random() < args.tail_rate:
+    latency += args.tail_ms
+  return latency / 1000
+
+def answer_tokens() -> list[str]:
+  return [f"token{index} " for index in range(args.tokens)]
+
+def choose_tool_call(body: dict) -> Optional[dict]:
+  """
+  Decides whether to answer with a tool call: only for a user turn (not after a tool result) when tools are offered,
+  following the first matching scripted rule, or else --tool-call-rate.
+
+  Returns:
+    Optional[dict]: The tool call in the chat-completions format, or None to answer with text.
+  """
+  offered = [tool["function"]["name"] for tool in body.get("tools") or []]
+  messages = body.get("messages") or []
+  if not offered or not messages or messages[-1].get("role") != "user":
+    return None
+  text = str(messages[-1].get("content") or "")
+  for rule in tool_call_rules:
+    if rule["match"].casefold() in text.casefold() and rule["tool"] in offered:
+      name, tool_args = rule["tool"], rule.get("args", {})
+      break
+  else:
+    if rng.random() >= args.tool_call_rate:
+      return None
+    name, tool_args = rng.choice(offered), {}
+  return {
+    "id": f"call_{uuid.uuid4().hex[:24]}",
+    "type": "function",
+    "function": {"name": name, "arguments": json.dumps({"query": text, **tool_args}, ensure_ascii=False)},
+  }
+
+def completion(model: str, content: Optional[str], tool_call: Optional[dict] = None) -> dict:
+  message = {"role": "assistant", "content": content}
+  if tool_call:
+    message["tool_calls"] = [tool_call]
+  return {
+    "id": f"chatcmpl-{uuid.uuid4().hex}",
+    "object": "chat.completion",
+    "created": int(time.time()),
+    "model": model,
+    "choices": [{"index": 0, "message": message, "logprobs": None, "finish_reason": "tool_calls" if tool_call else "stop"}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": args.tokens, "total_tokens": 10 + args.tokens},
+  }
+
+def completion_chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+  chunk = {
+    "id": completion_id,
+    "object": "chat.completion.chunk",
+    "created": int(time.time()),
+    "model": model,
+    "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+  }
+  return f"data: {json.dumps(chunk)}\n\n"
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+  body = await request.json()
+  model = body.get("model", "stub")
+  await asyncio.sleep(sample_latency())
+  if rng.random() < args.error_rate:
+    stats["errors"] += 1
+    return JSONResponse(status_code=503, content={"error": {"message": "Stub server overloaded", "type": "service_unavailable"}})
+  stats["completions"] += 1
+  tool_call = choose_tool_call(body)
+  if tool_call:
+    stats["tool_calls"] += 1
+  if not body.get("stream"):
+    if tool_call:
+      return completion(model, None, tool_call)
+    await asyncio.sleep(args.tokens * args.token_interval_ms / 1000)
+    return completion(model, "".join(answer_tokens()))
+
+  stats["streams"] += 1
+
+  async def stream():
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    yield completion_chunk(completion_id, model, {"role": "assistant", "content": ""})
+    if tool_call:
+      yield completion_chunk(completion_id, model, {"tool_calls": [{"index": 0, **tool_call}]})
+      yield completion_chunk(completion_id, model, {}, finish_reason="tool_calls")
+    else:
+      for token in answer_tokens():
+        yield completion_chunk(completion_id, model, {"content": token})
+        await asyncio.sleep(args.token_interval_ms / 1000)
+      yield completion_chunk(completion_id, model, {}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+  return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.post("/bot{token}/{method}")
+async def telegram_method(token: str, method: str, request: Request):
+  """
+  Stubs the Telegram Bot API methods the agent calls, recording when each chat received a message.
+  """
+  if request.headers.get("content-type", "").startswith("application/json"):
+    params = await request.json()
+  else:
+    # python-telegram-bot sends url-encoded form fields when there are no files
+    params = dict(parse_qsl((await request.body()).decode("utf-8")))
+  await asyncio.sleep(args.telegram_latency_ms / 1000)
+  telegram_calls[method] = telegram_calls.get(method, 0) + 1
+  now = time.time()
+  if method == "getMe":
+    return {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}}
+  if method in ("sendMessage", "editMessageText"):
+    chat_id = str(params.get("chat_id"))
+    delivery = telegram_deliveries.setdefault(chat_id, {"first": now, "last": now, "messages": 0})
+    delivery["last"] = now
+    delivery["messages"] += 1
+    message_id = int(params.get("message_id") or rng.randint(1, 2**31))
+    return {
+      "ok": True,
+      "result": {
+        "message_id": message_id,
+        "date": int(now),
+        "chat": {"id": int(chat_id), "type": "private"},
+        "text": params.get("text", ""),
+      }
+    }
+  return {"ok": True, "result": True}
+
+@app.get("/stats")
+async def get_stats():
+  """
+  Returns the chat-completion counters, the Telegram method counts and the per-chat Telegram deliveries (Unix times).
+  """
+  return {"llm": stats, "telegram": {"calls": telegram_calls, "deliveries": telegram_deliveries}}
+
+@app.post("/reset")
+async def reset_stats():
+  for key in stats:
+    stats[key] = 0
+  telegram_calls.clear()
+  telegram_deliveries.clear()
+  return {"status": "reset"}
+
+if __name__ == "__main__":
+  uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,79 @@
+import argparse
+import time
+from pathlib import Path
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from benchmark_utils import git_revision, percentiles, write_report
+from ecommerce_agent.application.services.conversation_service.workflow.intent_router import (
+  NO_TOOL_LABEL,
+  load_intent_examples,
+  train_intent_classifier,
+)
+from ecommerce_agent.application.services.rag.embeddings import EmbeddingsService
+from ecommerce_agent.config import settings
+
+parser = argparse.ArgumentParser(description='Train the intent router and report its routing accuracy and latency savings')
+parser.add_argument('--examples', type=str, help='JSONL file of labelled examples', default=settings.INTENT_ROUTER_EXAMPLES_PATH)
+parser.add_argument('--model-output', type=str, help='Where to save the trained router', default=settings.INTENT_ROUTER_MODEL_PATH)
+parser.add_argument('--threshold', type=float, help='Confidence needed to route', default=settings.INTENT_ROUTER_THRESHOLD)
+parser.add_argument('--folds', type=int, help='Cross-validation folds', default=5)
+parser.add_argument('--llm-latency-ms', type=float, help='Measured latency of the tool-selection LLM call, to estimate savings', default=None)
+parser.add_argument('--output', type=str, help='Path of the JSON report. Printed to stdout if omitted', default=None)
+args = parser.parse_args()
+
+texts, labels = load_intent_examples(args.examples)
+embeddings_service = EmbeddingsService()
+embeddings = np.array(embeddings_service.embed_queries(texts))
+labels = np.array(labels)
+
+# Out-of-fold probabilities, so every example is scored by a model that did not see it
+classifier = train_intent_classifier(embeddings, labels)
+folds = StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=42)
+probabilities = cross_val_predict(classifier, embeddings, labels, cv=folds, method='predict_proba')
+classes = np.array(sorted(set(labels)))
+predicted = classes[probabilities.argmax(axis=1)]
+confidence = probabilities.max(axis=1)
+routed = (confidence >= args.threshold) & (predicted != NO_TOOL_LABEL)
+
+# Latency of routing one message: embedding it and classifying it
+router_ms = []
+for text in texts:
+  start = time.perf_counter()
+  classifier.predict_proba([embeddings_service.embed_query(text)])
+  router_ms.append((time.perf_counter() - start) * 1000)
+
+report = {
+  "revision": git_revision(),
+  "config": {
+    "examples": str(args.examples),
+    "n_examples": len(texts),
+    "embedding_model": settings.EMBEDDING_MODEL,
+    "threshold": args.threshold,
+    "folds": args.folds,
+  },
+  "cross_validation": {
+    "accuracy": accuracy_score(labels, predicted),
+    "classification_report": classification_report(labels, predicted, output_dict=True, zero_division=0),
+    "confusion_matrix": {"labels": classes.tolist(), "matrix": confusion_matrix(labels, predicted, labels=classes).tolist()},
+  },
+  "routing": {
+    # Share of messages sent straight to a tool, and how often that tool was the right one
+    "route_rate": float(routed.mean()),
+    "routed_accuracy": float((predicted[routed] == labels[routed]).mean()) if routed.any() else None,
+    "misrouted": [
+      {"text": text, "label": label, "predicted": prediction, "confidence": float(score)}
+      for text, label, prediction, score, is_routed in zip(texts, labels, predicted, confidence, routed)
+      if is_routed and label != prediction
+    ],
+  },
+  "router_latency_ms": percentiles(router_ms),
+}
+if args.llm_latency_ms is not None:
+  report["estimated_savings_ms_per_message"] = float(routed.mean()) * args.llm_latency_ms - float(np.mean(router_ms))
+
+Path(args.model_output).parent.mkdir(parents=True, exist_ok=True)
+joblib.dump({"classifier": classifier, "embedding_model": settings.EMBEDDING_MODEL}, args.model_output)
+report["model_output"] = str(args.model_output)
+write_report(report, args.output)
@@ -0,0 +1,296 @@
+import argparse
+import logging
+import math
+import time
+from typing import Any, Optional
+from benchmark_utils import SyntheticRetrievalCorpus, git_revision, percentiles, write_report
+from ecommerce_agent.config import settings
+from ecommerce_agent.infrastructure.database.postgresql.postgres_client import db_client, db_transaction
+
+parser = argparse.ArgumentParser(
+  description='Sweep HNSW and IVFFlat index and search parameters on the documents and products tables, report recall@k '
+  'against latency, index build time and size, and recommend the cheapest setting that meets a target recall. '
+  'The tables must already hold data, e.g. loaded by scripts/benchmark_retrieval.py. Run it against a copy of the '
+  'database: it builds and drops indexes'
+)
+parser.add_argument('--targets', type=str, help='Comma-separated tables to tune: documents, products', default='documents,products')
+parser.add_argument('--methods', type=str, help='Comma-separated index types to sweep: hnsw, ivfflat', default='hnsw,ivfflat')
+parser.add_argument('--top-k', type=str, help='Comma-separated k values of recall@k', default='5,20')
+parser.add_argument('--target-recall', type=float, help='Recall@k the recommended setting must reach', default=0.95)
+parser.add_argument('--objective', type=str, choices=['p50', 'p95', 'p99'], help='Latency percentile minimized by the recommendation', default='p99')
+parser.add_argument('--hnsw-m', type=str, help='Comma-separated HNSW m values', default='16,32')
+parser.add_argument('--hnsw-ef-construction', type=str, help='Comma-separated HNSW ef_construction values', default='64,128')
+parser.add_argument('--hnsw-ef-search', type=str, help='Comma-separated hnsw.ef_search values', default='20,40,80,160,320')
+parser.add_argument(
+  '--ivfflat-lists', type=str, default='auto',
+  help='Comma-separated IVFFlat lists values. "auto" tries rows / 1000 and sqrt(rows), as recommended by pgvector'
+)
+parser.add_argument('--ivfflat-probes', type=str, help='Comma-separated ivfflat.probes values (those above lists are skipped)', default='1,2,4,8,16,32,64')
+parser.add_argument('--queries', type=int, help='Measured queries per setting', default=200)
+parser.add_argument('--warmup-queries', type=int, help='Unmeasured queries run first for each setting', default=10)
+parser.add_argument(
+  '--query-source', type=str, choices=['synthetic', 'table'], default='synthetic',
+  help='synthetic: query embeddings of the benchmark corpus (same --seed and --topics as benchmark_retrieval.py). '
+  'table: embeddings of random stored rows, for tuning on a copy of real data'
+)
+parser.add_argument('--topics', type=int, help='Topics of the synthetic corpus', default=64)
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--maintenance-work-mem', type=str, help='maintenance_work_mem for the index builds, e.g. 2GB', default=None)
+parser.add_argument('--verbose', action='store_true', help='Log build and measurement progress')
+parser.add_argument('--output', type=str, help='Path of the JSON report. Printed to stdout if omitted', default=None)
+args = parser.parse_args()
+
+# The vector search queries of the services, so latencies include fetching the same columns
+VECTOR_QUERIES = {
+  "documents": """
+    SELECT id, content, embedding, window_content, source, embedding <=> %s AS distance
+    FROM documents
+    ORDER BY distance
+    LIMIT %s
+  """,
+  "products": """
+    SELECT id, code, name, description, embedding, price, image_url, stock_level, is_active, embedding <=> %s AS distance
+    FROM products
+    WHERE is_active = TRUE
+    ORDER BY distance
+    LIMIT %s
+  """,
+}
+SEARCH_PARAMETERS = {"hnsw": "hnsw.ef_search", "ivfflat": "ivfflat.probes"}
+
+def int_list(value: str) -> list[int]:
+  return [int(item) for item in value.split(",")]
+
+def index_name(target: str) -> str:
+  return f"{target}_embedding_tuning_idx"
+
+def existing_vector_indexes(target: str) -> list[str]:
+  indexes = db_client.execute_query(
+    "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND (indexdef ILIKE %s OR indexdef ILIKE %s)",
+    (target, "%USING hnsw%", "%USING ivfflat%"), fetch_all=True
+  ) or []
+  return [index["indexdef"] for index in indexes]
+
+def load_queries(target: str, count: int) -> list[str]:
+  """
+  Returns count query embeddings as pgvector literals.
+  """
+  if args.query_source == "synthetic":
+    corpus = SyntheticRetrievalCorpus(settings.EMBEDDING_DIMENSION, seed=args.seed, n_topics=args.topics)
+    return [f"[{','.join(map(str, embedding))}]" for _, embedding in corpus.queries(count)]
+  rows = db_client.execute_query(
+    f"SELECT embedding::text AS embedding FROM {target} ORDER BY random() LIMIT %s", (count,), fetch_all=True
+  ) or []
+  return [row["embedding"] for row in rows]
+
+def run_queries(target: str, queries: list[str], top_k: int, settings_sql: list[str]) -> tuple[list[list[int]], list[float]]:
+  """
+  Runs the vector search for each query in one transaction, after applying settings_sql with SET LOCAL
+  so the search parameters never leak into the connection pool.
+
+  Returns:
+    tuple[list[list[int]], list[float]]: The ids returned for each query and each query's latency in ms.
+  """
+  ids, latencies = [], []
+  with db_client.connection() as connection:
+    try:
+      with connection.cursor() as cursor:
+        for statement in settings_sql:
+          cursor.execute(statement)
+        for embedding in queries:
+          start = time.perf_counter()
+          cursor.execute(VECTOR_QUERIES[target], (embedding, top_k))
+          rows = cursor.fetchall()
+          latencies.append((time.perf_counter() - start) * 1000)
+          ids.append([row[0] for row in rows])
+    finally:
+      connection.rollback()
+  return ids, latencies
+
+def uses_index(target: str, embedding: str, top_k: int, settings_sql: list[str]) -> bool:
+  """
+  Tells whether the planner picks the tuning index for the vector search under settings_sql.
+  """
+  with db_client.connection() as connection:
+    try:
+      with connection.cursor() as cursor:
+        for statement in settings_sql:
+          cursor.execute(statement)
+        cursor.execute("EXPLAIN " + VECTOR_QUERIES[target], (embedding, top_k))
+        return any(index_name(target) in row[0] for row in cursor.fetchall())
+    finally:
+      connection.rollback()
+
+def recall(results: list[list[int]], ground_truth: list[list[int]]) -> float:
+  """
+  Computes the mean recall@k: the share of the exact top-k each query returned.
+  """
+  scores = [len(set(found) & set(exact)) / len(exact) for found, exact in zip(results, ground_truth) if exact]
+  return sum(scores) / len(scores) if scores else 0.0
+
+def measure(target: str, queries: list[str], ground_truths: dict[int, list[list[int]]], settings_sql: list[str]) -> list[dict[str, Any]]:
+  """
+  Measures recall@k and latency for each k under settings_sql.
+  """
+  results = []
+  for top_k, ground_truth in ground_truths.items():
+    run_queries(target, queries[:args.warmup_queries], top_k, settings_sql)
+    ids, latencies = run_queries(target, queries[args.warmup_queries:], top_k, settings_sql)
+    results.append({
+      "top_k": top_k,
+      "recall": recall(ids, ground_truth),
+      "latency_ms": percentiles(latencies),
+      # Queries run one at a time, so this is the single-connection throughput
+      "qps": len(latencies) / (sum(latencies) / 1000) if latencies else 0.0,
+    })
+  return results
+
+def build_index(target: str, method: str, build_parameters: dict[str, int]) -> dict[str, Any]:
+  """
+  Builds the tuning index on the embedding column with cosine distance, which the services search with (<=>).
+
+  Returns:
+    dict[str, Any]: The CREATE INDEX statement, the build time and the index size.
+  """
+  options = ", ".join(f"{name} = {value}" for name, value in build_parameters.items())
+  statement = f"CREATE INDEX {index_name(target)} ON {target} USING {method} (embedding vector_cosine_ops) WITH ({options})"
+  with db_transaction() as connection:
+    cursor = connection.cursor()
+    if args.maintenance_work_mem:
+      cursor.execute("SET LOCAL maintenance_work_mem = %s", (args.maintenance_work_mem,))
+    start = time.perf_counter()
+    cursor.execute(statement)
+    build_seconds = time.perf_counter() - start
+  size = db_client.execute_query("SELECT pg_relation_size(%s) AS bytes", (index_name(target),), fetch_one=True)["bytes"]
+  return {"create_index": statement, "build_seconds": build_seconds, "index_size_mb": size / (1024 * 1024)}
+
+def drop_index(target: str) -> None:
+  with db_transaction() as connection:
+    connection.cursor().execute(f"DROP INDEX IF EXISTS {index_name(target)}")
+
+def index_configurations(method: str, rows: int) -> list[tuple[dict[str, int], list[int]]]:
+  """
+  Lists the (build parameters, search parameter values) pairs to sweep for an index type.
+  """
+  if method == "hnsw":
+    return [
+      ({"m": m, "ef_construction": ef_construction}, int_list(args.hnsw_ef_search))
+      for m in int_list(args.hnsw_m)
+      for ef_construction in int_list(args.hnsw_ef_construction)
+      # pgvector requires ef_construction to be at least twice m
+      if ef_construction >= 2 * m
+    ]
+  if args.ivfflat_lists == "auto":
+    lists_values = sorted({max(1, rows // 1000), max(1, int(math.sqrt(rows)))})
+  else:
+    lists_values = int_list(args.ivfflat_lists)
+  return [
+    ({"lists": lists}, [probes for probes in int_list(args.ivfflat_probes) if probes <= lists])
+    for lists in lists_values
+  ]
+
+def tune_target(target: str, methods: list[str], top_ks: list[int]) -> dict[str, Any]:
+  """
+  Computes the exact top-k with a sequential scan, then builds each index configuration in turn and measures
+  every search parameter value against it.
+
+  Returns:
+    dict[str, Any]: The table size, the measurements and the recommendation for each k.
+  """
+  rows = db_client.execute_query(f"SELECT COUNT(*) AS count FROM {target}", fetch_one=True)["count"]
+  if not rows:
+    raise SystemExit(f"The {target} table is empty. Load it first, e.g. with scripts/benchmark_retrieval.py.")
+  existing = existing_vector_indexes(target)
+  if existing:
+    raise SystemExit(f"The {target} table already has a vector index, which would skew the sweep: {existing}")
+  queries = load_queries(target, args.queries + args.warmup_queries)
+
+  # The exact search doubles as the no-index baseline: its recall is 1 by definition
+  exact_sql = ["SET LOCAL enable_indexscan = off", "SET LOCAL enable_bitmapscan = off"]
+  start = time.perf_counter()
+  ground_truths = {top_k: run_queries(target, queries[args.warmup_queries:], top_k, exact_sql)[0] for top_k in top_ks}
+  logging.info(f"Computed the exact top-k of {len(queries) - args.warmup_queries} queries on {rows} {target} rows in {time.perf_counter() - start:.1f} s.")
+  measurements = [
+    {"method": "exact", "build_parameters": {}, "search_parameters": {}, "create_index": None, "build_seconds": 0.0, "index_size_mb": 0.0, **result}
+    for result in measure(target, queries, ground_truths, exact_sql)
+  ]
+
+  for method in methods:
+    for build_parameters, search_values in index_configurations(method, rows):
+      try:
+        build = build_index(target, method, build_parameters)
+        logging.info(f"Built {method} {build_parameters} on {target} in {build['build_seconds']:.1f} s ({build['index_size_mb']:.1f} MB).")
+        for value in search_values:
+          # Forcing the index measures it even where the planner would prefer a sequential scan on a small table
+          search_sql = [f"SET LOCAL {SEARCH_PARAMETERS[method]} = {value}", "SET LOCAL enable_seqscan = off"]
+          planner_sql = search_sql[:1]
+          picked_by_planner = uses_index(target, queries[0], max(top_ks), planner_sql)
+          for result in measure(target, queries, ground_truths, search_sql):
+            measurements.append({
+              "method": method,
+              "build_parameters": build_parameters,
+              "search_parameters": {SEARCH_PARAMETERS[method]: value},
+              "picked_by_planner": picked_by_planner,
+              **build,
+              **result,
+            })
+            logging.info(f"{target} {method} {build_parameters} {SEARCH_PARAMETERS[method]}={value} top_k={result['top_k']}: recall {result['recall']:.3f}, {result['latency_ms']} ms.")
+      finally:
+        drop_index(target)
+
+  return {
+    "target": target,
+    "rows": rows,
+    "measurements": measurements,
+    "recommendations": {top_k: recommend(target, [m for m in measurements if m["top_k"] == top_k]) for top_k in top_ks},
+  }
+
+def recommend(target: str, measurements: list[dict[str, Any]]) -> Optional[dict[str, Any]]:
+  """
+  Picks the setting with the lowest args.objective latency among those reaching args.target_recall, preferring
+  smaller and faster-to-build indexes on ties. When none reaches it, returns the setting with the best recall.
+
+  Returns:
+    Optional[dict[str, Any]]: The chosen measurement, whether it meets the target and the SQL to apply it.
+  """
+  if not measurements:
+    return None
+  meeting = [m for m in measurements if m["recall"] >= args.target_recall]
+  if meeting:
+    best = min(meeting, key=lambda m: (m["latency_ms"].get(args.objective, math.inf), m["index_size_mb"], m["build_seconds"]))
+  else:
+    best = max(measurements, key=lambda m: (m["recall"], -m["latency_ms"].get(args.objective, math.inf)))
+  apply_sql = []
+  if best["create_index"]:
+    apply_sql.append(best["create_index"].replace(index_name(target), f"{target}_embedding_idx"))
+  for name, value in best["search_parameters"].items():
+    apply_sql.append(f"ALTER DATABASE {settings.POSTGRES_DB} SET {name} = {value}")
+  return {"meets_target": bool(meeting), "setting": best, "apply_sql": apply_sql}
+
+def main():
+  targets = args.targets.split(",")
+  methods = args.methods.split(",")
+  top_ks = int_list(args.top_k)
+  tables = [tune_target(target, methods, top_ks) for target in targets]
+  write_report({
+    "revision": git_revision(),
+    "config": {
+      "targets": targets,
+      "methods": methods,
+      "top_k": top_ks,
+      "target_recall": args.target_recall,
+      "objective": args.objective,
+      "queries": args.queries,
+      "warmup_queries": args.warmup_queries,
+      "query_source": args.query_source,
+      "seed": args.seed,
+      "embedding_dimension": settings.EMBEDDING_DIMENSION,
+      "database": f"{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}",
+    },
+    "tables": tables,
+  }, args.output)
+  db_client.close_connection()
+
+if args.verbose:
+  logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+main()
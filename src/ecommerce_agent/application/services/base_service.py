@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import Any, Optional
 from ecommerce_agent.infrastructure.database.postgresql.postgres_client import db_transaction
+from ecommerce_agent.infrastructure.metrics import timed
 import logging
 
 class BaseService:
@@ -20,6 +21,38 @@ class BaseService:
       return None
     return text.replace('\x00', '')
   
+  @timed("retrieval.fusion")
+  def _reciprocal_rank_fusion(self, semantic_results: list[Any], text_results: list[Any], top_k: int, k: int = 60) -> list[Any]:
+    """
+    Merges semantic and text search results using Reciprocal Rank Fusion (RRF).
+    
+    Args:
+        semantic_results (list[Any]): Results ordered by semantic similarity. Each item must expose an `id`.
+        text_results (list[Any]): Results ordered by text search rank. Each item must expose an `id`.
+        top_k (int): The maximum number of fused results to return.
+        k (int): The RRF smoothing constant. Defaults to 60.
+        
+    Returns:
+        list[Any]: The top fused results with their `rrf_score` attribute set.
+    """
+    reranked_scores: dict[int, float] = {}
+    items_by_id: dict[int, Any] = {}
+    
+    for results in (semantic_results, text_results):
+      for i, item in enumerate(results):
+        items_by_id[item.id] = item
+        reranked_scores[item.id] = reranked_scores.get(item.id, 0.0) + 1.0 / (k + i + 1)
+    
+    # Sort items by their combined RRF score (from highest to lowest)
+    sorted_ids = sorted(reranked_scores.keys(), key=lambda item_id: reranked_scores[item_id], reverse=True)[:top_k]
+    
+    fused_results = []
+    for item_id in sorted_ids:
+      item = items_by_id[item_id]
+      setattr(item, 'rrf_score', reranked_scores[item_id])
+      fused_results.append(item)
+    return fused_results
+  
   def _create_extensions(self):
     try:
       with db_transaction() as conn:
@@ -1,52 +1,43 @@
-from typing import AsyncGenerator, Union, Any
+from typing import AsyncGenerator, Optional, Union, Any
 from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
-from langfuse import Langfuse
-from langfuse.langchain import CallbackHandler
 from ecommerce_agent.application.services.conversation_service.workflow.state import ConversationState
-from ecommerce_agent.application.services.conversation_service.workflow.graph import create_graph_workflow
-from ecommerce_agent.config import settings
+from ecommerce_agent.application.services.conversation_service.workflow.graph import get_compiled_graph
+from ecommerce_agent.infrastructure.tracing import tracer
 import logging
-
-langfuse_client = Langfuse(
-  public_key=settings.LANGFUSE_PUBLIC_KEY,
-  secret_key=settings.LANGFUSE_SECRET_KEY,
-  host=settings.LANGFUSE_HOST
-)
-
-langfuse_handler = CallbackHandler(
-  public_key=settings.LANGFUSE_PUBLIC_KEY
-)
-
-if langfuse_client.auth_check():
-    logging.info("Langfuse client is authenticated and ready!")
-else:
-    logging.error("Authentication failed. Please check your credentials and host.")
+import time
+import uuid
 
 async def generate_response(
-  messages: Union[str, list[dict[str, Any]]]
+  messages: Union[str, list[dict[str, Any]]],
+  thread_id: Optional[str] = None,
+  trace_route: str = "chat",
+  checkpoint_id: Optional[str] = None
   ) -> tuple[str, ConversationState]:
   """
   Generates a response from the conversation graph.
 
   Args:
     messages (Union[str, list[dict[str, Any]]]): The input messages, either a single string or a list of message dictionaries.
+    thread_id (Optional[str]): The conversation id (e.g. chat or user id) whose memory is loaded and updated.
+      Only the new messages need to be sent. Defaults to a new, memoryless conversation.
+    trace_route (str): The route the request came from, which sets its tracing sample rate.
+    checkpoint_id (Optional[str]): The checkpoint of the conversation to continue from instead of its latest one,
+      e.g. to rerun a turn without what a cancelled run of it saved.
 
   Returns:
     tuple[str, ConversationState]: A tuple containing the content of the last message and the complete conversation state.
   """
-  graph = create_graph_workflow()
   try:
-    graph = graph.compile()
-    logging.info("Graph workflow compiled successfully.")
+    setup_start = time.perf_counter()
+    graph = get_compiled_graph()
+    logging.info(f"Graph ready in {(time.perf_counter() - setup_start) * 1000:.2f} ms.")
     output_state = await graph.ainvoke(
       input={
         "messages": __format_messages(messages=messages)
       },
       config={
-        "configurable": {
-          "thread_id": "123"
-        },
-        "callbacks": [langfuse_handler]
+        "configurable": __configurable(thread_id, checkpoint_id),
+        "callbacks": tracer.get_callbacks(trace_route)
       }
     )
     logging.info("Graph invoked")
@@ -56,41 +47,130 @@ async def generate_response(
     logging.error(f"Error generating response: {e}")
     raise e
   
-async def get_streaming_response(
-  messages: Union[str, list[dict[str, Any]]]
-) -> AsyncGenerator[str, None]:
+async def get_streaming_events(
+  messages: Union[str, list[dict[str, Any]]],
+  thread_id: Optional[str] = None,
+  trace_route: str = "chat_stream",
+  checkpoint_id: Optional[str] = None
+) -> AsyncGenerator[dict[str, Any], None]:
   """
-  Generates a streaming response from the conversation graph.
+  Streams the conversation graph as typed events, as soon as each node produces them.
+
+  Event types:
+    - "token": {"content"} a chunk of the answer produced by the conversation node.
+    - "tool_start": {"id", "name", "args"} a tool call requested by the model, before it runs.
+    - "tool_end": {"id", "name", "status", "elapsed_ms"} a finished tool call.
 
   Args:
     messages (Union[str, list[dict[str, Any]]]): The input messages, either a single string or a list of message dictionaries.
+    thread_id (Optional[str]): The conversation id whose memory is loaded and updated. Defaults to a new conversation.
+    trace_route (str): The route the request came from, which sets its tracing sample rate.
+    checkpoint_id (Optional[str]): The checkpoint of the conversation to continue from instead of its latest one.
 
   Yields:
-    str: Chunks of the AI's response content.
+    dict[str, Any]: Events with an "event" type and its "data".
   """
-  graph = create_graph_workflow()
   try:
-    graph = graph.compile()
-    logging.info("Graph workflow compiled successfully for streaming.")
-    async for chunk in graph.astream(
+    setup_start = time.perf_counter()
+    graph = get_compiled_graph()
+    logging.info(f"Graph ready for streaming in {(time.perf_counter() - setup_start) * 1000:.2f} ms.")
+    first_token_logged = False
+    async for mode, chunk in graph.astream(
       input={
         "messages": __format_messages(messages=messages)
       },
       config={
-        "configurable": {
-          "thread_id": "123"
-        },
-        "callbacks": [langfuse_handler]
+        "configurable": __configurable(thread_id, checkpoint_id),
+        "callbacks": tracer.get_callbacks(trace_route)
       },
-      stream_mode="messages"
+      stream_mode=["messages", "updates"]
     ):
-      logging.info("Streaming response")
-      if chunk[1]['langgraph_node'] == 'conversation' and isinstance(chunk[0], AIMessageChunk):
-        yield chunk[0].content
+      if mode == "messages":
+        message, metadata = chunk
+        if metadata['langgraph_node'] == 'conversation' and isinstance(message, AIMessageChunk) and message.content:
+          if not first_token_logged:
+            logging.info(f"First token streamed in {(time.perf_counter() - setup_start) * 1000:.2f} ms.")
+            first_token_logged = True
+          yield {"event": "token", "data": {"content": message.content}}
+        continue
+      for node, update in chunk.items():
+        if node == 'conversation':
+          for tool_call in getattr((update or {}).get("messages"), "tool_calls", None) or []:
+            yield {"event": "tool_start", "data": {"id": tool_call["id"], "name": tool_call["name"], "args": tool_call["args"]}}
+        elif node == 'tools':
+          for tool_message in (update or {}).get("messages", []):
+            yield {
+              "event": "tool_end",
+              "data": {
+                "id": tool_message.tool_call_id,
+                "name": tool_message.name,
+                "status": tool_message.status,
+                "elapsed_ms": tool_message.response_metadata.get("elapsed_ms")
+              }
+            }
   except Exception as e:
     logging.error(f"Error generating streaming response: {e}")
     raise e
+
+async def get_streaming_response(
+  messages: Union[str, list[dict[str, Any]]],
+  thread_id: Optional[str] = None,
+  trace_route: str = "chat_stream",
+  checkpoint_id: Optional[str] = None
+) -> AsyncGenerator[str, None]:
+  """
+  Generates a streaming response from the conversation graph.
+
+  Args:
+    messages (Union[str, list[dict[str, Any]]]): The input messages, either a single string or a list of message dictionaries.
+    thread_id (Optional[str]): The conversation id whose memory is loaded and updated. Defaults to a new conversation.
+    trace_route (str): The route the request came from, which sets its tracing sample rate.
+    checkpoint_id (Optional[str]): The checkpoint of the conversation to continue from instead of its latest one.
+
+  Yields:
+    str: Chunks of the AI's response content.
+  """
+  events = get_streaming_events(messages, thread_id=thread_id, trace_route=trace_route, checkpoint_id=checkpoint_id)
+  try:
+    async for event in events:
+      if event["event"] == "token":
+        yield event["data"]["content"]
+  finally:
+    await events.aclose()
   
+async def get_checkpoint_id(thread_id: str) -> Optional[str]:
+  """
+  Returns the id of the latest checkpoint of a conversation, from which a turn can be run again.
+
+  Args:
+    thread_id (str): The conversation id.
+
+  Returns:
+    Optional[str]: The checkpoint id, None if the conversation has no checkpoint yet or memory is disabled.
+  """
+  graph = get_compiled_graph()
+  if graph.checkpointer is None:
+    return None
+  checkpoint_tuple = await graph.checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+  return checkpoint_tuple.checkpoint["id"] if checkpoint_tuple else None
+
+async def delete_conversation(thread_id: str) -> None:
+  """
+  Deletes the memory of a conversation.
+
+  Args:
+    thread_id (str): The conversation id.
+  """
+  graph = get_compiled_graph()
+  if graph.checkpointer is not None:
+    await graph.checkpointer.adelete_thread(thread_id)
+
+def __configurable(thread_id: Optional[str], checkpoint_id: Optional[str]) -> dict[str, str]:
+  configurable = {"thread_id": thread_id or str(uuid.uuid4())}
+  if checkpoint_id:
+    configurable["checkpoint_id"] = checkpoint_id
+  return configurable
+
 def __format_messages(messages: Union[str, list[Union[str, dict[str, Any]]]]) -> list[Union[HumanMessage, AIMessage]] :
   """
   Formats various message inputs into a consistent list of HumanMessage or AIMessage objects.
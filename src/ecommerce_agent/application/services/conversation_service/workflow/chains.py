@@ -1,15 +1,40 @@
+from functools import lru_cache
+import httpx
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import Runnable
 from langchain_groq import ChatGroq
 
-from ecommerce_agent.application.services.conversation_service.workflow.tools import tools 
+from ecommerce_agent.application.services.conversation_service.workflow.hedged_llm import HedgedChatModel
+from ecommerce_agent.application.services.conversation_service.workflow.tools import tools
 from ecommerce_agent.config import settings
-from ecommerce_agent.domain.prompt import SYSTEM_PROMPT
+from ecommerce_agent.domain.prompt import CONTEXT_SUMMARY_PROMPT, SYSTEM_PROMPT
 import logging
 
+@lru_cache(maxsize=None)
+def get_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+  """
+  Returns the process-wide HTTP clients used to talk to the LLM provider.
+  Sharing them keeps a pool of keep-alive connections instead of opening a new one per request.
+
+  Returns:
+    tuple[httpx.Client, httpx.AsyncClient]: The sync and async pooled HTTP clients.
+  """
+  limits = httpx.Limits(
+    max_connections=settings.GROQ_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.GROQ_HTTP_MAX_CONNECTIONS,
+    keepalive_expiry=settings.GROQ_HTTP_KEEPALIVE_EXPIRY
+  )
+  timeout = httpx.Timeout(settings.GROQ_HTTP_TIMEOUT)
+  logging.info("Creating pooled HTTP clients for the LLM provider.")
+  return (
+    httpx.Client(limits=limits, timeout=timeout),
+    httpx.AsyncClient(limits=limits, timeout=timeout)
+  )
+
 def get_llm(temperature: float = 0.0, model_name:str = settings.GROQ_LLM_MODEL) -> ChatGroq:
   """
-  Initializes and returns a ChatGroq language model.
+  Initializes and returns a ChatGroq language model that uses the shared pooled HTTP clients.
 
   Args:
     temperature (float): The temperature for the model's output randomness. Defaults to 0.0.
@@ -19,35 +44,80 @@ def get_llm(temperature: float = 0.0, model_name:str = settings.GROQ_LLM_MODEL)
     ChatGroq: An initialized ChatGroq language model.
   """
   logging.info(f"Getting LLM with model: {model_name}")
+  http_client, http_async_client = get_http_clients()
   return ChatGroq(
     model=model_name,
     temperature=temperature,
-    api_key=settings.GROQ_API_KEY
+    api_key=settings.GROQ_API_KEY,
+    base_url=settings.GROQ_BASE_URL,
+    http_client=http_client,
+    http_async_client=http_async_client
   )
 
-def get_response_chain() -> Runnable:
+def get_hedged_llm(temperature: float = 0.0) -> BaseChatModel:
   """
-  Creates and returns a LangChain response chain.
+  Returns the main LLM, wrapped with hedging and failover to settings.GROQ_LLM_MODEL_SECONDARY
+  (or to a second request to the same model) when settings.LLM_HEDGE_ENABLED is set.
 
-  This chain consists of a ChatGroq language model bound with tools and a ChatPromptTemplate.
+  Args:
+    temperature (float): The temperature for the model's output randomness. Defaults to 0.0.
 
   Returns:
-    Runnable: A LangChain prompt-to-model runnable.
+    BaseChatModel: The hedged model, or the plain ChatGroq model when hedging is disabled.
+  """
+  primary = get_llm(temperature=temperature)
+  if not settings.LLM_HEDGE_ENABLED:
+    return primary
+  secondary = get_llm(temperature=temperature, model_name=settings.GROQ_LLM_MODEL_SECONDARY or settings.GROQ_LLM_MODEL)
+  logging.info(f"Hedging LLM requests from {primary.model_name} to {secondary.model_name}.")
+  return HedgedChatModel(primary=primary, secondary=secondary, request_timeout=settings.LLM_REQUEST_TIMEOUT)
+
+@lru_cache(maxsize=None)
+def get_prompt() -> ChatPromptTemplate:
+  """
+  Returns the conversation prompt template, parsed once per process.
+
+  Returns:
+    ChatPromptTemplate: The system prompt followed by the conversation messages.
   """
-  llm = get_llm()
-  logging.info("LLM obtained")
-  llm = llm.bind_tools(tools)
   prompt = ChatPromptTemplate.from_messages([
     ("system", SYSTEM_PROMPT.prompt),
     MessagesPlaceholder(variable_name="messages"),
-    
+
   ],
   template_format='jinja2'
   )
   logging.info("Prompt obtained")
-  return prompt | llm
+  return prompt
 
+@lru_cache(maxsize=None)
+def get_response_chain() -> Runnable:
+  """
+  Creates and returns a LangChain response chain.
 
+  This chain consists of a ChatGroq language model (hedged, see get_hedged_llm) bound with tools and a ChatPromptTemplate.
+  It is built once per process; runnables are stateless, so the same chain serves concurrent requests.
 
+  Returns:
+    Runnable: A LangChain prompt-to-model runnable.
+  """
+  llm = get_hedged_llm()
+  logging.info("LLM obtained")
+  llm = llm.bind_tools(tools)
+  return get_prompt() | llm
 
+@lru_cache(maxsize=None)
+def get_summary_chain() -> Runnable:
+  """
+  Creates and returns the chain that summarizes older conversation turns with the small context summary model.
 
+  Returns:
+    Runnable: A LangChain prompt-to-model runnable taking `summary` and `conversation`.
+  """
+  llm = get_llm(model_name=settings.GROQ_LLM_MODEL_CONTEXT_SUMMARY)
+  prompt = ChatPromptTemplate.from_messages([
+    ("human", CONTEXT_SUMMARY_PROMPT.prompt),
+  ],
+  template_format='jinja2'
+  )
+  return prompt | llm
@@ -0,0 +1,18 @@
+from typing import Literal
+from langchain_core.messages import AIMessage
+from ecommerce_agent.application.services.conversation_service.workflow.state import ConversationState
+
+def route_condition(state: ConversationState) -> Literal["tools", "conversation"]:
+  """
+  Sends the turn to the tools node when the route node emitted a tool call, and to the conversation node otherwise.
+
+  Args:
+    state (ConversationState): The current conversation state.
+
+  Returns:
+    str: The name of the next node.
+  """
+  last_message = state['messages'][-1]
+  if isinstance(last_message, AIMessage) and last_message.tool_calls:
+    return "tools"
+  return "conversation"
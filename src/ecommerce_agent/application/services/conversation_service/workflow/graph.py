@@ -1,6 +1,12 @@
-from ecommerce_agent.application.services.conversation_service.workflow.nodes import conversation_node, tools_node
+from typing import Optional
+from ecommerce_agent.application.services.conversation_service.workflow.edges import route_condition
+from ecommerce_agent.application.services.conversation_service.workflow.nodes import conversation_node, route_node, summarize_conversation_node, tools_node
 from ecommerce_agent.application.services.conversation_service.workflow.state import ConversationState
+from ecommerce_agent.config import settings
+from ecommerce_agent.infrastructure.database.postgresql.checkpointer import PostgresCheckpointSaver
+from functools import lru_cache
 from langgraph.graph import StateGraph, START, END
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import tools_condition
 import logging
 
@@ -8,8 +14,10 @@ def create_graph_workflow() -> StateGraph:
   """
   Creates and configures the LangGraph workflow for the conversation agent.
 
-  This workflow defines the nodes (conversation and tools) and the edges
+  This workflow defines the nodes (summarize, conversation and tools) and the edges
   that dictate the flow of messages and tool usage within the agent.
+  Every turn first goes through the summarize node, which keeps the history within the token budget.
+  When the intent router is enabled, a route node then calls the retriever tool directly for clear-cut questions.
 
   Returns:
     StateGraph: The configured LangGraph workflow.
@@ -17,6 +25,7 @@ def create_graph_workflow() -> StateGraph:
   logging.info("Creating graph workflow")
   graph = StateGraph(ConversationState)
   
+  graph.add_node("summarize", summarize_conversation_node)
   graph.add_node("conversation", conversation_node)
   graph.add_node("tools", tools_node)
   
@@ -25,6 +34,37 @@ def create_graph_workflow() -> StateGraph:
     tools_condition
   )
   graph.add_edge("tools", "conversation")
-  graph.add_edge(START, "conversation")
+  graph.add_edge(START, "summarize")
+  if settings.INTENT_ROUTER_MODE != "off":
+    graph.add_node("route", route_node)
+    graph.add_edge("summarize", "route")
+    graph.add_conditional_edges("route", route_condition)
+  else:
+    graph.add_edge("summarize", "conversation")
   logging.info("Graph workflow created successfully.")
   return graph
+
+@lru_cache(maxsize=None)
+def get_checkpointer() -> Optional[PostgresCheckpointSaver]:
+  """
+  Returns the process-wide checkpointer that persists conversation memory per thread_id,
+  or None when settings.MEMORY_ENABLED is False.
+
+  Returns:
+    Optional[PostgresCheckpointSaver]: The PostgreSQL checkpointer, if memory is enabled.
+  """
+  return PostgresCheckpointSaver() if settings.MEMORY_ENABLED else None
+
+@lru_cache(maxsize=None)
+def get_compiled_graph() -> CompiledStateGraph:
+  """
+  Returns the compiled conversation graph, compiled once per process.
+  A compiled graph holds no per-request state (memory lives in the checkpointer, keyed by thread_id),
+  so it is safe to share across concurrent requests.
+
+  Returns:
+    CompiledStateGraph: The compiled LangGraph workflow.
+  """
+  graph = create_graph_workflow().compile(checkpointer=get_checkpointer())
+  logging.info("Graph workflow compiled successfully.")
+  return graph
@@ -0,0 +1,262 @@
+from bisect import bisect_left
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Sequence
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from ecommerce_agent.config import settings
+import asyncio
+import logging
+import math
+import time
+
+class LatencyHistogram:
+  """
+  Latency histogram with fixed buckets (in seconds, cumulative like Prometheus) plus a window
+  of recent samples used to compute percentiles.
+  """
+  BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, math.inf)
+
+  def __init__(self, window: int = 1000):
+    self.bucket_counts = [0] * len(self.BUCKETS)
+    self.count = 0
+    self.total = 0.0
+    self.recent: deque[float] = deque(maxlen=window)
+
+  def observe(self, seconds: float) -> None:
+    self.bucket_counts[bisect_left(self.BUCKETS, seconds)] += 1
+    self.count += 1
+    self.total += seconds
+    self.recent.append(seconds)
+
+  def percentile(self, point: float) -> Optional[float]:
+    """
+    Returns the given percentile of the recent samples, or None without samples.
+    """
+    if not self.recent:
+      return None
+    ordered = sorted(self.recent)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))]
+
+  def snapshot(self) -> dict[str, Any]:
+    cumulative, buckets = 0, {}
+    for bound, count in zip(self.BUCKETS, self.bucket_counts):
+      cumulative += count
+      buckets["+Inf" if math.isinf(bound) else str(bound)] = cumulative
+    return {
+      "count": self.count,
+      "sum": self.total,
+      "buckets": buckets,
+      **{f"p{point}": self.percentile(point) for point in (50, 95, 99)}
+    }
+
+class LLMLatencyTracker:
+  """
+  Records per-model LLM latencies ("first_token" for streamed calls, "response" for complete answers),
+  errors and timeouts, and how often hedges and failovers were needed.
+  """
+  def __init__(self):
+    self._histograms: dict[tuple[str, str], LatencyHistogram] = {}
+    self._model_counters: dict[str, dict[str, int]] = {}
+    self._counters = {"hedges": 0, "hedge_wins": 0, "failovers": 0, "failover_successes": 0}
+
+  def observe(self, model: str, kind: str, seconds: float) -> None:
+    self._histograms.setdefault((model, kind), LatencyHistogram()).observe(seconds)
+
+  def record_failure(self, model: str, timeout: bool) -> None:
+    counters = self._model_counters.setdefault(model, {"errors": 0, "timeouts": 0})
+    counters["timeouts" if timeout else "errors"] += 1
+
+  def count(self, event: str) -> None:
+    self._counters[event] += 1
+
+  def hedge_delay(self, model: str, kind: str) -> float:
+    """
+    Returns how long to wait on the model before hedging: settings.LLM_HEDGE_PERCENTILE of its recent latencies,
+    never below settings.LLM_HEDGE_MIN_DELAY, which is also used until settings.LLM_HEDGE_MIN_SAMPLES are recorded.
+    """
+    histogram = self._histograms.get((model, kind))
+    if histogram is None or len(histogram.recent) < settings.LLM_HEDGE_MIN_SAMPLES:
+      return settings.LLM_HEDGE_MIN_DELAY
+    return max(settings.LLM_HEDGE_MIN_DELAY, histogram.percentile(settings.LLM_HEDGE_PERCENTILE))
+
+  def metrics(self) -> dict[str, Any]:
+    models: dict[str, Any] = {}
+    for (model, kind), histogram in self._histograms.items():
+      models.setdefault(model, {})[kind] = histogram.snapshot()
+    for model, counters in self._model_counters.items():
+      models.setdefault(model, {}).update(counters)
+    return {**self._counters, "models": models}
+
+llm_latency_tracker = LLMLatencyTracker()
+
+def _get_model_name(model: BaseChatModel) -> str:
+  return getattr(model, "model_name", None) or type(model).__name__
+
+class HedgedChatModel(BaseChatModel):
+  """
+  Chat model that sends each request to the primary model and, if it has not answered (or, when streaming,
+  produced its first token) within its recent percentile latency, also to the secondary model, keeping whichever
+  answers first. Errors and timeouts of one model fail over to the other.
+
+  The two models are called through their own generation methods, without callbacks, so only the winning
+  answer reaches the callbacks (and the token stream) of this model.
+  """
+  primary: BaseChatModel
+  secondary: BaseChatModel
+  request_timeout: float = 30.0
+  hedge: bool = True
+
+  @property
+  def _llm_type(self) -> str:
+    return "hedged-chat"
+
+  def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+    """
+    Binds tools in the primary model's format; both models are expected to share it.
+    """
+    return self.bind(**self.primary.bind_tools(tools, **kwargs).kwargs)
+
+  def _generate(
+    self,
+    messages: list[BaseMessage],
+    stop: Optional[list[str]] = None,
+    run_manager: Optional[CallbackManagerForLLMRun] = None,
+    **kwargs: Any
+  ) -> ChatResult:
+    # Synchronous calls are not hedged, they only fail over
+    try:
+      return self.primary._generate(messages, stop=stop, **kwargs)
+    except Exception as e:
+      logging.warning(f"Primary LLM failed, failing over to the secondary LLM: {e}")
+      llm_latency_tracker.record_failure(_get_model_name(self.primary), timeout=False)
+      llm_latency_tracker.count("failovers")
+      result = self.secondary._generate(messages, stop=stop, **kwargs)
+      llm_latency_tracker.count("failover_successes")
+      return result
+
+  async def _agenerate(
+    self,
+    messages: list[BaseMessage],
+    stop: Optional[list[str]] = None,
+    run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    **kwargs: Any
+  ) -> ChatResult:
+    async def attempt(model: BaseChatModel) -> ChatResult:
+      return await self._timed(model, "response", model._agenerate(messages, stop=stop, **kwargs))
+
+    return await self._race(
+      lambda: attempt(self.primary),
+      lambda: attempt(self.secondary),
+      hedge_delay=llm_latency_tracker.hedge_delay(_get_model_name(self.primary), "response")
+    )
+
+  async def _astream(
+    self,
+    messages: list[BaseMessage],
+    stop: Optional[list[str]] = None,
+    run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    **kwargs: Any
+  ) -> AsyncIterator[ChatGenerationChunk]:
+    async def open_stream(model: BaseChatModel) -> tuple[BaseChatModel, AsyncIterator[ChatGenerationChunk], Optional[ChatGenerationChunk]]:
+      stream = model._astream(messages, stop=stop, **kwargs)
+      try:
+        first_chunk = await self._timed(model, "first_token", anext(stream, None))
+      except BaseException:
+        await stream.aclose()
+        raise
+      return model, stream, first_chunk
+
+    start = time.perf_counter()
+    model, stream, chunk = await self._race(
+      lambda: open_stream(self.primary),
+      lambda: open_stream(self.secondary),
+      hedge_delay=llm_latency_tracker.hedge_delay(_get_model_name(self.primary), "first_token"),
+      discard=lambda result: asyncio.ensure_future(result[1].aclose())
+    )
+    try:
+      # Past the first token the answer is already being shown, so errors are no longer failed over
+      while chunk is not None:
+        if run_manager:
+          await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+        yield chunk
+        chunk = await anext(stream, None)
+      llm_latency_tracker.observe(_get_model_name(model), "response", time.perf_counter() - start)
+    finally:
+      await stream.aclose()
+
+  async def _timed(self, model: BaseChatModel, kind: str, call: Awaitable[Any]) -> Any:
+    """
+    Awaits a model call under the request timeout, recording its latency or its failure.
+    """
+    start = time.perf_counter()
+    try:
+      result = await asyncio.wait_for(call, timeout=self.request_timeout)
+    except asyncio.TimeoutError:
+      llm_latency_tracker.record_failure(_get_model_name(model), timeout=True)
+      raise
+    except asyncio.CancelledError:
+      raise
+    except Exception:
+      llm_latency_tracker.record_failure(_get_model_name(model), timeout=False)
+      raise
+    llm_latency_tracker.observe(_get_model_name(model), kind, time.perf_counter() - start)
+    return result
+
+  async def _race(
+    self,
+    primary_attempt: Callable[[], Awaitable[Any]],
+    secondary_attempt: Callable[[], Awaitable[Any]],
+    hedge_delay: float,
+    discard: Optional[Callable[[Any], Any]] = None
+  ) -> Any:
+    """
+    Runs the primary attempt, starting the secondary one after hedge_delay (if hedging) or as soon as the primary fails.
+
+    Returns:
+      Any: The result of the first attempt that succeeds; the other one is cancelled, or discarded if it also succeeded.
+
+    Raises:
+      Exception: The last error, if both attempts fail.
+    """
+    tasks = {asyncio.create_task(primary_attempt()): "primary"}
+    secondary_started = False
+    error: Optional[BaseException] = None
+    try:
+      while tasks:
+        timeout = hedge_delay if self.hedge and not secondary_started else None
+        done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+          logging.info(f"Primary LLM slower than {hedge_delay:.2f} s, sending a hedge request.")
+          llm_latency_tracker.count("hedges")
+          tasks[asyncio.create_task(secondary_attempt())] = "hedge"
+          secondary_started = True
+          continue
+        winner = None
+        for task in done:
+          role = tasks.pop(task)
+          if task.exception() is not None:
+            error = task.exception()
+            logging.warning(f"LLM {role} request failed: {error!r}")
+            if not secondary_started:
+              llm_latency_tracker.count("failovers")
+              tasks[asyncio.create_task(secondary_attempt())] = "failover"
+              secondary_started = True
+          elif winner is None:
+            winner = task
+            if role != "primary":
+              llm_latency_tracker.count("hedge_wins" if role == "hedge" else "failover_successes")
+          elif discard is not None:
+            discard(task.result())
+        if winner is not None:
+          return winner.result()
+      raise error
+    finally:
+      for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is None:
+          if discard is not None:
+            discard(task.result())
+        else:
+          task.cancel()
@@ -0,0 +1,227 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Union
+from ecommerce_agent.application.services.rag.embeddings import EmbeddingsService, get_embeddings_service
+from ecommerce_agent.config import settings
+import asyncio
+import json
+import logging
+import threading
+import time
+
+NO_TOOL_LABEL = "none"
+
+def load_intent_examples(path: Union[str, Path]) -> tuple[list[str], list[str]]:
+  """
+  Loads the labelled routing examples, one JSON object per line with "text" and "label".
+  Labels are tool names, or "none" for messages the model should answer without a tool.
+
+  Returns:
+    tuple[list[str], list[str]]: The texts and their labels.
+  """
+  texts, labels = [], []
+  with open(path, encoding="utf-8") as file:
+    for line in file:
+      if line.strip():
+        example = json.loads(line)
+        texts.append(example["text"])
+        labels.append(example["label"])
+  return texts, labels
+
+def train_intent_classifier(embeddings: list[list[float]], labels: list[str]) -> Any:
+  """
+  Fits the intent classifier: a logistic regression over the query embeddings.
+
+  Returns:
+    LogisticRegression: The fitted scikit-learn classifier.
+  """
+  from sklearn.linear_model import LogisticRegression
+  classifier = LogisticRegression(max_iter=1000, C=10.0)
+  classifier.fit(embeddings, labels)
+  return classifier
+
+class IntentRouter:
+  """
+  Local classifier that picks the retriever tool for a user message from its embedding,
+  so clear-cut questions skip the tool-selection round trip to the LLM.
+
+  Modes (settings.INTENT_ROUTER_MODE):
+    - "off": never used.
+    - "shadow": predicts, and compares its confident predictions with the tool the LLM actually chose.
+    - "route": calls the predicted tool directly when the confidence reaches the threshold.
+  """
+  def __init__(
+    self,
+    model_path: Optional[Union[str, Path]] = None,
+    threshold: Optional[float] = None,
+    embeddings_service: Optional[EmbeddingsService] = None,
+    max_pending: Optional[int] = None
+  ):
+    """
+    Args:
+      model_path (Optional[Union[str, Path]]): The trained classifier. Defaults to settings.INTENT_ROUTER_MODEL_PATH.
+      threshold (Optional[float]): Minimum probability to act on a prediction. Defaults to settings.INTENT_ROUTER_THRESHOLD.
+      embeddings_service (Optional[EmbeddingsService]): Defaults to the shared embeddings service.
+      max_pending (Optional[int]): Predictions kept waiting for the LLM's selection, the oldest are dropped beyond it.
+        Defaults to settings.INTENT_ROUTER_MAX_PENDING.
+    """
+    self.model_path = Path(model_path or settings.INTENT_ROUTER_MODEL_PATH)
+    self.threshold = settings.INTENT_ROUTER_THRESHOLD if threshold is None else threshold
+    self._embeddings_service = embeddings_service
+    self._classifier: Optional[Any] = None
+    self._loaded = False
+    self._load_lock = threading.Lock()
+    self.max_pending = max_pending or settings.INTENT_ROUTER_MAX_PENDING
+    # Least recently predicted first, so the oldest are dropped when full
+    self._predictions: OrderedDict[str, tuple[str, float]] = OrderedDict()
+    self._shadow_tasks: dict[str, asyncio.Task] = {}
+    self._counters = {
+      "predictions": 0, "routed": 0, "fallbacks": 0, "router_seconds": 0.0,
+      "shadow_compared": 0, "shadow_agreed": 0, "llm_selections": 0, "llm_selection_seconds": 0.0
+    }
+
+  def load(self) -> bool:
+    """
+    Loads the classifier on first use.
+
+    Returns:
+      bool: Whether a usable classifier is available. Missing models, or models trained with another embedding model, disable routing.
+    """
+    with self._load_lock:
+      if self._loaded:
+        return self._classifier is not None
+      self._loaded = True
+      if not self.model_path.exists():
+        logging.warning(f"Intent router model not found at {self.model_path}; run scripts/train_intent_router.py. Routing disabled.")
+        return False
+      import joblib
+      artifact = joblib.load(self.model_path)
+      if artifact["embedding_model"] != settings.EMBEDDING_MODEL:
+        logging.warning(f"Intent router was trained with {artifact['embedding_model']}, not {settings.EMBEDDING_MODEL}. Routing disabled.")
+        return False
+      self._classifier = artifact["classifier"]
+      if self._embeddings_service is None:
+        self._embeddings_service = get_embeddings_service()
+      logging.info(f"Intent router loaded from {self.model_path} with labels {list(self._classifier.classes_)}.")
+      return True
+
+  def predict(self, text: str) -> tuple[str, float]:
+    """
+    Predicts the label of a message.
+
+    Returns:
+      tuple[str, float]: The most likely label and its probability.
+    """
+    probabilities = self._classifier.predict_proba([self._embeddings_service.embed_query(text)])[0]
+    best = probabilities.argmax()
+    return str(self._classifier.classes_[best]), float(probabilities[best])
+
+  async def aroute(self, key: str, text: str) -> Optional[str]:
+    """
+    Decides whether a message can skip the tool-selection call.
+
+    Args:
+      key (str): Identifies the turn, e.g. its thread_id.
+      text (str): The user message.
+
+    Returns:
+      Optional[str]: The tool to call directly, or None to let the LLM decide.
+    """
+    if not await asyncio.to_thread(self.load):
+      return None
+    start = time.perf_counter()
+    label, confidence = await asyncio.to_thread(self.predict, text)
+    self._counters["predictions"] += 1
+    self._counters["router_seconds"] += time.perf_counter() - start
+    confident = confidence >= self.threshold
+    if settings.INTENT_ROUTER_MODE == "route" and confident and label != NO_TOOL_LABEL:
+      self._counters["routed"] += 1
+      logging.info(f"Intent router sent the message to '{label}' ({confidence:.2f}).")
+      return label
+    self._counters["fallbacks"] += 1
+    if confident:
+      self._predictions[key] = (label, confidence)
+      self._predictions.move_to_end(key)
+      while len(self._predictions) > self.max_pending:
+        self._predictions.popitem(last=False)
+    return None
+
+  def start_shadow(self, key: str, text: str) -> None:
+    """
+    Predicts a message in the background, for shadow mode: the prediction runs next to the LLM call instead of
+    delaying it, and is compared with the LLM's selection once both are known. Must be called from the event loop.
+
+    Args:
+      key (str): Identifies the turn, e.g. its thread_id.
+      text (str): The user message.
+    """
+    previous = self._shadow_tasks.pop(key, None)
+    if previous is not None:
+      previous.cancel()
+    task = asyncio.create_task(self.aroute(key, text))
+    self._shadow_tasks[key] = task
+    task.add_done_callback(lambda task: self._finish_shadow(key, task))
+
+  def _finish_shadow(self, key: str, task: asyncio.Task) -> None:
+    if self._shadow_tasks.get(key) is task:
+      del self._shadow_tasks[key]
+    if not task.cancelled() and task.exception() is not None:
+      logging.error(f"Intent router shadow prediction failed: {task.exception()!r}")
+
+  def record_llm_selection(self, key: str, tool_names: list[str], elapsed: float) -> None:
+    """
+    Records the tool-selection call the LLM made for a turn the router did not handle:
+    its latency, the cost a routed turn saves, and whether it agrees with the router's prediction.
+
+    Args:
+      key (str): Identifies the turn.
+      tool_names (list[str]): The tools the LLM called, empty if it answered directly.
+      elapsed (float): Seconds the call took.
+    """
+    if tool_names:
+      self._counters["llm_selections"] += 1
+      self._counters["llm_selection_seconds"] += elapsed
+    shadow = self._shadow_tasks.get(key)
+    if shadow is not None:
+      # The shadow prediction is still running: compare once it is done
+      shadow.add_done_callback(lambda _: self._compare_with_llm(key, tool_names))
+    else:
+      self._compare_with_llm(key, tool_names)
+
+  def discard(self, key: str) -> None:
+    """
+    Forgets a turn whose LLM call failed, so its prediction is never compared.
+
+    Args:
+      key (str): Identifies the turn.
+    """
+    shadow = self._shadow_tasks.pop(key, None)
+    if shadow is not None:
+      shadow.cancel()
+    self._predictions.pop(key, None)
+
+  def _compare_with_llm(self, key: str, tool_names: list[str]) -> None:
+    prediction = self._predictions.pop(key, None)
+    if prediction is not None:
+      self._counters["shadow_compared"] += 1
+      chosen = tool_names[0] if tool_names else NO_TOOL_LABEL
+      self._counters["shadow_agreed"] += int(prediction[0] == chosen)
+
+  def metrics(self) -> dict[str, Any]:
+    """
+    Returns the routing counters, the agreement with the LLM on confident predictions,
+    and the estimated time saved: routed turns times the mean LLM tool-selection latency, minus the router's own time.
+    """
+    counters = self._counters
+    mean_llm_selection = counters["llm_selection_seconds"] / counters["llm_selections"] if counters["llm_selections"] else 0.0
+    return {
+      **counters,
+      "threshold": self.threshold,
+      "route_rate": counters["routed"] / counters["predictions"] if counters["predictions"] else 0.0,
+      "shadow_accuracy": counters["shadow_agreed"] / counters["shadow_compared"] if counters["shadow_compared"] else None,
+      "mean_router_ms": counters["router_seconds"] / counters["predictions"] * 1000 if counters["predictions"] else 0.0,
+      "mean_llm_selection_ms": mean_llm_selection * 1000,
+      "estimated_saved_seconds": counters["routed"] * mean_llm_selection - counters["router_seconds"]
+    }
+
+intent_router = IntentRouter()
@@ -1,28 +1,256 @@
 from typing import Any
-from langgraph.prebuilt import ToolNode
-from ecommerce_agent.application.services.conversation_service.workflow.chains import get_response_chain
+import asyncio
+import time
+import uuid
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, RemoveMessage, ToolMessage, get_buffer_string
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
+from ecommerce_agent.application.services.conversation_service.workflow.chains import get_response_chain, get_summary_chain
+from ecommerce_agent.application.services.conversation_service.workflow.intent_router import intent_router
+from ecommerce_agent.application.services.conversation_service.workflow.speculation import speculative_retriever
+from ecommerce_agent.application.services.conversation_service.workflow.tool_memo import tool_result_memo
 from ecommerce_agent.application.services.conversation_service.workflow.tools import tools
 from ecommerce_agent.application.services.conversation_service.workflow.state import ConversationState
+from ecommerce_agent.config import settings
+from ecommerce_agent.infrastructure.metrics import stage_duration, stage_errors, timed
 import logging
 
-tools_node = ToolNode(tools)
+tools_by_name = {tool.name: tool for tool in tools}
 
-async def conversation_node(state: ConversationState) -> dict[str, Any]:
+def _get_turn_key(config: RunnableConfig) -> str:
+  """
+  Returns the key identifying the current turn's speculative retrieval.
+  """
+  return str(config.get("configurable", {}).get("thread_id", ""))
+
+def _answer_dangling_tool_calls(messages: list[AnyMessage]) -> list[AnyMessage]:
+  """
+  Adds an error result right after every saved tool call that never got one, which happens when a turn
+  is cut off between the model call and the tools (a client disconnect, a cancellation or a crash).
+  The model API rejects a history with unanswered tool calls, so the conversation would fail on every later turn.
+
+  Args:
+    messages (list[AnyMessage]): The conversation messages, oldest first.
+
+  Returns:
+    list[AnyMessage]: The messages, with the missing tool results added.
+  """
+  answered = {message.tool_call_id for message in messages if isinstance(message, ToolMessage)}
+  repaired = []
+  for message in messages:
+    repaired.append(message)
+    if not isinstance(message, AIMessage):
+      continue
+    for tool_call in message.tool_calls:
+      if tool_call["id"] not in answered:
+        logging.warning(f"Tool call '{tool_call['name']}' ({tool_call['id']}) has no result, answering it with an error.")
+        repaired.append(ToolMessage(
+          content="Error: this tool call was interrupted before returning a result.",
+          name=tool_call["name"],
+          tool_call_id=tool_call["id"],
+          status="error"
+        ))
+  return repaired
+
+@timed("graph.conversation")
+async def conversation_node(state: ConversationState, config: RunnableConfig) -> dict[str, Any]:
   """
   Processes the conversation state and generates a response using the response chain.
+  With settings.SPECULATIVE_RETRIEVAL, retrieval on the user message starts at the same time as the model call.
 
   Args:
     state (ConversationState): The current conversation state, including messages.
+    config (RunnableConfig): The run configuration, holding the thread_id.
 
   Returns:
     dict: A dictionary containing the updated messages from the response chain.
   """
+  setup_start = time.perf_counter()
   response_chain = get_response_chain()
-  logging.info("Response chain successfully obtained for conversation node.")
-  response = await response_chain.ainvoke(
+  logging.info(f"Response chain obtained for conversation node in {(time.perf_counter() - setup_start) * 1000:.2f} ms.")
+  first_call = isinstance(state['messages'][-1], HumanMessage)
+  speculate = settings.SPECULATIVE_RETRIEVAL and first_call
+  if speculate:
+    speculative_retriever.start(_get_turn_key(config), state['messages'][-1].content)
+  call_start = time.perf_counter()
+  try:
+    response = await response_chain.ainvoke(
+      {
+        "messages": _answer_dangling_tool_calls(state['messages']),
+        "summary": state.get('summary', "")
+      }
+    )
+  except BaseException:
+    if speculate:
+      speculative_retriever.discard(_get_turn_key(config))
+    if first_call and settings.INTENT_ROUTER_MODE != "off":
+      intent_router.discard(_get_turn_key(config))
+    raise
+  logging.info("Response chain invoked for conversation node.")
+  if first_call and settings.INTENT_ROUTER_MODE != "off":
+    intent_router.record_llm_selection(
+      _get_turn_key(config),
+      [tool_call["name"] for tool_call in response.tool_calls],
+      time.perf_counter() - call_start
+    )
+  if speculate and not response.tool_calls:
+    speculative_retriever.discard(_get_turn_key(config))
+  return {"messages": response}
+
+@timed("graph.route")
+async def route_node(state: ConversationState, config: RunnableConfig) -> dict[str, Any]:
+  """
+  Asks the local intent router whether the user message clearly needs one of the retriever tools.
+  If so, the tool call is emitted here and the conversation node only runs once, to answer with the results.
+  In shadow mode the prediction is only measured, so it runs in the background next to the model call.
+
+  Args:
+    state (ConversationState): The current conversation state, whose last message is the user message.
+    config (RunnableConfig): The run configuration, holding the thread_id.
+
+  Returns:
+    dict: An AI message calling the routed tool with the user message as query, or nothing to let the model decide.
+  """
+  message = state['messages'][-1]
+  if not isinstance(message, HumanMessage):
+    return {}
+  if settings.INTENT_ROUTER_MODE == "shadow":
+    intent_router.start_shadow(_get_turn_key(config), message.content)
+    return {}
+  tool_name = await intent_router.aroute(_get_turn_key(config), message.content)
+  if tool_name is None:
+    return {}
+  return {
+    "messages": AIMessage(
+      content="",
+      tool_calls=[{"name": tool_name, "args": {"query": message.content}, "id": f"route_{uuid.uuid4().hex}"}]
+    )
+  }
+
+def _get_summary_cut_index(messages: list[AnyMessage]) -> int:
+  """
+  Returns how many of the oldest messages should be summarized.
+  About settings.MEMORY_KEEP_LAST_MESSAGES recent messages are kept, and the kept part always starts
+  at a user message so tool calls are never separated from their results.
+
+  Args:
+    messages (list[AnyMessage]): The conversation messages, oldest first.
+
+  Returns:
+    int: The number of leading messages to summarize, 0 if there is nothing to summarize.
+  """
+  start = max(0, len(messages) - settings.MEMORY_KEEP_LAST_MESSAGES)
+  for index in range(start, len(messages)):
+    if isinstance(messages[index], HumanMessage):
+      return index
+  for index in range(start - 1, 0, -1):
+    if isinstance(messages[index], HumanMessage):
+      return index
+  return 0
+
+@timed("graph.summarize")
+async def summarize_conversation_node(state: ConversationState) -> dict[str, Any]:
+  """
+  Folds older turns into the rolling summary once the history exceeds settings.MEMORY_MAX_TOKENS,
+  so the prompt sent to the main model stays bounded however long the conversation runs.
+
+  Args:
+    state (ConversationState): The current conversation state, including messages and summary.
+
+  Returns:
+    dict: The updated summary and the removal of the summarized messages, or nothing if under the threshold.
+  """
+  messages = state['messages']
+  if count_tokens_approximately(messages) <= settings.MEMORY_MAX_TOKENS:
+    return {}
+  cut_index = _get_summary_cut_index(messages)
+  if cut_index == 0:
+    return {}
+  logging.info(f"Summarizing {cut_index} older messages of the conversation.")
+  response = await get_summary_chain().ainvoke(
     {
-      "messages": state['messages']
+      "summary": state.get('summary', ""),
+      "conversation": get_buffer_string(messages[:cut_index])
     }
   )
-  logging.info("Response chain invoked for conversation node.")
-  return {"messages": response}
+  return {
+    "summary": response.content,
+    "messages": [RemoveMessage(id=message.id) for message in messages[:cut_index]]
+  }
+
+async def _run_tool_call(tool_call: dict[str, Any], semaphore: asyncio.Semaphore, turn_key: str) -> ToolMessage:
+  """
+  Runs a single tool call under the concurrency semaphore and times it.
+  A call already made in the thread returns its memoized result, and otherwise
+  the speculative retrieval of the turn is reused when it matches the call.
+
+  Args:
+    tool_call (dict[str, Any]): The tool call emitted by the model (name, args and id).
+    semaphore (asyncio.Semaphore): The semaphore limiting concurrent tool executions.
+    turn_key (str): The conversation thread, which keys the tool memo and the turn's speculative retrieval.
+
+  Returns:
+    ToolMessage: The tool result, with the elapsed time and whether it was memoized in its response metadata.
+  """
+  tool = tools_by_name.get(tool_call["name"])
+
+  async def run() -> str:
+    content = None
+    if settings.SPECULATIVE_RETRIEVAL:
+      content = await speculative_retriever.take(turn_key, tool_call["name"], tool_call["args"])
+    if content is None:
+      content = await tool.ainvoke(tool_call["args"])
+    return content
+
+  memoized = False
+  async with semaphore:
+    start = time.perf_counter()
+    try:
+      if tool is None:
+        raise ValueError(f"Tool '{tool_call['name']}' is not available. Valid tools: {', '.join(tools_by_name)}.")
+      if settings.TOOL_MEMO_ENABLED:
+        content, memoized = await tool_result_memo.get_or_run(turn_key, tool_call["name"], tool_call["args"], run)
+      else:
+        content = await run()
+      status = "success"
+    except Exception as e:
+      logging.error(f"Error running tool '{tool_call['name']}': {e}")
+      content = f"Error: {e!r}\n Please fix your mistakes."
+      status = "error"
+    elapsed_ms = (time.perf_counter() - start) * 1000
+  # Unknown tool names come from the model, so they share one stage to keep the label set bounded
+  stage = f"tool.{tool_call['name']}" if tool is not None else "tool.unknown"
+  stage_duration.observe(elapsed_ms / 1000, stage=stage)
+  if status == "error":
+    stage_errors.inc(stage=stage)
+  logging.info(f"Tool '{tool_call['name']}' finished with status '{status}' in {elapsed_ms:.1f} ms.")
+  return ToolMessage(
+    content=content,
+    name=tool_call["name"],
+    tool_call_id=tool_call["id"],
+    status=status,
+    response_metadata={"elapsed_ms": elapsed_ms, "memoized": memoized}
+  )
+
+@timed("graph.tools")
+async def tools_node(state: ConversationState, config: RunnableConfig) -> dict[str, Any]:
+  """
+  Executes every tool call from the last AI message concurrently, capped by settings.TOOLS_MAX_CONCURRENCY.
+
+  Args:
+    state (ConversationState): The current conversation state, whose last message holds the tool calls.
+    config (RunnableConfig): The run configuration, holding the thread_id.
+
+  Returns:
+    dict: A dictionary containing one ToolMessage per tool call, in the order the calls were emitted.
+  """
+  tool_calls = state['messages'][-1].tool_calls
+  semaphore = asyncio.Semaphore(max(1, settings.TOOLS_MAX_CONCURRENCY))
+  logging.info(f"Running {len(tool_calls)} tool calls with concurrency {settings.TOOLS_MAX_CONCURRENCY}.")
+  turn_key = _get_turn_key(config)
+  try:
+    tool_messages = await asyncio.gather(*(_run_tool_call(tool_call, semaphore, turn_key) for tool_call in tool_calls))
+  finally:
+    if settings.SPECULATIVE_RETRIEVAL:
+      speculative_retriever.discard(turn_key)
+  return {"messages": list(tool_messages)}
@@ -0,0 +1,164 @@
+from typing import Any, Optional
+from langchain_core.tools import BaseTool
+from ecommerce_agent.application.services.conversation_service.workflow.tools import tools
+from ecommerce_agent.config import settings
+import asyncio
+import logging
+import re
+import time
+
+class SpeculativeRetrieval:
+  """
+  The retrievals started speculatively for one conversation turn, one task per tool.
+  """
+  def __init__(self, query: str, tasks: dict[str, asyncio.Task]):
+    self.query = query
+    self.tasks = tasks
+    self.started_at = time.perf_counter()
+    self.finished_at: dict[str, float] = {}
+
+class SpeculativeRetriever:
+  """
+  Starts document and product retrieval on the raw user message while the model is still deciding
+  which tool to call, so a matching tool call finds its result ready (or already on its way).
+
+  A tool call matches a speculation when it targets the same tool with the default top_k and its query
+  has a token overlap (Jaccard) of at least `match_threshold` with the user message. Speculations that
+  are not used by the end of the turn are counted as wasted work. They are left to finish rather than cancelled:
+  the query runs in a worker thread that cancelling would not stop, so it holds its database connection either way.
+  """
+  def __init__(
+    self,
+    retriever_tools: list[BaseTool],
+    match_threshold: Optional[float] = None,
+    ttl: Optional[float] = None
+  ):
+    """
+    Args:
+      retriever_tools (list[BaseTool]): The tools to run speculatively, called with the user message as query.
+      match_threshold (Optional[float]): Minimum query similarity to reuse a result. Defaults to settings.SPECULATIVE_MATCH_THRESHOLD.
+      ttl (Optional[float]): Seconds after which an abandoned speculation is dropped. Defaults to settings.SPECULATIVE_TTL.
+    """
+    self.tools_by_name = {tool.name: tool for tool in retriever_tools}
+    self.match_threshold = settings.SPECULATIVE_MATCH_THRESHOLD if match_threshold is None else match_threshold
+    self.ttl = settings.SPECULATIVE_TTL if ttl is None else ttl
+    self._speculations: dict[str, SpeculativeRetrieval] = {}
+    self._counters = {
+      "turns": 0, "retrievals": 0, "hits": 0, "misses": 0, "wasted": 0,
+      "saved_seconds": 0.0, "wasted_seconds": 0.0
+    }
+    # Wasted retrievals whose query is still running
+    self._wasted_in_flight = 0
+
+  def start(self, key: str, query: str) -> None:
+    """
+    Starts one retrieval per tool for the turn identified by key.
+
+    Args:
+      key (str): Identifies the turn, e.g. its thread_id.
+      query (str): The raw user message.
+    """
+    self._drop_expired()
+    self.discard(key)
+    speculation = SpeculativeRetrieval(query, {})
+    for name, tool in self.tools_by_name.items():
+      task = asyncio.create_task(tool.ainvoke({"query": query}))
+      task.add_done_callback(lambda _, name=name: speculation.finished_at.setdefault(name, time.perf_counter()))
+      speculation.tasks[name] = task
+    self._speculations[key] = speculation
+    self._counters["turns"] += 1
+    self._counters["retrievals"] += len(speculation.tasks)
+    logging.info(f"Started speculative retrieval with {len(speculation.tasks)} tools.")
+
+  async def take(self, key: str, tool_name: str, args: dict[str, Any]) -> Optional[str]:
+    """
+    Returns the speculative result for a tool call, if one matches.
+
+    Args:
+      key (str): Identifies the turn.
+      tool_name (str): The tool requested by the model.
+      args (dict[str, Any]): The arguments requested by the model.
+
+    Returns:
+      Optional[str]: The prefetched tool output, or None if the call must run normally.
+    """
+    speculation = self._speculations.get(key)
+    task = speculation.tasks.get(tool_name) if speculation else None
+    if (
+      task is None
+      or args.get("top_k", 5) != 5
+      or self._similarity(speculation.query, args.get("query", "")) < self.match_threshold
+    ):
+      self._counters["misses"] += 1
+      return None
+    del speculation.tasks[tool_name]
+    # Time the retrieval had already been running for when the model asked for it
+    self._counters["saved_seconds"] += speculation.finished_at.get(tool_name, time.perf_counter()) - speculation.started_at
+    try:
+      result = await task
+    except asyncio.CancelledError:
+      # Only the speculative task was cancelled, not this tool call: run it instead
+      if asyncio.current_task().cancelling():
+        raise
+      logging.warning(f"Speculative '{tool_name}' retrieval was cancelled, running the tool call instead.")
+      self._counters["misses"] += 1
+      return None
+    except Exception as e:
+      logging.warning(f"Speculative '{tool_name}' retrieval failed, running the tool call instead: {e}")
+      self._counters["misses"] += 1
+      return None
+    self._counters["hits"] += 1
+    logging.info(f"Speculative '{tool_name}' retrieval reused.")
+    return result
+
+  def discard(self, key: str) -> None:
+    """
+    Ends the turn's speculation, counting as wasted the retrievals that were not used.
+    Those still running are counted in `wasted_in_flight` until their query finishes.
+    """
+    speculation = self._speculations.pop(key, None)
+    if speculation is None:
+      return
+    for name, task in speculation.tasks.items():
+      self._counters["wasted"] += 1
+      if task.done():
+        self._finish_wasted(speculation, name, task, in_flight=False)
+      else:
+        self._wasted_in_flight += 1
+        task.add_done_callback(lambda task, name=name: self._finish_wasted(speculation, name, task, in_flight=True))
+
+  def metrics(self) -> dict[str, Any]:
+    """
+    Returns the speculation counters with the hit rate (hits over retrievals started),
+    the share of speculative retrievals that were wasted and how many of those still hold a database connection.
+    """
+    retrievals = self._counters["retrievals"]
+    return {
+      **self._counters,
+      "in_progress": len(self._speculations),
+      "wasted_in_flight": self._wasted_in_flight,
+      "hit_rate": self._counters["hits"] / retrievals if retrievals else 0.0,
+      "wasted_rate": self._counters["wasted"] / retrievals if retrievals else 0.0
+    }
+
+  def _finish_wasted(self, speculation: SpeculativeRetrieval, name: str, task: asyncio.Task, in_flight: bool) -> None:
+    if in_flight:
+      self._wasted_in_flight -= 1
+    self._counters["wasted_seconds"] += speculation.finished_at.get(name, time.perf_counter()) - speculation.started_at
+    if not task.cancelled() and task.exception() is not None:
+      logging.warning(f"Wasted speculative '{name}' retrieval failed: {task.exception()}")
+
+  def _drop_expired(self) -> None:
+    now = time.perf_counter()
+    for key in [key for key, speculation in self._speculations.items() if now - speculation.started_at > self.ttl]:
+      self.discard(key)
+
+  @staticmethod
+  def _similarity(first: str, second: str) -> float:
+    first_tokens = set(re.findall(r"\w+", first.casefold()))
+    second_tokens = set(re.findall(r"\w+", second.casefold()))
+    if not first_tokens or not second_tokens:
+      return 0.0
+    return len(first_tokens & second_tokens) / len(first_tokens | second_tokens)
+
+speculative_retriever = SpeculativeRetriever(tools)
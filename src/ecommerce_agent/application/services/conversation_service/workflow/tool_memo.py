@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from ecommerce_agent.config import settings
+import asyncio
+import json
+import logging
+import re
+import time
+
+class ToolResultMemo:
+  """
+  Remembers tool results per conversation thread, keyed by tool name and normalized arguments,
+  so a repeated call (within a turn's tools/conversation loop or in a later turn) returns instantly.
+
+  Identical calls made at the same time share one execution. Only successful results are kept,
+  entries expire after `ttl` seconds, and both the threads and the entries per thread are bounded (LRU).
+  Every repeat is counted, per tool, to spot prompts that make the model loop.
+  """
+  def __init__(
+    self,
+    max_threads: Optional[int] = None,
+    max_entries_per_thread: Optional[int] = None,
+    ttl: Optional[float] = None
+  ):
+    """
+    Args:
+      max_threads (Optional[int]): Threads remembered. Defaults to settings.TOOL_MEMO_MAX_THREADS.
+      max_entries_per_thread (Optional[int]): Results remembered per thread. Defaults to settings.TOOL_MEMO_MAX_ENTRIES_PER_THREAD.
+      ttl (Optional[float]): Seconds a result stays valid. Defaults to settings.TOOL_MEMO_TTL.
+    """
+    self.max_threads = max_threads or settings.TOOL_MEMO_MAX_THREADS
+    self.max_entries_per_thread = max_entries_per_thread or settings.TOOL_MEMO_MAX_ENTRIES_PER_THREAD
+    self.ttl = settings.TOOL_MEMO_TTL if ttl is None else ttl
+    self._threads: OrderedDict[str, OrderedDict[str, tuple[float, asyncio.Task]]] = OrderedDict()
+    self._counters = {"calls": 0, "repeats": 0}
+    self._repeats_by_tool: dict[str, int] = {}
+
+  async def get_or_run(
+    self,
+    thread_id: str,
+    tool_name: str,
+    args: dict[str, Any],
+    run: Callable[[], Awaitable[str]]
+  ) -> tuple[str, bool]:
+    """
+    Returns the remembered result of the call, or runs it and remembers the result.
+
+    Args:
+      thread_id (str): The conversation thread.
+      tool_name (str): The tool called.
+      args (dict[str, Any]): The call arguments.
+      run (Callable[[], Awaitable[str]]): Runs the tool call.
+
+    Returns:
+      tuple[str, bool]: The tool result, and whether it came from the memo.
+
+    Raises:
+      Exception: Whatever the tool call raised. Failed calls are not remembered.
+    """
+    self._counters["calls"] += 1
+    entries = self._get_thread_entries(thread_id)
+    key = self._make_key(tool_name, args)
+    entry = entries.get(key)
+    if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+      entries.move_to_end(key)
+      self._counters["repeats"] += 1
+      self._repeats_by_tool[tool_name] = self._repeats_by_tool.get(tool_name, 0) + 1
+      logging.warning(f"Repeated '{tool_name}' call in thread {thread_id} with args {args}, returning the memoized result.")
+      try:
+        # Shielded so a cancelled caller does not cancel a call other callers are waiting for
+        return await asyncio.shield(entry[1]), True
+      except Exception:
+        pass
+    task = asyncio.ensure_future(run())
+    entries[key] = (time.monotonic(), task)
+    while len(entries) > self.max_entries_per_thread:
+      entries.popitem(last=False)
+    try:
+      return await asyncio.shield(task), False
+    except Exception:
+      if entries.get(key, (None, None))[1] is task:
+        del entries[key]
+      raise
+
+  def metrics(self) -> dict[str, Any]:
+    """
+    Returns the number of calls, how many were repeats (overall and per tool) and the memo size.
+    """
+    return {
+      **self._counters,
+      "repeat_rate": self._counters["repeats"] / self._counters["calls"] if self._counters["calls"] else 0.0,
+      "repeats_by_tool": dict(self._repeats_by_tool),
+      "threads": len(self._threads),
+      "entries": sum(len(entries) for entries in self._threads.values())
+    }
+
+  def _get_thread_entries(self, thread_id: str) -> OrderedDict[str, tuple[float, asyncio.Task]]:
+    entries = self._threads.pop(thread_id, None)
+    if entries is None:
+      entries = OrderedDict()
+    self._threads[thread_id] = entries
+    while len(self._threads) > self.max_threads:
+      self._threads.popitem(last=False)
+    return entries
+
+  @staticmethod
+  def _make_key(tool_name: str, args: dict[str, Any]) -> str:
+    """
+    Builds the memo key: string arguments are case-folded with whitespace and surrounding punctuation
+    collapsed, and the retriever tools' default top_k is filled in, so equivalent calls share a key.
+    """
+    normalized = {"top_k": 5}
+    for name, value in args.items():
+      if isinstance(value, str):
+        value = re.sub(r"\s+", " ", value.casefold()).strip(" ¿?¡!.,;:")
+      normalized[name] = value
+    return f"{tool_name}:{json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)}"
+
+tool_result_memo = ToolResultMemo()
@@ -1,3 +1,5 @@
+from typing import Optional
+from pydantic import PrivateAttr
 from langchain_core.tools import BaseTool
 from langchain_core.tools.base import ArgsSchema
 from ecommerce_agent.application.services.rag.document_retriever import DocumentRetrieverService
@@ -18,6 +20,15 @@ class DocumentRetrieverTool(BaseTool):
   description:str = "Retrieve documents from the knowledge base"
   args_schema:ArgsSchema = RetrieverInput
   return_direct:bool = True
+  _retriever_service: Optional[DocumentRetrieverService] = PrivateAttr(default=None)
+  
+  def _get_retriever_service(self) -> DocumentRetrieverService:
+    """
+    Returns the retriever service, creating it on first use so the embedding model is loaded once.
+    """
+    if self._retriever_service is None:
+      self._retriever_service = DocumentRetrieverService()
+    return self._retriever_service
   
   def _format_docs(self, docs: list[Document]) -> str:
     """
@@ -43,9 +54,25 @@ class DocumentRetrieverTool(BaseTool):
       str: A formatted string containing the content of the retrieved documents.
     """
     logging.info(f"Initiating document retrieval with query: '{query}'.")
-    docs = DocumentRetrieverService().retrieve_hybrid_documents(query, top_k)
+    docs = self._get_retriever_service().retrieve_hybrid_documents(query, top_k)
     logging.info(f"Document retrieval completed. Found {len(docs)} documents.") 
     return self._format_docs(docs)
+  
+  async def _arun(self, query: str, top_k: int = 5) -> str:
+    """
+    Asynchronously retrieves documents from the database based on a query.
+    
+    Args:
+      query (str): The query string to retrieve documents.
+      top_k (int): The maximum number of documents to retrieve. Defaults to 5.
+      
+    Returns:
+      str: A formatted string containing the content of the retrieved documents.
+    """
+    logging.info(f"Initiating async document retrieval with query: '{query}'.")
+    docs = await self._get_retriever_service().aretrieve_hybrid_documents(query, top_k)
+    logging.info(f"Async document retrieval completed. Found {len(docs)} documents.")
+    return self._format_docs(docs)
 
 class ProductRetrieverTool(BaseTool):
   """
@@ -58,6 +85,15 @@ class ProductRetrieverTool(BaseTool):
   description:str = "Retrieve products from the database"
   args_schema:ArgsSchema = RetrieverInput
   return_direct:bool = True
+  _retriever_service: Optional[ProductRetrieverService] = PrivateAttr(default=None)
+  
+  def _get_retriever_service(self) -> ProductRetrieverService:
+    """
+    Returns the retriever service, creating it on first use so the embedding model is loaded once.
+    """
+    if self._retriever_service is None:
+      self._retriever_service = ProductRetrieverService()
+    return self._retriever_service
   
   def _format_products(self, products: list[Product]) -> str:
     """
@@ -74,9 +110,22 @@ class ProductRetrieverTool(BaseTool):
       top_k (int): The maximum number of products to retrieve. Defaults to 5.
     """
     logging.info(f"Initiating product retrieval with query: '{query}'.")
-    products = ProductRetrieverService().retrieve_hybrid_products(query, top_k)
+    products = self._get_retriever_service().retrieve_hybrid_products(query, top_k)
     logging.info(f"Product retrieval completed. Found {len(products)} products.")
     return self._format_products(products)
+  
+  async def _arun(self, query: str, top_k: int = 5) -> str:
+    """
+    Asynchronously retrieves products from the database based on a query.
+    
+    Args:
+      query (str): The query string to retrieve products.
+      top_k (int): The maximum number of products to retrieve. Defaults to 5.
+    """
+    logging.info(f"Initiating async product retrieval with query: '{query}'.")
+    products = await self._get_retriever_service().aretrieve_hybrid_products(query, top_k)
+    logging.info(f"Async product retrieval completed. Found {len(products)} products.")
+    return self._format_products(products)
 
 tools = [DocumentRetrieverTool(), ProductRetrieverTool()]
 
@@ -1,8 +1,10 @@
-from typing import List, Dict, Optional
+from typing import List, Optional
 from ecommerce_agent.config import settings
 from ecommerce_agent.domain.document import Document
+from ecommerce_agent.infrastructure.metrics import timed
 from ecommerce_agent.application.services.base_service import BaseService
 from ecommerce_agent.infrastructure.database.postgresql.postgres_client import db_client, db_transaction
+from psycopg2.extras import execute_values
 import logging
 
 class DocumentService(BaseService):
@@ -95,6 +97,112 @@ class DocumentService(BaseService):
             logging.error(f"Error creating document: {e}")
             raise ValueError(f"Error creating document: {e}")
     
+    def create_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Creates several document records with a single multi-row INSERT.
+
+        Args:
+            documents (List[Document]): The Document objects to insert. Each must have content and an embedding.
+
+        Returns:
+            List[Document]: The created Document objects with their assigned IDs. Documents without content are skipped.
+
+        Raises:
+            ValueError: If an error occurs during database insertion.
+        """
+        documents = [document for document in documents if document.content is not None]
+        if not documents:
+            return []
+        rows = []
+        for document in documents:
+            document.content = self._sanitize_string_for_db(document.content)
+            document.window_content = self._sanitize_string_for_db(document.window_content or document.content)
+            document.source = self._sanitize_string_for_db(document.source)
+            embedding_str = f"[{','.join(map(str, document.embedding))}]"
+            rows.append((document.content, embedding_str, document.window_content, document.source))
+        query = """
+            INSERT INTO documents (content, embedding, window_content, source)
+            VALUES %s
+            RETURNING id
+        """
+        try:
+            with db_transaction() as conn:
+                cursor = conn.cursor()
+                ids = execute_values(cursor, query, rows, page_size=len(rows), fetch=True)
+                cursor.close()
+            for document, (document_id,) in zip(documents, ids):
+                document.id = document_id
+            logging.info(f"{len(documents)} documents created successfully.")
+            return documents
+        except Exception as e:
+            logging.error(f"Error creating documents: {e}")
+            raise ValueError(f"Error creating documents: {e}")
+    
+    def delete_documents(self, document_ids: List[int]) -> None:
+        """
+        Deletes document records by their IDs.
+
+        Args:
+            document_ids (List[int]): The IDs of the documents to delete.
+
+        Raises:
+            ValueError: If an error occurs during deletion.
+        """
+        if not document_ids:
+            return
+        query = """
+            DELETE FROM documents WHERE id = ANY(%s)
+        """
+        try:
+            self.db_client.execute_query(query, (list(document_ids),))
+            logging.info(f"{len(document_ids)} documents deleted successfully.")
+        except Exception as e:
+            logging.error(f"Error deleting documents: {e}")
+            raise ValueError(f"Error deleting documents: {e}")
+    
+    def get_sources(self) -> List[str]:
+        """
+        Retrieves the distinct sources of the stored documents.
+
+        Returns:
+            List[str]: The sources, as they were stored.
+
+        Raises:
+            ValueError: If an error occurs during retrieval.
+        """
+        query = """
+            SELECT DISTINCT source FROM documents WHERE source IS NOT NULL
+        """
+        try:
+            results = self.db_client.execute_query(query, fetch_all=True)
+            return [result['source'] for result in results or []]
+        except Exception as e:
+            logging.error(f"Error retrieving document sources: {e}")
+            raise ValueError(f"Error retrieving document sources: {e}")
+
+    def delete_documents_by_source(self, sources: List[str], keep_ids: Optional[List[int]] = None) -> None:
+        """
+        Deletes the document records of the given sources.
+
+        Args:
+            sources (List[str]): The sources whose documents are deleted, as they were stored.
+            keep_ids (Optional[List[int]]): IDs of documents of those sources that are kept. Defaults to None.
+
+        Raises:
+            ValueError: If an error occurs during deletion.
+        """
+        if not sources:
+            return
+        query = """
+            DELETE FROM documents WHERE source = ANY(%s) AND NOT (id = ANY(%s))
+        """
+        try:
+            self.db_client.execute_query(query, (list(sources), list(keep_ids or [])))
+            logging.info(f"Documents of {len(sources)} sources deleted successfully.")
+        except Exception as e:
+            logging.error(f"Error deleting documents by source: {e}")
+            raise ValueError(f"Error deleting documents by source: {e}")
+
     def get_document_by_id(self, document_id: int) -> Document:
         """
         Retrieves a document from the database by its ID.
@@ -133,6 +241,7 @@ class DocumentService(BaseService):
             raise ValueError(f"Error retrieving document: {e}")
             
 
+    @timed("documents.vector_search")
     def retrieve_similar_documents(self, query_embedding: List[float], top_k: int = 5) -> List[Document]:
         """
         Retrieves documents semantically similar to the given query embedding.
@@ -179,6 +288,7 @@ class DocumentService(BaseService):
             logging.error(f"Error searching for similar documents: {e}")
             raise ValueError(f"Error searching for similar documents: {e}")
 
+    @timed("documents.text_search")
     def retrieve_text_search_documents(self, query_text: str, top_k: int = 5) -> List[Document]:
         """
         Retrieves documents matching the given text query using BM25.
@@ -225,6 +335,7 @@ class DocumentService(BaseService):
             logging.error(f"Error in text search: {e}")
             raise ValueError(f"Error searching documents by text: {e}")
             
+    @timed("documents.hybrid_search")
     def retrieve_hybrid_documents(self, query_embedding: List[float], query_text: str, top_k: int = 5) -> List[Document]:
         """
         Performs a hybrid search (semantic + full-text) and merges the results using Reciprocal Rank Fusion (RRF).
@@ -243,34 +354,104 @@ class DocumentService(BaseService):
         text_results = self.retrieve_text_search_documents(query_text, top_k=top_k * 2) # Get more for fusion
         logging.info("Hybrid document retrieval initiated.")
 
-        reranked_scores: Dict[int, float] = {}
-        documents_by_id: Dict[int, Document] = {}
-        k = 60
-
-        # Process semantic results
-        for i, doc in enumerate(semantic_results):
-            doc_id = doc.id
-            documents_by_id[doc_id] = doc
-            reranked_scores[doc_id] = reranked_scores.get(doc_id, 0.0) + 1.0 / (k + i + 1)
-
-        # Process text results
-        for i, doc in enumerate(text_results):
-            doc_id = doc.id
-            documents_by_id[doc_id] = doc
-            reranked_scores[doc_id] = reranked_scores.get(doc_id, 0.0) + 1.0 / (k + i + 1)
-
-        # Sort documents by their combined RRF score (from highest to lowest)
-        sorted_doc_ids = sorted(reranked_scores.keys(), key=lambda doc_id: reranked_scores[doc_id], reverse=True)
-
-        # Reconstruct the final list of documents
-        hybrid_documents: List[Document] = []
-        for doc_id in sorted_doc_ids:
-            if len(hybrid_documents) >= top_k:
-                break
-            hybrid_documents.append(documents_by_id[doc_id])
-        
-        for doc in hybrid_documents:
-            setattr(doc, 'rrf_score', reranked_scores[doc.id])
+        hybrid_documents = self._reciprocal_rank_fusion(semantic_results, text_results, top_k)
 
         logging.info(f"Successfully retrieved {len(hybrid_documents)} hybrid documents.")
-        return hybrid_documents
\ No newline at end of file
+        return hybrid_documents
+
+    def _build_document(self, result: dict) -> Document:
+        """
+        Builds a Document object from a database row.
+
+        Args:
+            result (dict): A row from the documents table.
+
+        Returns:
+            Document: The Document object built from the row.
+        """
+        embedding = [float(x) for x in result['embedding'][1:-1].split(',')] if isinstance(result['embedding'], str) else result['embedding']
+        return Document(
+            id=result['id'],
+            content=result['content'],
+            embedding=embedding,
+            window_content=result.get('window_content'),
+            source=result.get('source')
+        )
+
+    @timed("documents.hybrid_search_batch")
+    def retrieve_hybrid_documents_batch(self, query_embeddings: List[List[float]], query_texts: List[str], top_k: int = 5) -> List[List[Document]]:
+        """
+        Performs a hybrid search (semantic + full-text) for several queries in a single database round trip
+        and merges the results of each query using Reciprocal Rank Fusion (RRF).
+
+        The semantic half runs as a LATERAL join over the unnested query embeddings, while the BM25 half
+        is appended as one parameterized subquery per query so ParadeDB can still use its index.
+
+        Args:
+            query_embeddings (List[List[float]]): The embedding vectors for semantic search, one per query.
+            query_texts (List[str]): The text query strings for full-text search, one per query.
+            top_k (int): The maximum number of combined documents to retrieve per query. Defaults to 5.
+
+        Returns:
+            List[List[Document]]: One list of hybrid Document results per query, in the same order as the input.
+
+        Raises:
+            ValueError: If the inputs have different lengths or an error occurs during the search.
+        """
+        if len(query_embeddings) != len(query_texts):
+            raise ValueError("query_embeddings and query_texts must have the same length.")
+        if not query_texts:
+            return []
+
+        candidates_k = top_k * 2 # Get more for fusion
+        embedding_strs = [f"[{ ','.join(map(str, embedding)) }]" for embedding in query_embeddings]
+        semantic_query = """
+            (SELECT q.query_index, 'semantic' AS mode, d.id, d.content, d.embedding, d.window_content, d.source,
+                    d.distance, NULL::float8 AS rank
+            FROM unnest(%s::vector[]) WITH ORDINALITY AS q(query_embedding, query_index)
+            CROSS JOIN LATERAL (
+                SELECT id, content, embedding, window_content, source, embedding <=> q.query_embedding AS distance
+                FROM documents
+                ORDER BY distance
+                LIMIT %s
+            ) d)
+        """
+        text_query = """
+            (SELECT %s::bigint AS query_index, 'text' AS mode, id, content, embedding, window_content, source,
+                    NULL::float8 AS distance, paradedb.score(id)::float8 AS rank
+            FROM documents
+            WHERE id @@@ paradedb.with_index('documents_search_idx', paradedb.match('content', %s))
+            ORDER BY rank DESC
+            LIMIT %s)
+        """
+        query = " UNION ALL ".join([semantic_query] + [text_query] * len(query_texts)) + """
+            ORDER BY query_index, mode, distance ASC NULLS LAST, rank DESC NULLS LAST
+        """
+        params: list = [embedding_strs, candidates_k]
+        for query_index, query_text in enumerate(query_texts, start=1):
+            params.extend([query_index, self._sanitize_string_for_db(query_text), candidates_k])
+
+        try:
+            results = self.db_client.execute_query(query, tuple(params), fetch_all=True) or []
+        except Exception as e:
+            logging.error(f"Error in batch hybrid search: {e}")
+            raise ValueError(f"Error in batch hybrid search: {e}")
+
+        semantic_results: List[List[Document]] = [[] for _ in query_texts]
+        text_results: List[List[Document]] = [[] for _ in query_texts]
+        for result in results:
+            doc = self._build_document(result)
+            query_index = result['query_index'] - 1
+            if result['mode'] == 'semantic':
+                setattr(doc, 'semantic_distance', result['distance'])
+                semantic_results[query_index].append(doc)
+            else:
+                setattr(doc, 'text_rank', result['rank'])
+                text_results[query_index].append(doc)
+
+        hybrid_documents = [
+            self._reciprocal_rank_fusion(semantic, text, top_k)
+            for semantic, text in zip(semantic_results, text_results)
+        ]
+        logging.info(f"Successfully retrieved hybrid documents for {len(query_texts)} queries in one round trip.")
+        return hybrid_documents
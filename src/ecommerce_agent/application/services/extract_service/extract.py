@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Iterator
 from ecommerce_agent.application.services.extract_service.loader import LoaderService
 from ecommerce_agent.application.services.extract_service.splitter import SplitterService
 from ecommerce_agent.domain.document import Document
@@ -30,4 +31,16 @@ class ExtractService:
     logging.info(f"Successfully split documents into {len(chunks)} chunks.")
     return chunks
   
-  
\ No newline at end of file
+  def iter_extract_documents(self, directory: Path) -> Iterator[Document]:
+    """
+    Streams processed chunks from a directory, loading and splitting one page at a time.
+
+    Args:
+      directory (Path): The path to the directory containing the documents.
+
+    Yields:
+      Document: Each processed chunk with its window content and source.
+    """
+    logging.info(f"Starting streaming document extraction from directory: {directory}")
+    for document in self.loader_service.iter_documents(directory):
+      yield from self.splitter_service.split_document(document)
@@ -1,19 +1,31 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
+from typing import Iterator
+import os
 from langchain_community.document_loaders import DirectoryLoader
 from langchain_community.document_loaders import TextLoader
 from langchain_community.document_loaders import PyPDFLoader
 import logging
 from langchain_core.documents import Document
+from ecommerce_agent.application.services.extract_service.pdf_parser import count_pdf_pages, parse_pdf_pages
+from ecommerce_agent.config import settings
 
 class LoaderService:
   """
   Service for loading documents from a directory.
+
+  PDFs are parsed with the DirectoryLoader threads by default. With settings.PDF_LOADER_MODE set to
+  "process" they are parsed in a process pool instead, since PDF text extraction is CPU-bound.
   """
-  def __init__(self):
+  def __init__(self, pdf_loader_mode: str = None):
     """
     Initializes the LoaderService.
+
+    Args:
+      pdf_loader_mode (str, optional): "thread" or "process". Defaults to settings.PDF_LOADER_MODE.
     """
-    pass
+    self.pdf_loader_mode = pdf_loader_mode if pdf_loader_mode is not None else settings.PDF_LOADER_MODE
+    self.pdf_parse_seconds: dict[str, float] = {}
   
   def get_txt_loader(self, directory: Path) -> DirectoryLoader:
     """
@@ -87,10 +99,137 @@ class LoaderService:
     txt_loader, pdf_loader = self.get_loaders(directory)
     logging.info(f"Loading documents from directory: {directory}")
     txt_documents = txt_loader.load()
-    pdf_documents = pdf_loader.load()
+    if self.pdf_loader_mode == "process":
+      pdf_documents = list(self.iter_pdf_documents_parallel(sorted(Path(directory).glob("**/*.pdf"))))
+    else:
+      pdf_documents = pdf_loader.load()
     documents.extend(txt_documents)
     documents.extend(pdf_documents)
     logging.info(f"Finished loading. Loaded {len(documents)} documents in total.")
     return documents
   
-  
\ No newline at end of file
+  def iter_document_paths(self, directory: Path) -> Iterator[Path]:
+    """
+    Yields the paths of all supported documents (text and PDF) under a directory, text files first.
+
+    Args:
+      directory (Path): The path to the directory containing documents.
+
+    Yields:
+      Path: The path of each supported document, in a stable order.
+    """
+    for pattern in ("**/*.txt", "**/*.pdf"):
+      yield from sorted(Path(directory).glob(pattern))
+  
+  def iter_file_documents(self, path: Path) -> Iterator[Document]:
+    """
+    Lazily loads the pages of a single text or PDF file.
+
+    Args:
+      path (Path): The path of the file to load.
+
+    Yields:
+      Document: Each loaded LangChain Document (one per page for PDFs).
+    """
+    if path.suffix.lower() == ".pdf":
+      loader = PyPDFLoader(str(path))
+    else:
+      loader = TextLoader(str(path), autodetect_encoding=True)
+    yield from loader.lazy_load()
+  
+  def iter_documents(self, directory: Path) -> Iterator[Document]:
+    """
+    Lazily loads all supported documents (text and PDF) from a directory, one page at a time,
+    so callers never hold the whole corpus in memory.
+
+    Args:
+      directory (Path): The path to the directory from which to load documents.
+
+    Yields:
+      Document: Each loaded LangChain Document.
+    """
+    logging.info(f"Streaming documents from directory: {directory}")
+    yield from self.iter_files_documents(list(self.iter_document_paths(directory)))
+  
+  def iter_files_documents(self, paths: list[Path]) -> Iterator[Document]:
+    """
+    Lazily loads the given text and PDF files, one page at a time.
+    In "process" mode the PDFs are parsed in parallel after the text files.
+
+    Args:
+      paths (list[Path]): The paths of the files to load.
+
+    Yields:
+      Document: Each loaded LangChain Document.
+    """
+    if self.pdf_loader_mode != "process":
+      for path in paths:
+        yield from self.iter_file_documents(Path(path))
+      return
+    pdf_paths = [Path(path) for path in paths if Path(path).suffix.lower() == ".pdf"]
+    for path in paths:
+      if Path(path).suffix.lower() != ".pdf":
+        yield from self.iter_file_documents(Path(path))
+    yield from self.iter_pdf_documents_parallel(pdf_paths)
+  
+  def _get_pdf_parse_workers(self) -> int:
+    """
+    Returns the number of PDF parsing processes: settings.PDF_PARSE_WORKERS, or the available cores when it is 0.
+    """
+    if settings.PDF_PARSE_WORKERS > 0:
+      return settings.PDF_PARSE_WORKERS
+    if hasattr(os, "sched_getaffinity"):
+      return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+  
+  def iter_pdf_documents_parallel(self, pdf_paths: list[Path]) -> Iterator[Document]:
+    """
+    Parses PDF files in a process pool and streams pages back as they complete.
+    Large files are split into ranges of settings.PDF_PAGES_PER_TASK pages so they are parsed in parallel too.
+    Per-file parse time (summed over its page ranges) is logged and kept in `pdf_parse_seconds`.
+
+    Args:
+      pdf_paths (list[Path]): The paths of the PDF files to parse.
+
+    Yields:
+      Document: One LangChain Document per page, in completion order.
+    """
+    paths = [str(path) for path in pdf_paths]
+    if not paths:
+      return
+    workers = self._get_pdf_parse_workers()
+    pages_per_task = max(1, settings.PDF_PAGES_PER_TASK)
+    self.pdf_parse_seconds = {path: 0.0 for path in paths}
+    logging.info(f"Parsing {len(paths)} PDF files with {workers} processes.")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+      page_counts = dict(zip(paths, executor.map(count_pdf_pages, paths)))
+      tasks = [
+        (path, start_page, start_page + pages_per_task)
+        for path, page_count in page_counts.items()
+        for start_page in range(0, max(page_count, 1), pages_per_task)
+      ]
+      pending_tasks = {path: 0 for path in paths}
+      for path, _, _ in tasks:
+        pending_tasks[path] += 1
+      # Only a few tasks per worker are in flight, so parsed pages do not pile up ahead of a slow consumer
+      task_iter = iter(tasks)
+      in_flight = set()
+      while True:
+        for path, start_page, end_page in task_iter:
+          in_flight.add(executor.submit(parse_pdf_pages, path, start_page, end_page))
+          if len(in_flight) >= 2 * workers:
+            break
+        if not in_flight:
+          break
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+          path, pages, total_pages, elapsed = future.result()
+          self.pdf_parse_seconds[path] += elapsed
+          pending_tasks[path] -= 1
+          if pending_tasks[path] == 0:
+            logging.info(f"Parsed {path} ({total_pages} pages) in {self.pdf_parse_seconds[path]:.2f}s.")
+          for page_number, text in pages:
+            yield Document(
+              page_content=text,
+              metadata={"source": path, "page": page_number, "total_pages": total_pages}
+            )
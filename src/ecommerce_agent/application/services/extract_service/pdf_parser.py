@@ -0,0 +1,33 @@
+from pypdf import PdfReader
+import time
+
+def count_pdf_pages(path: str) -> int:
+  """
+  Returns the number of pages of a PDF file without extracting its text.
+
+  Args:
+    path (str): The path of the PDF file.
+
+  Returns:
+    int: The number of pages in the file.
+  """
+  return len(PdfReader(path).pages)
+
+def parse_pdf_pages(path: str, start_page: int, end_page: int) -> tuple[str, list[tuple[int, str]], int, float]:
+  """
+  Extracts the text of a range of pages of a PDF file.
+  This function runs inside worker processes, so it only depends on pypdf and returns plain data.
+
+  Args:
+    path (str): The path of the PDF file.
+    start_page (int): The first page to extract (0-based, inclusive).
+    end_page (int): The last page to extract (0-based, exclusive).
+
+  Returns:
+    tuple[str, list[tuple[int, str]], int, float]: The path, the (page number, text) pairs,
+    the total number of pages in the file and the seconds spent parsing.
+  """
+  start = time.perf_counter()
+  reader = PdfReader(path)
+  pages = [(page_number, reader.pages[page_number].extract_text()) for page_number in range(start_page, min(end_page, len(reader.pages)))]
+  return path, pages, len(reader.pages), time.perf_counter() - start
@@ -1,4 +1,6 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 from langchain_core.documents import Document
 from ecommerce_agent.domain.document import Document as DocumentDomain
 from ecommerce_agent.config import settings
@@ -7,9 +9,13 @@ import logging
 class SplitterService:
     """
     Service for splitting documents into smaller chunks and adding window context metadata.
+
+    Every document is split independently. Chunks are tracked as (start, end) offsets into the
+    document text while splitting, so the context window of a chunk is a constant-time slice
+    around those offsets and repeated text always maps to the right place.
     """
-    def __init__(self, small_chunk_size: int = None, small_chunk_overlap: int = None, 
-                window_size: int = None, window_overlap: int = None):
+    def __init__(self, small_chunk_size: int = None, small_chunk_overlap: int = None,
+                window_size: int = None, window_overlap: int = None, max_workers: int = None):
         """
         Initializes the SplitterService with parameters for small chunks and window context.
 
@@ -18,8 +24,9 @@ class SplitterService:
             small_chunk_overlap (int, optional): The overlap between small chunks. Defaults to settings.SMALL_CHUNK_OVERLAP.
             window_size (int, optional): The size of the context window for retrieval. Defaults to settings.WINDOW_SIZE.
             window_overlap (int, optional): The overlap for the context window. Defaults to settings.WINDOW_OVERLAP.
+            max_workers (int, optional): The number of processes used to split documents in parallel. Defaults to settings.SPLITTER_MAX_WORKERS.
         """
-        
+
         # Sizes for "small chunks" (for searching)
         self.small_chunk_size = small_chunk_size if small_chunk_size is not None else settings.SMALL_CHUNK_SIZE
         self.small_chunk_overlap = small_chunk_overlap if small_chunk_overlap is not None else settings.SMALL_CHUNK_OVERLAP
@@ -27,70 +34,147 @@ class SplitterService:
         # Sizes for context "windows" (for retrieval)
         self.window_size = window_size if window_size is not None else settings.WINDOW_SIZE
         self.window_overlap = window_overlap if window_overlap is not None else settings.WINDOW_OVERLAP
-        
+
+        # Number of processes used by split_documents
+        self.max_workers = max_workers if max_workers is not None else settings.SPLITTER_MAX_WORKERS
+
         # Common separators for text
         self.separators = ["\n\n", "\n", ". ", "? ", "! ", " "]
-        
-        # Initialize the splitter for small chunks
-        self._set_small_chunk_splitter()
-        
-        # Initialize an auxiliary splitter to calculate context windows
-        self._set_window_splitter()
 
-    def _set_small_chunk_splitter(self) -> None:
+    def _split_pieces(self, text: str, start: int, end: int, separator: str) -> list[tuple[int, int]]:
         """
-        Configures the splitter for small chunks used for search.
+        Splits text[start:end] into contiguous spans ending right after each separator.
+        Without a separator the range is cut into spans of at most small_chunk_size characters.
+
+        Args:
+            text (str): The full document text.
+            start (int): The start offset of the range to split.
+            end (int): The end offset of the range to split.
+            separator (str): The separator to split on.
+
+        Returns:
+            list[tuple[int, int]]: The (start, end) offsets of every piece, covering the whole range.
         """
-        self.small_chunk_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.small_chunk_size, 
-            chunk_overlap=self.small_chunk_overlap, 
-            separators=self.separators
-        )
+        if not separator:
+            return [(i, min(i + self.small_chunk_size, end)) for i in range(start, end, self.small_chunk_size)]
+        pieces = []
+        position = start
+        while position < end:
+            index = text.find(separator, position, end)
+            if index == -1:
+                pieces.append((position, end))
+                break
+            pieces.append((position, index + len(separator)))
+            position = index + len(separator)
+        return pieces
 
-    def _set_window_splitter(self) -> None:
+    def _split_spans(self, text: str, start: int, end: int, separators: list[str]) -> list[tuple[int, int]]:
         """
-        Configures an auxiliary splitter to obtain context windows.
+        Recursively splits text[start:end] into chunk spans of at most small_chunk_size characters,
+        merging neighbouring pieces and keeping up to small_chunk_overlap characters of overlap.
+
+        Args:
+            text (str): The full document text.
+            start (int): The start offset of the range to split.
+            end (int): The end offset of the range to split.
+            separators (list[str]): The separators to try, from coarsest to finest.
+
+        Returns:
+            list[tuple[int, int]]: The (start, end) offsets of every chunk, in document order.
         """
-        # We use a chunk_overlap of 0 for windows to avoid excessive duplication,
-        # since the window itself is already a context around a central point.
-        # The chunk_size will be the desired total window size.
-        self.window_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.window_size,
-            chunk_overlap=self.window_overlap,
-            separators=self.separators
-        )
-    
-    def _get_document_text(self, documents: list[Document]) -> str:
+        separator, remaining_separators = "", []
+        for i, candidate in enumerate(separators):
+            if text.find(candidate, start, end) != -1:
+                separator, remaining_separators = candidate, separators[i + 1:]
+                break
+
+        chunks: list[tuple[int, int]] = []
+        window: deque[tuple[int, int]] = deque()
+        for piece_start, piece_end in self._split_pieces(text, start, end, separator):
+            if piece_end - piece_start > self.small_chunk_size:
+                # Too large on its own: flush the current chunk and split the piece with finer separators
+                if window:
+                    chunks.append((window[0][0], window[-1][1]))
+                    window.clear()
+                chunks.extend(self._split_spans(text, piece_start, piece_end, remaining_separators))
+                continue
+            if window and piece_end - window[0][0] > self.small_chunk_size:
+                chunks.append((window[0][0], window[-1][1]))
+                # Keep trailing pieces as overlap while they fit alongside the new piece
+                while window and (window[-1][1] - window[0][0] > self.small_chunk_overlap
+                                  or piece_end - window[0][0] > self.small_chunk_size):
+                    window.popleft()
+            window.append((piece_start, piece_end))
+        if window:
+            chunks.append((window[0][0], window[-1][1]))
+        return chunks
+
+    def _iter_chunk_spans(self, text: str) -> Iterator[tuple[int, int]]:
         """
-        Extracts and concatenates the text content from a list of LangChain Document objects.
+        Yields the offsets of the non-empty chunks of a text, trimmed of surrounding whitespace.
 
         Args:
-            documents (list[Document]): A list of LangChain Document objects.
+            text (str): The document text.
+
+        Yields:
+            tuple[int, int]: The (start, end) offsets of each chunk.
+        """
+        for start, end in self._split_spans(text, 0, len(text), self.separators):
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                yield start, end
+
+    def _get_window_bounds(self, start: int, end: int, text_length: int) -> tuple[int, int]:
+        """
+        Computes the context window around a chunk in constant time.
+
+        Args:
+            start (int): The start offset of the chunk.
+            end (int): The end offset of the chunk.
+            text_length (int): The length of the document text.
 
         Returns:
-            str: A single string containing the concatenated text content of all documents.
+            tuple[int, int]: The (start, end) offsets of the context window.
         """
-        return "\n\n".join([doc.page_content for doc in documents])
-    
-    def create_document(self, document: Document) -> DocumentDomain:
+        padding = (self.window_size - self.small_chunk_size) // 2
+        window_start = max(0, start - padding)
+        window_end = min(text_length, end + padding)
+
+        # Ensure the window is at least the size of the small_chunk
+        if (window_end - window_start) < self.small_chunk_size:
+            window_start = max(0, end - self.window_size)
+            window_end = min(text_length, start + self.window_size)
+        return window_start, window_end
+
+    def split_document(self, document: Document) -> list[DocumentDomain]:
         """
-        Creates a domain-specific Document object from a LangChain Document object.
+        Splits a single document into "small chunks" with their context window and source.
 
         Args:
-            document (Document): A LangChain Document object.
+            document (Document): A LangChain Document object to be split.
 
         Returns:
-            DocumentDomain: A domain-specific Document object with content, window_content, and source.
+            list[DocumentDomain]: A list of domain-specific Document objects, one per small chunk.
         """
-        return DocumentDomain(
-            content=document.page_content,
-            window_content=document.metadata.get("window_content"),
-            source=document.metadata.get("source")
-        )
+        text = document.page_content
+        source = document.metadata.get("source")
+        chunks = []
+        for start, end in self._iter_chunk_spans(text):
+            window_start, window_end = self._get_window_bounds(start, end, len(text))
+            chunks.append(DocumentDomain(
+                content=text[start:end],
+                window_content=text[window_start:window_end],
+                source=source
+            ))
+        return chunks
 
     def split_documents(self, documents: list[Document]) -> list[DocumentDomain]:
         """
         Splits documents into "small chunks" and adds window context metadata to each chunk.
+        Documents are processed independently, in parallel processes when max_workers > 1.
 
         Args:
             documents (list[Document]): A list of LangChain Document objects to be split.
@@ -99,44 +183,26 @@ class SplitterService:
             list[DocumentDomain]: A list of domain-specific Document objects, each representing
                                 a small chunk with its associated window content and source.
         """
-        all_small_chunks = []
-        full_text = self._get_document_text(documents)
         logging.info(f"Starting document splitting for {len(documents)} documents.")
-        # 1. Generate "small chunks"
-        small_chunks = self.small_chunk_splitter.create_documents([full_text], metadatas=[{"source": doc.metadata["source"]} for doc in documents])
-        logging.info(f"Generated {len(small_chunks)} small chunks.")
-        # 2. For each small chunk, calculate its context window
-        for _, small_chunk in enumerate(small_chunks):
-            # Get the content of the small chunk
-            small_chunk_content = small_chunk.page_content
-            
-            # Find the index of the small chunk in the full text
-            start_index = full_text.find(small_chunk_content)
-            
-            if start_index != -1:
-                end_index = start_index + len(small_chunk_content)
-
-                # Calculate the range for the window backward and forward
-                window_start = max(0, start_index - (self.window_size - self.small_chunk_size) // 2)
-                window_end = min(len(full_text), end_index + (self.window_size - self.small_chunk_size) // 2)
-                
-                # Ensure the window is at least the size of the small_chunk
-                if (window_end - window_start) < self.small_chunk_size:
-                    window_start = max(0, end_index - self.window_size)
-                    window_end = min(len(full_text), start_index + self.window_size)
-
-                # Extract the window content
-                window_content = full_text[window_start:window_end]
-
-                # Update the metadata of the small chunk
-                small_chunk.metadata["window_content"] = window_content
-                small_chunk.metadata["original_document_id"] = small_chunk.metadata.get("source") # Or the actual original document ID
-                
-                all_small_chunks.append(self.create_document(small_chunk))
-            else:
-                # If the small chunk is not found in the full text, add it as is
-                # This can happen if there are transformations in the content
-                logging.warning(f"Small chunk content not found in full text. Adding as is. Chunk: {small_chunk.page_content[:50]}...")
-                all_small_chunks.append(self.create_document(small_chunk))
+        all_small_chunks = []
+        for chunks in self.iter_split_documents(documents):
+            all_small_chunks.extend(chunks)
         logging.info(f"Document splitting completed. Total small chunks with window context: {len(all_small_chunks)}.")
-        return all_small_chunks
\ No newline at end of file
+        return all_small_chunks
+
+    def iter_split_documents(self, documents: list[Document]) -> Iterator[list[DocumentDomain]]:
+        """
+        Yields the chunks of each document in input order, splitting in parallel processes when max_workers > 1.
+
+        Args:
+            documents (list[Document]): A list of LangChain Document objects to be split.
+
+        Yields:
+            list[DocumentDomain]: The chunks of one document.
+        """
+        if self.max_workers <= 1 or len(documents) <= 1:
+            for document in documents:
+                yield self.split_document(document)
+            return
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            yield from executor.map(self.split_document, documents, chunksize=8)
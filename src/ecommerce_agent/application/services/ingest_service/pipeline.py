@@ -0,0 +1,345 @@
+from pathlib import Path
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Optional
+import hashlib
+import threading
+import time
+from ecommerce_agent.application.services.document_service import DocumentService
+from ecommerce_agent.application.services.ingestion_manifest_service import IngestionManifestService
+from ecommerce_agent.application.services.extract_service.loader import LoaderService
+from ecommerce_agent.application.services.extract_service.splitter import SplitterService
+from ecommerce_agent.application.services.rag.embeddings import EmbeddingsService
+from ecommerce_agent.config import settings
+from ecommerce_agent.domain.document import Document
+from ecommerce_agent.domain.manifest_entry import ManifestEntry
+import logging
+
+_SENTINEL = object()
+
+class _PipelineAborted(Exception):
+  """
+  Raised inside a worker to unwind it when another stage has failed.
+  """
+
+class IngestionPipeline:
+  """
+  Streaming ingestion pipeline: load -> split -> batch-embed -> bulk-write.
+
+  Stages run in their own worker threads and are connected by bounded queues, so a slow
+  stage applies backpressure upstream and peak memory stays flat regardless of corpus size.
+  Embedding (which releases the GIL inside torch) overlaps with PDF parsing and database writes.
+  A pipeline instance runs one ingestion at a time.
+  """
+  def __init__(
+    self,
+    loader_service: Optional[LoaderService] = None,
+    splitter_service: Optional[SplitterService] = None,
+    embeddings_service: Optional[EmbeddingsService] = None,
+    document_service: Optional[DocumentService] = None,
+    manifest_service: Optional[IngestionManifestService] = None,
+    queue_size: Optional[int] = None,
+    split_workers: Optional[int] = None,
+    embed_workers: Optional[int] = None,
+    write_workers: Optional[int] = None,
+    embed_batch_size: Optional[int] = None
+  ):
+    """
+    Initializes the IngestionPipeline with its services and stage configuration.
+
+    Args:
+      loader_service (Optional[LoaderService]): Service used to stream pages. Defaults to a new LoaderService.
+      splitter_service (Optional[SplitterService]): Service used to split pages. Defaults to a new SplitterService.
+      embeddings_service (Optional[EmbeddingsService]): Service used to embed chunks. Defaults to a new EmbeddingsService.
+      document_service (Optional[DocumentService]): Service used to write chunks. Defaults to a new DocumentService.
+      manifest_service (Optional[IngestionManifestService]): Service used by run_incremental. Defaults to a new IngestionManifestService.
+      queue_size (Optional[int]): Capacity of each queue between stages. Defaults to settings.INGEST_QUEUE_SIZE.
+      split_workers (Optional[int]): Number of split workers. Defaults to settings.INGEST_SPLIT_WORKERS.
+      embed_workers (Optional[int]): Number of embedding workers. Defaults to settings.INGEST_EMBED_WORKERS.
+      write_workers (Optional[int]): Number of database writers. Defaults to settings.INGEST_WRITE_WORKERS.
+      embed_batch_size (Optional[int]): Number of chunks embedded and written together. Defaults to settings.INGEST_EMBED_BATCH_SIZE.
+    """
+    self.loader_service = loader_service or LoaderService()
+    self.splitter_service = splitter_service or SplitterService()
+    self.embeddings_service = embeddings_service or EmbeddingsService()
+    self.document_service = document_service or DocumentService()
+    self.manifest_service = manifest_service or IngestionManifestService()
+    self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+    self.split_workers = split_workers or settings.INGEST_SPLIT_WORKERS
+    self.embed_workers = embed_workers or settings.INGEST_EMBED_WORKERS
+    self.write_workers = write_workers or settings.INGEST_WRITE_WORKERS
+    self.embed_batch_size = embed_batch_size or settings.INGEST_EMBED_BATCH_SIZE
+
+  def _put(self, queue: Queue, item: Any) -> None:
+    """
+    Puts an item on a bounded queue, blocking while it is full unless the pipeline is aborted.
+    """
+    while True:
+      try:
+        queue.put(item, timeout=0.1)
+        return
+      except Full:
+        if self._stop.is_set():
+          raise _PipelineAborted()
+
+  def _get(self, queue: Queue) -> Any:
+    """
+    Gets an item from a queue, returning the sentinel if the pipeline is aborted.
+    """
+    while True:
+      try:
+        return queue.get(timeout=0.1)
+      except Empty:
+        if self._stop.is_set():
+          return _SENTINEL
+
+  def _record(self, stage: str, items: int, elapsed: float) -> None:
+    """
+    Adds processed items and busy time to the statistics of a stage.
+    """
+    with self._lock:
+      self._stats[stage]["items"] += items
+      self._stats[stage]["busy_seconds"] += elapsed
+
+  def _load(self, directory: Path, paths: Optional[list[Path]]) -> None:
+    """
+    Load stage: streams pages from the directory (or only the given files) into the pages queue.
+    """
+    if paths is None:
+      iterator = iter(self.loader_service.iter_documents(directory))
+    else:
+      iterator = iter(self.loader_service.iter_files_documents(paths))
+    while True:
+      start = time.perf_counter()
+      document = next(iterator, None)
+      if document is None:
+        return
+      self._record("load", 1, time.perf_counter() - start)
+      self._put(self._pages, document)
+
+  def _split(self) -> None:
+    """
+    Split stage: turns pages into chunks.
+    """
+    while (document := self._get(self._pages)) is not _SENTINEL:
+      start = time.perf_counter()
+      chunks = self.splitter_service.split_document(document)
+      self._record("split", len(chunks), time.perf_counter() - start)
+      for chunk in chunks:
+        self._put(self._chunks, chunk)
+
+  def _embed_batch(self, batch: list[Document]) -> None:
+    """
+    Embeds a batch of chunks in one forward pass and hands it to the writers.
+    """
+    start = time.perf_counter()
+    embeddings = self.embeddings_service.embed_documents([chunk.content for chunk in batch])
+    for chunk, embedding in zip(batch, embeddings):
+      chunk.embedding = embedding
+    self._record("embed", len(batch), time.perf_counter() - start)
+    with self._lock:
+      self._stats["embed"]["batches"] += 1
+    self._put(self._batches, batch)
+
+  def _embed(self) -> None:
+    """
+    Embed stage: groups chunks into batches of embed_batch_size and embeds them.
+    """
+    batch: list[Document] = []
+    while (chunk := self._get(self._chunks)) is not _SENTINEL:
+      batch.append(chunk)
+      if len(batch) >= self.embed_batch_size:
+        self._embed_batch(batch)
+        batch = []
+    if batch and not self._stop.is_set():
+      self._embed_batch(batch)
+
+  def _write(self) -> None:
+    """
+    Write stage: inserts each embedded batch with a single multi-row INSERT.
+    """
+    while (batch := self._get(self._batches)) is not _SENTINEL:
+      start = time.perf_counter()
+      created = self.document_service.create_documents(batch)
+      self._record("write", len(created), time.perf_counter() - start)
+      with self._lock:
+        for document in created:
+          self._chunk_ids.setdefault(document.source, []).append(document.id)
+
+  def _run_worker(self, stage: str, target: Callable[[], None], output: Optional[Queue], downstream_workers: int) -> None:
+    """
+    Runs a stage worker. The last worker of a stage to finish signals every downstream worker.
+    Any failure aborts the whole pipeline.
+    """
+    try:
+      target()
+    except _PipelineAborted:
+      pass
+    except Exception as e:
+      logging.error(f"Ingestion stage '{stage}' failed: {e}")
+      with self._lock:
+        self._errors.append(e)
+      self._stop.set()
+    finally:
+      with self._lock:
+        self._remaining[stage] -= 1
+        is_last = self._remaining[stage] == 0
+      if is_last and output is not None:
+        try:
+          for _ in range(downstream_workers):
+            self._put(output, _SENTINEL)
+        except _PipelineAborted:
+          pass
+
+  def run(self, directory: Path, paths: Optional[list[Path]] = None) -> dict[str, Any]:
+    """
+    Ingests every supported document under a directory.
+
+    Args:
+      directory (Path): The path to the directory containing the documents.
+      paths (Optional[list[Path]]): If given, only these files are ingested. Defaults to every supported file.
+
+    Returns:
+      dict[str, Any]: Ingestion statistics: total wall time and, per stage, worker count,
+      processed items and busy seconds (plus the number of batches for the embed stage).
+
+    Raises:
+      RuntimeError: If any stage fails. Rows already written by earlier batches are kept.
+    """
+    self._pages: Queue = Queue(maxsize=self.queue_size)
+    self._chunks: Queue = Queue(maxsize=self.queue_size * self.embed_batch_size)
+    self._batches: Queue = Queue(maxsize=self.queue_size)
+    self._stop = threading.Event()
+    self._lock = threading.Lock()
+    self._errors: list[Exception] = []
+    self._chunk_ids: dict[str, list[int]] = {}
+
+    stages = [
+      ("load", lambda: self._load(directory, paths), 1, self._pages, self.split_workers),
+      ("split", self._split, self.split_workers, self._chunks, self.embed_workers),
+      ("embed", self._embed, self.embed_workers, self._batches, self.write_workers),
+      ("write", self._write, self.write_workers, None, 0),
+    ]
+    self._stats = {name: {"workers": workers, "items": 0, "busy_seconds": 0.0} for name, _, workers, _, _ in stages}
+    self._stats["embed"]["batches"] = 0
+    self._remaining = {name: workers for name, _, workers, _, _ in stages}
+
+    logging.info(f"Starting ingestion pipeline for directory: {directory}")
+    start = time.perf_counter()
+    threads = [
+      threading.Thread(target=self._run_worker, args=(name, target, output, downstream), name=f"ingest-{name}-{i}", daemon=True)
+      for name, target, workers, output, downstream in stages
+      for i in range(workers)
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    wall_seconds = time.perf_counter() - start
+
+    if self._errors:
+      raise RuntimeError(f"Ingestion pipeline failed: {self._errors[0]}") from self._errors[0]
+    logging.info(
+      f"Ingestion completed in {wall_seconds:.2f}s: {self._stats['load']['items']} pages, "
+      f"{self._stats['split']['items']} chunks, {self._stats['write']['items']} rows."
+    )
+    return {"wall_seconds": wall_seconds, "stages": self._stats}
+
+  def _hash_file(self, path: Path) -> str:
+    """
+    Computes the SHA-256 hash of a file's content, reading it in 1 MB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+      for block in iter(lambda: f.read(1024 * 1024), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+  def _get_unlisted_sources(self, sources: list[str]) -> dict[str, list[str]]:
+    """
+    Finds the rows stored for files missing from the manifest, i.e. written before it existed.
+    Those rows may name their file with a relative or a Windows path, so stored sources are compared resolved.
+
+    Args:
+      sources (list[str]): The resolved paths of the files missing from the manifest.
+
+    Returns:
+      dict[str, list[str]]: The stored sources of each file that has rows, keyed by its resolved path.
+    """
+    wanted = set(sources)
+    unlisted: dict[str, list[str]] = {}
+    for stored in self.document_service.get_sources():
+      resolved = str(Path(stored.replace("\\", "/")).resolve())
+      if resolved in wanted:
+        unlisted.setdefault(resolved, []).append(stored)
+    return unlisted
+
+  def run_incremental(self, directory: Path, force: bool = False) -> dict[str, Any]:
+    """
+    Ingests only the new or modified files under a directory, using the ingestion manifest.
+
+    A file is unchanged when its size and mtime match the manifest, or when its content hash does
+    (in which case only its mtime is refreshed). Changed files are re-ingested and their old rows
+    deleted afterwards; files that disappeared from the directory have their rows and entry removed.
+    Files without a manifest entry may still have rows written before the manifest existed: those are
+    found by their source and deleted once the file is re-ingested.
+
+    Args:
+      directory (Path): The path to the directory containing the documents.
+      force (bool): If True, every file is re-ingested regardless of the manifest. Defaults to False.
+
+    Returns:
+      dict[str, Any]: The statistics of `run` plus the lists of added, modified, unchanged and deleted sources.
+
+    Raises:
+      RuntimeError: If the ingestion fails. Rows written during the failed run are removed.
+    """
+    directory = Path(directory).resolve()
+    manifest = self.manifest_service.get_entries()
+    changes: dict[str, list[str]] = {"added": [], "modified": [], "unchanged": [], "deleted": []}
+    pending: dict[str, ManifestEntry] = {}
+
+    for path in self.loader_service.iter_document_paths(directory):
+      source = str(path)
+      stat = path.stat()
+      previous = manifest.get(source)
+      if not force and previous is not None and previous.size == stat.st_size and previous.mtime == stat.st_mtime:
+        changes["unchanged"].append(source)
+        continue
+      content_hash = self._hash_file(path)
+      if not force and previous is not None and previous.content_hash == content_hash:
+        self.manifest_service.upsert_entry(previous.model_copy(update={"size": stat.st_size, "mtime": stat.st_mtime}))
+        changes["unchanged"].append(source)
+        continue
+      changes["added" if previous is None else "modified"].append(source)
+      pending[source] = ManifestEntry(source=source, size=stat.st_size, mtime=stat.st_mtime, content_hash=content_hash)
+
+    current_sources = set(changes["unchanged"]) | set(pending)
+    for source, entry in manifest.items():
+      if source not in current_sources and Path(source).is_relative_to(directory):
+        self.document_service.delete_documents(entry.chunk_ids)
+        self.manifest_service.delete_entry(source)
+        changes["deleted"].append(source)
+
+    stats: dict[str, Any] = {"wall_seconds": 0.0, "stages": {}}
+    unlisted_sources = self._get_unlisted_sources(changes["added"]) if changes["added"] else {}
+    if pending:
+      try:
+        stats = self.run(directory, paths=[Path(source) for source in pending])
+      except Exception:
+        written_ids = [chunk_id for chunk_ids in self._chunk_ids.values() for chunk_id in chunk_ids]
+        self.document_service.delete_documents(written_ids)
+        raise
+      for source, entry in pending.items():
+        previous = manifest.get(source)
+        entry.chunk_ids = self._chunk_ids.get(source, [])
+        self.manifest_service.upsert_entry(entry)
+        if previous is not None:
+          self.document_service.delete_documents(previous.chunk_ids)
+        elif source in unlisted_sources:
+          self.document_service.delete_documents_by_source(unlisted_sources[source], keep_ids=entry.chunk_ids)
+
+    logging.info(
+      f"Incremental ingestion: {len(changes['added'])} added, {len(changes['modified'])} modified, "
+      f"{len(changes['unchanged'])} unchanged, {len(changes['deleted'])} deleted."
+    )
+    return {**stats, "changes": changes}
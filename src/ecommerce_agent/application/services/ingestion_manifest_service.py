@@ -0,0 +1,105 @@
+from typing import Dict
+from ecommerce_agent.domain.manifest_entry import ManifestEntry
+from ecommerce_agent.application.services.base_service import BaseService
+from ecommerce_agent.infrastructure.database.postgresql.postgres_client import db_client, db_transaction
+import logging
+
+class IngestionManifestService(BaseService):
+  """
+  Service class for the ingestion manifest, which records per source file its size, mtime,
+  content hash and the ids of the document chunks it produced.
+  """
+  def __init__(self):
+    """
+    Initializes the IngestionManifestService with a database client.
+    """
+    super().__init__(db_client)
+    
+  def _create_table(self):
+    try:
+      with db_transaction() as conn:
+        cursor = conn.cursor()
+        logging.info("Creating ingestion manifest table...")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_manifest (
+          source TEXT PRIMARY KEY,
+          size BIGINT NOT NULL,
+          mtime DOUBLE PRECISION NOT NULL,
+          content_hash TEXT NOT NULL,
+          chunk_ids INTEGER[] NOT NULL DEFAULT '{}',
+          ingested_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """)
+        conn.commit()
+    except Exception as e:
+      logging.error(f"Error creating ingestion manifest table: {e}")
+      raise
+    
+  def get_entries(self) -> Dict[str, ManifestEntry]:
+    """
+    Retrieves every manifest entry.
+
+    Returns:
+      Dict[str, ManifestEntry]: The manifest entries keyed by source path.
+
+    Raises:
+      ValueError: If an error occurs during retrieval.
+    """
+    query = """
+        SELECT source, size, mtime, content_hash, chunk_ids FROM ingestion_manifest
+    """
+    try:
+      results = self.db_client.execute_query(query, fetch_all=True) or []
+      return {result['source']: ManifestEntry(**result) for result in results}
+    except Exception as e:
+      logging.error(f"Error retrieving ingestion manifest: {e}")
+      raise ValueError(f"Error retrieving ingestion manifest: {e}")
+    
+  def upsert_entry(self, entry: ManifestEntry) -> ManifestEntry:
+    """
+    Creates or replaces the manifest entry of a source file.
+
+    Args:
+      entry (ManifestEntry): The entry to store.
+
+    Returns:
+      ManifestEntry: The stored entry.
+
+    Raises:
+      ValueError: If an error occurs during the upsert.
+    """
+    query = """
+        INSERT INTO ingestion_manifest (source, size, mtime, content_hash, chunk_ids, ingested_at)
+        VALUES (%s, %s, %s, %s, %s, now())
+        ON CONFLICT (source) DO UPDATE SET
+          size = EXCLUDED.size,
+          mtime = EXCLUDED.mtime,
+          content_hash = EXCLUDED.content_hash,
+          chunk_ids = EXCLUDED.chunk_ids,
+          ingested_at = EXCLUDED.ingested_at
+    """
+    try:
+      self.db_client.execute_query(query, (entry.source, entry.size, entry.mtime, entry.content_hash, entry.chunk_ids))
+      return entry
+    except Exception as e:
+      logging.error(f"Error storing manifest entry for {entry.source}: {e}")
+      raise ValueError(f"Error storing manifest entry: {e}")
+    
+  def delete_entry(self, source: str) -> None:
+    """
+    Deletes the manifest entry of a source file.
+
+    Args:
+      source (str): The source path of the entry.
+
+    Raises:
+      ValueError: If an error occurs during deletion.
+    """
+    query = """
+        DELETE FROM ingestion_manifest WHERE source = %s
+    """
+    try:
+      self.db_client.execute_query(query, (source,))
+    except Exception as e:
+      logging.error(f"Error deleting manifest entry for {source}: {e}")
+      raise ValueError(f"Error deleting manifest entry: {e}")
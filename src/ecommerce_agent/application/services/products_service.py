@@ -1,6 +1,7 @@
-from typing import List, Dict, Optional
+from typing import List, Optional
 from ecommerce_agent.config import settings
 from ecommerce_agent.domain.product import Product
+from ecommerce_agent.infrastructure.metrics import timed
 from ecommerce_agent.application.services.base_service import BaseService
 from ecommerce_agent.infrastructure.database.postgresql.postgres_client import db_client, db_transaction
 import logging
@@ -136,6 +137,7 @@ class ProductsService(BaseService):
       logging.error(f"Error retrieving product with code {product_code}: {e}")
       raise ValueError(f"Error retrieving product: {e}")
     
+  @timed("products.vector_search")
   def retrieve_similar_products(self, query_embedding: List[float], top_k: int = 5) -> List[Product]:
     query = """
         SELECT id, code, name, description, embedding, price, image_url, stock_level, is_active, embedding <=> %s AS distance
@@ -173,6 +175,7 @@ class ProductsService(BaseService):
       logging.error(f"Error retrieving similar products: {e}")
       raise ValueError(f"Error retrieving similar products: {e}")
     
+  @timed("products.text_search")
   def retrieve_text_search_products(self, query_text: str, top_k: int = 5) -> List[Product]:
     sanitized_query_text = self._sanitize_string_for_db(query_text)
     query = """
@@ -210,38 +213,103 @@ class ProductsService(BaseService):
       logging.error(f"Error retrieving text search products: {e}")
       raise ValueError(f"Error retrieving text search products: {e}")
     
+  @timed("products.hybrid_search")
   def retrieve_hybrid_products(self, query_embedding: List[float], query_text: str, top_k: int = 5) -> List[Product]:
     semantic_results = self.retrieve_similar_products(query_embedding, top_k=top_k * 2)
     text_results = self.retrieve_text_search_products(query_text, top_k=top_k * 2)
     
-    reranked_scores: Dict[int, float] = {}
-    products_by_id: Dict[int, Product] = {}
-    k = 60
+    hybrid_products = self._reciprocal_rank_fusion(semantic_results, text_results, top_k)
 
-    # Process semantic results
-    for i, product in enumerate(semantic_results):
-        product_id = product.id
-        products_by_id[product_id] = product
-        reranked_scores[product_id] = reranked_scores.get(product_id, 0.0) + 1.0 / (k + i + 1)
+    logging.info(f"Successfully retrieved {len(hybrid_products)} hybrid products.")
+    return hybrid_products
+  
+  def _build_product(self, result: dict) -> Product:
+    embedding = [float(x) for x in result['embedding'][1:-1].split(',')] if isinstance(result['embedding'], str) else result['embedding']
+    return Product(
+      id=result['id'],
+      code=result['code'],
+      name=result['name'],
+      description=result['description'],
+      embedding=embedding,
+      price=result['price'],
+      image_url=result['image_url'],
+      stock_level=result['stock_level'],
+      is_active=result['is_active']
+    )
+    
+  @timed("products.hybrid_search_batch")
+  def retrieve_hybrid_products_batch(self, query_embeddings: List[List[float]], query_texts: List[str], top_k: int = 5) -> List[List[Product]]:
+    """
+    Performs a hybrid search (semantic + full-text) for several queries in a single database round trip
+    and merges the results of each query using Reciprocal Rank Fusion (RRF).
 
-    # Process text results
-    for i, product in enumerate(text_results):
-        product_id = product.id
-        products_by_id[product_id] = product
-        reranked_scores[product_id] = reranked_scores.get(product_id, 0.0) + 1.0 / (k + i + 1)
+    Args:
+      query_embeddings (List[List[float]]): The embedding vectors for semantic search, one per query.
+      query_texts (List[str]): The text query strings for full-text search, one per query.
+      top_k (int): The maximum number of combined products to retrieve per query. Defaults to 5.
 
-    # Sort documents by their combined RRF score (from highest to lowest)
-    sorted_product_ids = sorted(reranked_scores.keys(), key=lambda product_id: reranked_scores[product_id], reverse=True)
+    Returns:
+      List[List[Product]]: One list of hybrid Product results per query, in the same order as the input.
 
-    # Reconstruct the final list of documents
-    hybrid_products: List[Product] = []
-    for product_id in sorted_product_ids:
-        if len(hybrid_products) >= top_k:
-            break
-        hybrid_products.append(products_by_id[product_id])
+    Raises:
+      ValueError: If the inputs have different lengths or an error occurs during the search.
+    """
+    if len(query_embeddings) != len(query_texts):
+      raise ValueError("query_embeddings and query_texts must have the same length.")
+    if not query_texts:
+      return []
     
-    for product in hybrid_products:
-        setattr(product, 'rrf_score', reranked_scores[product.id])
-
-    logging.info(f"Successfully retrieved {len(hybrid_products)} hybrid products.")
+    candidates_k = top_k * 2
+    embedding_strs = [f"[{ ','.join(map(str, embedding)) }]" for embedding in query_embeddings]
+    semantic_query = """
+        (SELECT q.query_index, 'semantic' AS mode, p.id, p.code, p.name, p.description, p.embedding, p.price,
+                p.image_url, p.stock_level, p.is_active, p.distance, NULL::float8 AS rank
+        FROM unnest(%s::vector[]) WITH ORDINALITY AS q(query_embedding, query_index)
+        CROSS JOIN LATERAL (
+          SELECT id, code, name, description, embedding, price, image_url, stock_level, is_active,
+                 embedding <=> q.query_embedding AS distance
+          FROM products
+          WHERE is_active = TRUE
+          ORDER BY distance
+          LIMIT %s
+        ) p)
+    """
+    text_query = """
+        (SELECT %s::bigint AS query_index, 'text' AS mode, id, code, name, description, embedding, price,
+                image_url, stock_level, is_active, NULL::float8 AS distance, paradedb.score(id)::float8 AS rank
+        FROM products
+        WHERE id @@@ paradedb.with_index('products_search_idx', paradedb.match('description', %s)) AND is_active = TRUE
+        ORDER BY rank DESC
+        LIMIT %s)
+    """
+    query = " UNION ALL ".join([semantic_query] + [text_query] * len(query_texts)) + """
+        ORDER BY query_index, mode, distance ASC NULLS LAST, rank DESC NULLS LAST
+    """
+    params: list = [embedding_strs, candidates_k]
+    for query_index, query_text in enumerate(query_texts, start=1):
+      params.extend([query_index, self._sanitize_string_for_db(query_text), candidates_k])
+    
+    try:
+      results = self.db_client.execute_query(query, tuple(params), fetch_all=True) or []
+    except Exception as e:
+      logging.error(f"Error in batch hybrid product search: {e}")
+      raise ValueError(f"Error in batch hybrid product search: {e}")
+    
+    semantic_results: List[List[Product]] = [[] for _ in query_texts]
+    text_results: List[List[Product]] = [[] for _ in query_texts]
+    for result in results:
+      product = self._build_product(result)
+      query_index = result['query_index'] - 1
+      if result['mode'] == 'semantic':
+        setattr(product, 'semantic_distance', result['distance'])
+        semantic_results[query_index].append(product)
+      else:
+        setattr(product, 'text_rank', result['rank'])
+        text_results[query_index].append(product)
+    
+    hybrid_products = [
+      self._reciprocal_rank_fusion(semantic, text, top_k)
+      for semantic, text in zip(semantic_results, text_results)
+    ]
+    logging.info(f"Successfully retrieved hybrid products for {len(query_texts)} queries in one round trip.")
     return hybrid_products
\ No newline at end of file
@@ -1,6 +1,7 @@
 from ecommerce_agent.domain.document import Document
 from ecommerce_agent.application.services.document_service import DocumentService
-from ecommerce_agent.application.services.rag.embeddings import EmbeddingsService
+from ecommerce_agent.application.services.rag.embeddings import get_embeddings_service
+import asyncio
 import logging
 
 class DocumentRetrieverService:
@@ -10,9 +11,9 @@ class DocumentRetrieverService:
   """
   def __init__(self):
     """
-    Initializes the RetrieverService with instances of EmbeddingsService and DocumentService.
+    Initializes the RetrieverService with the shared EmbeddingsService and a DocumentService.
     """
-    self.embeddings_service = EmbeddingsService()
+    self.embeddings_service = get_embeddings_service()
     self.document_service = DocumentService()
     
   def retrieve_similar_documents(self, query: str, top_k: int = 5) -> list[Document]:
@@ -60,4 +61,36 @@ class DocumentRetrieverService:
     logging.info(f"Generating embedding for hybrid search query: '{query}'.")
     query_embedding = self.embeddings_service.embed_query(query)
     logging.info(f"Retrieving {top_k} hybrid documents.")
-    return self.document_service.retrieve_hybrid_documents(query_embedding, query, top_k)
\ No newline at end of file
+    return self.document_service.retrieve_hybrid_documents(query_embedding, query, top_k)
+  
+  def retrieve_hybrid_documents_batch(self, queries: list[str], top_k: int = 5) -> list[list[Document]]:
+    """
+    Retrieves documents for several queries at once using the hybrid search approach.
+    All queries are embedded in one forward pass and searched in a single database round trip.
+
+    Args:
+      queries (list[str]): The query strings for hybrid search.
+      top_k (int): The maximum number of hybrid documents to retrieve per query. Defaults to 5.
+
+    Returns:
+      list[list[Document]]: One list of Document objects per query, in the same order as the input.
+    """
+    logging.info(f"Generating embeddings for {len(queries)} hybrid search queries.")
+    query_embeddings = self.embeddings_service.embed_queries(queries)
+    logging.info(f"Retrieving {top_k} hybrid documents per query in batch.")
+    return self.document_service.retrieve_hybrid_documents_batch(query_embeddings, queries, top_k)
+  
+  async def aretrieve_hybrid_documents(self, query: str, top_k: int = 5) -> list[Document]:
+    """
+    Asynchronously retrieves documents using the hybrid search approach.
+    Embedding and database work run in a worker thread with its own pooled connection,
+    so concurrent calls do not block the event loop or each other.
+
+    Args:
+      query (str): The query string for hybrid search.
+      top_k (int): The maximum number of hybrid documents to retrieve. Defaults to 5.
+
+    Returns:
+      list[Document]: A list of Document objects from the hybrid search.
+    """
+    return await asyncio.to_thread(self.retrieve_hybrid_documents, query, top_k)
\ No newline at end of file
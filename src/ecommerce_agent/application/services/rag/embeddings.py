@@ -1,5 +1,6 @@
-from sentence_transformers import SentenceTransformer
+from functools import lru_cache
 from ecommerce_agent.config import settings
+from ecommerce_agent.infrastructure.metrics import timed
 import logging
 
 class EmbeddingsService:
@@ -9,10 +10,14 @@ class EmbeddingsService:
   def __init__(self):
     """
     Initializes the EmbeddingsService by loading the SentenceTransformer model.
+    sentence-transformers (and torch) are imported here rather than at module import, so importing
+    the application stays fast and the model is only loaded by whoever needs it first (normally the startup warmup).
     """
+    from sentence_transformers import SentenceTransformer
     self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
     logging.info(f"Embedding model loaded: {settings.EMBEDDING_MODEL}")
     
+  @timed("embeddings.embed_text")
   def embed_text(self, text: str) -> list[float]:
     """
     Generates an embedding for a given text string.
@@ -25,6 +30,7 @@ class EmbeddingsService:
     """
     return self.model.encode(text).tolist()
   
+  @timed("embeddings.embed_documents")
   def embed_documents(self, documents: list[str]) -> list[list[float]]:
     """
     Generates embeddings for a list of text documents.
@@ -35,7 +41,9 @@ class EmbeddingsService:
     Returns:
       list[list[float]]: A list of embedding vectors, one for each document.
     """
-    return [self.embed_text(doc) for doc in documents]
+    if not documents:
+      return []
+    return self.model.encode(documents).tolist()
   
   def embed_query(self, query: str) -> list[float]:
     """
@@ -48,3 +56,25 @@ class EmbeddingsService:
       list[float]: A list of floats representing the embedding vector for the query.
     """
     return self.embed_text(query)
+  
+  def embed_queries(self, queries: list[str]) -> list[list[float]]:
+    """
+    Generates embeddings for a list of query strings in a single forward pass.
+
+    Args:
+      queries (list[str]): The input query strings to embed.
+
+    Returns:
+      list[list[float]]: A list of embedding vectors, one for each query.
+    """
+    return self.embed_documents(queries)
+
+@lru_cache(maxsize=None)
+def get_embeddings_service() -> EmbeddingsService:
+  """
+  Returns the process-wide EmbeddingsService, so the retrievers and the intent router share one loaded model.
+
+  Returns:
+    EmbeddingsService: The shared embeddings service.
+  """
+  return EmbeddingsService()
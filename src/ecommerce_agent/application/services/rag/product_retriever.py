@@ -1,6 +1,7 @@
 from ecommerce_agent.domain.product import Product
 from ecommerce_agent.application.services.products_service import ProductsService
-from ecommerce_agent.application.services.rag.embeddings import EmbeddingsService
+from ecommerce_agent.application.services.rag.embeddings import get_embeddings_service
+import asyncio
 import logging
 
 class ProductRetrieverService:
@@ -10,9 +11,9 @@ class ProductRetrieverService:
   """
   def __init__(self):
     """
-    Initializes the RetrieverService with instances of EmbeddingsService and ProductsService.
+    Initializes the RetrieverService with the shared EmbeddingsService and a ProductsService.
     """
-    self.embeddings_service = EmbeddingsService()
+    self.embeddings_service = get_embeddings_service()
     self.products_service = ProductsService()
     
   def retrieve_similar_products(self, query: str, top_k: int = 5) -> list[Product]:
@@ -59,4 +60,36 @@ class ProductRetrieverService:
     logging.info(f"Generating embedding for hybrid search query: '{query}'.")
     query_embedding = self.embeddings_service.embed_query(query)
     logging.info(f"Retrieving {top_k} hybrid products.")
-    return self.products_service.retrieve_hybrid_products(query_embedding, query, top_k)
\ No newline at end of file
+    return self.products_service.retrieve_hybrid_products(query_embedding, query, top_k)
+  
+  def retrieve_hybrid_products_batch(self, queries: list[str], top_k: int = 5) -> list[list[Product]]:
+    """
+    Retrieves products for several queries at once using the hybrid search approach.
+    All queries are embedded in one forward pass and searched in a single database round trip.
+
+    Args:
+      queries (list[str]): The query strings for hybrid search.
+      top_k (int): The maximum number of hybrid products to retrieve per query. Defaults to 5.
+
+    Returns:
+      list[list[Product]]: One list of Product objects per query, in the same order as the input.
+    """
+    logging.info(f"Generating embeddings for {len(queries)} hybrid search queries.")
+    query_embeddings = self.embeddings_service.embed_queries(queries)
+    logging.info(f"Retrieving {top_k} hybrid products per query in batch.")
+    return self.products_service.retrieve_hybrid_products_batch(query_embeddings, queries, top_k)
+  
+  async def aretrieve_hybrid_products(self, query: str, top_k: int = 5) -> list[Product]:
+    """
+    Asynchronously retrieves products using the hybrid search approach.
+    Embedding and database work run in a worker thread with its own pooled connection,
+    so concurrent calls do not block the event loop or each other.
+
+    Args:
+      query (str): The query string for hybrid search.
+      top_k (int): The maximum number of hybrid products to retrieve. Defaults to 5.
+
+    Returns:
+      list[Product]: A list of Product objects from the hybrid search.
+    """
+    return await asyncio.to_thread(self.retrieve_hybrid_products, query, top_k)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,6 +11,16 @@ class Settings(BaseSettings):
   GROQ_API_KEY: str
   GROQ_LLM_MODEL: str = "llama-3.3-70b-versatile"
   GROQ_LLM_MODEL_CONTEXT_SUMMARY: str = "llama-3.1-8b-instant"
+  GROQ_HTTP_MAX_CONNECTIONS: int = 20
+  GROQ_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+  GROQ_HTTP_TIMEOUT: float = 60.0
+  GROQ_BASE_URL: Optional[str] = None  # e.g. a local stub chat-completions server
+  GROQ_LLM_MODEL_SECONDARY: str = ""  # hedge and failover model, the main model if empty
+  LLM_HEDGE_ENABLED: bool = False
+  LLM_HEDGE_PERCENTILE: float = 95.0
+  LLM_HEDGE_MIN_DELAY: float = 0.5
+  LLM_HEDGE_MIN_SAMPLES: int = 20
+  LLM_REQUEST_TIMEOUT: float = 30.0
   
   # --- Postgres Configuration ---
   POSTGRES_USER: str
@@ -17,6 +28,9 @@ class Settings(BaseSettings):
   POSTGRES_DB: str
   POSTGRES_HOST: str
   POSTGRES_PORT: int = 5435
+  POSTGRES_POOL_MIN_SIZE: int = 1
+  POSTGRES_POOL_MAX_SIZE: int = 10
+  POSTGRES_POOL_TIMEOUT: float = 10.0  # seconds to wait for a free connection when all are in use
   
   # --- Vector Database Configuration ---
   VECTOR_DB_NAME: str = "ecommerce_db"
@@ -31,19 +45,94 @@ class Settings(BaseSettings):
   DATA_FAQS_DIR: Path = DATA_DIR / "faqs"
   DATA_PRODUCTS_DIR: Path = DATA_DIR / "products"
 
+  # --- Loader Configuration ---
+  PDF_LOADER_MODE: str = "thread" # "thread" or "process"
+  PDF_PARSE_WORKERS: int = 0 # 0 uses every available core
+  PDF_PAGES_PER_TASK: int = 8
+  
   # --- Splitter Configuration ---
   SMALL_CHUNK_SIZE: int = 150
   SMALL_CHUNK_OVERLAP: int = 20
   WINDOW_SIZE: int = 1000
   WINDOW_OVERLAP: int = 0
+  SPLITTER_MAX_WORKERS: int = 1
+  
+  # --- Ingestion Configuration ---
+  INGEST_QUEUE_SIZE: int = 16
+  INGEST_SPLIT_WORKERS: int = 1
+  INGEST_EMBED_WORKERS: int = 1
+  INGEST_WRITE_WORKERS: int = 1
+  INGEST_EMBED_BATCH_SIZE: int = 32
+  
+  # --- Conversation Memory Configuration ---
+  MEMORY_ENABLED: bool = True
+  MEMORY_MAX_TOKENS: int = 2000
+  MEMORY_KEEP_LAST_MESSAGES: int = 6
+  MEMORY_CHECKPOINTS_PER_THREAD: int = 5
+  MEMORY_THREAD_TTL: float = 604800.0  # seconds a conversation is kept after its last turn, 0 keeps them forever
+  MEMORY_SWEEP_INTERVAL: float = 3600.0
+  THREAD_ID_SECRET: str = ""  # signs the thread ids issued by /chat; if empty, a random one is used and ids expire on restart
+  
+  # --- Tools Configuration ---
+  TOOLS_MAX_CONCURRENCY: int = 4
+  TOOL_MEMO_ENABLED: bool = True
+  TOOL_MEMO_MAX_THREADS: int = 1000
+  TOOL_MEMO_MAX_ENTRIES_PER_THREAD: int = 32
+  TOOL_MEMO_TTL: float = 600.0
+  SPECULATIVE_RETRIEVAL: bool = False
+  SPECULATIVE_MATCH_THRESHOLD: float = 0.8  # token overlap between the user message and the tool query to reuse a result
+  SPECULATIVE_TTL: float = 60.0
+  
+  # --- Intent Router Configuration ---
+  INTENT_ROUTER_MODE: str = "off"  # "off", "shadow" (measure agreement with the LLM) or "route"
+  INTENT_ROUTER_THRESHOLD: float = 0.85
+  INTENT_ROUTER_MAX_PENDING: int = 1000  # predictions waiting for the LLM's tool selection
+  INTENT_ROUTER_EXAMPLES_PATH: Path = DATA_DIR / "intent_router" / "examples.jsonl"
+  INTENT_ROUTER_MODEL_PATH: Path = DATA_DIR / "intent_router" / "intent_router.joblib"
+  
+  # --- Startup Configuration ---
+  WARMUP_ENABLED: bool = True  # preload the embedding model and intent router and run one retrieval per tool at startup
+  WARMUP_QUERY: str = "envío"
+  READINESS_DB_TIMEOUT: float = 2.0
+  WARMUP_MAX_ATTEMPTS: int = 8  # then liveness fails too, so the process gets restarted
+  WARMUP_RETRY_BACKOFF: float = 1.0
+  WARMUP_RETRY_MAX_BACKOFF: float = 60.0
+  
+  # --- Admission Control Configuration ---
+  ADMISSION_MAX_IN_FLIGHT: int = 16
+  ADMISSION_MAX_QUEUE: int = 32
+  ADMISSION_QUEUE_TIMEOUT: float = 10.0
+  ADMISSION_USER_RATE: float = 0.0  # requests per second per user, 0 disables the per-user limit
+  ADMISSION_USER_BURST: int = 5
+  ADMISSION_TRUST_USER_ID: bool = False  # key the per-user limit on the request's user_id instead of the client address
   
   # --- Telegram Configuration ---
   TELEGRAM_BOT_TOKEN: str
   WEBHOOK_URL: str
+  TELEGRAM_BASE_URL: str = "https://api.telegram.org/bot"  # point at scripts/stub_llm_server.py for offline load tests
+  TELEGRAM_DELIVERY_MODE: str = "message"  # "message" sends the full answer once, "stream" edits a placeholder as tokens arrive
+  TELEGRAM_STREAM_EDIT_INTERVAL: float = 1.0
+  TELEGRAM_STREAM_PLACEHOLDER: str = "..."
+  TELEGRAM_WORKERS: int = 4
+  TELEGRAM_QUEUE_SIZE: int = 100
+  TELEGRAM_DEDUPE_SIZE: int = 1000
+  TELEGRAM_DEBOUNCE_MS: int = 800  # 0 answers every message on its own
+  TELEGRAM_CANCEL_SUPERSEDED: bool = True
+  TELEGRAM_MAX_SUPERSEDED: int = 3  # consecutive cancellations of a chat's turn before newer messages wait for it
   
   # --- Langfuse Configuration ---
-  LANGFUSE_SECRET_KEY: str
-  LANGFUSE_PUBLIC_KEY: str
-  LANGFUSE_HOST: str
+  LANGFUSE_SECRET_KEY: str = ""
+  LANGFUSE_PUBLIC_KEY: str = ""
+  LANGFUSE_HOST: str = ""
+  TRACING_ENABLED: bool = True  # tracing is also off while the Langfuse keys are not set
+  TRACING_SAMPLE_RATE: float = 1.0
+  TRACING_ROUTE_SAMPLE_RATES: dict[str, float] = {}  # e.g. {"chat_stream": 0.1, "telegram": 0.5}
+  TRACING_BUFFER_SIZE: int = 10000  # spans queued for export by the Langfuse SDK
+  
+  # --- Profiling Configuration ---
+  PROFILING_ENABLED: bool = False
+  PROFILING_TOKEN: str = ""  # sent in the X-Profile-Token header, profiling stays off while it is empty
+  PROFILING_MAX_SECONDS: float = 60.0
+  PROFILING_KEEP_REPORTS: int = 20
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List
+
+class ManifestEntry(BaseModel):
+  source: str
+  size: int
+  mtime: float
+  content_hash: str
+  chunk_ids: List[int] = []
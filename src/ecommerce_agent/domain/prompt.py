@@ -25,6 +25,27 @@ Your response must be in the **same language as the user's message**.
     * You can only use the tools provided to you.
     * You can not use the same tool with the same parameters more than once.
 * **Process:** Analyze each request step-by-step to determine the best way to help.
+{% if summary %}
+
+**Summary of the earlier conversation:**
+{{ summary }}
+{% endif %}
+"""
+
+SYSTEM_PROMPT = Prompt(name="system", prompt=__SYSTEM_PROMPT)
+
+__CONTEXT_SUMMARY_PROMPT = """
+Create a concise summary of the conversation between an ecommerce customer service agent and a user.
+Keep every fact that matters to continue helping the user: their requests, products, orders, locations,
+preferences and the answers already given. Write the summary in the same language as the conversation.
+{% if summary %}
+
+Extend this existing summary with the new messages:
+{{ summary }}
+{% endif %}
+
+Conversation:
+{{ conversation }}
 """
 
-SYSTEM_PROMPT = Prompt(name="system", prompt=__SYSTEM_PROMPT)
\ No newline at end of file
+CONTEXT_SUMMARY_PROMPT = Prompt(name="context_summary", prompt=__CONTEXT_SUMMARY_PROMPT)
\ No newline at end of file
@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+import asyncio
+import logging
+import time
+from ecommerce_agent.config import settings
+
+class AdmissionRejected(Exception):
+  """
+  Raised when a request is shed instead of admitted.
+
+  Attributes:
+    reason (str): "rate_limited", "queue_full" or "queue_timeout".
+    retry_after (float): Suggested number of seconds to wait before retrying.
+  """
+  def __init__(self, reason: str, retry_after: float):
+    super().__init__(f"Request rejected by admission control: {reason}.")
+    self.reason = reason
+    self.retry_after = retry_after
+
+class AdmissionTicket:
+  """
+  An admitted request's slot. Releasing it more than once has no effect, so it can be released
+  from every path that may end the request.
+  """
+  def __init__(self, controller: "AdmissionController"):
+    self._controller = controller
+    self._released = False
+
+  def release(self) -> None:
+    if not self._released:
+      self._released = True
+      self._controller._release()
+
+class AdmissionController:
+  """
+  Bounds the number of conversation turns generated at the same time.
+
+  At most `max_in_flight` requests run at once; up to `max_queue` more wait in FIFO order for at most
+  `queue_timeout` seconds. Anything beyond that is rejected straight away, so a traffic spike degrades
+  into fast "busy" answers instead of slowing every request down. An optional per-user token bucket
+  limits how often a single user is admitted.
+  """
+  def __init__(
+    self,
+    max_in_flight: Optional[int] = None,
+    max_queue: Optional[int] = None,
+    queue_timeout: Optional[float] = None,
+    user_rate: Optional[float] = None,
+    user_burst: Optional[int] = None,
+    max_tracked_users: int = 10000
+  ):
+    """
+    Args:
+      max_in_flight (Optional[int]): Requests processed at the same time. Defaults to settings.ADMISSION_MAX_IN_FLIGHT.
+      max_queue (Optional[int]): Requests allowed to wait for a slot. Defaults to settings.ADMISSION_MAX_QUEUE.
+      queue_timeout (Optional[float]): Seconds a request may wait for a slot. Defaults to settings.ADMISSION_QUEUE_TIMEOUT.
+      user_rate (Optional[float]): Requests per second refilled in each user's bucket, 0 to disable. Defaults to settings.ADMISSION_USER_RATE.
+      user_burst (Optional[int]): Capacity of each user's bucket. Defaults to settings.ADMISSION_USER_BURST.
+      max_tracked_users (int): Number of user buckets kept, least recently used ones are dropped first.
+    """
+    self.max_in_flight = max(1, max_in_flight or settings.ADMISSION_MAX_IN_FLIGHT)
+    self.max_queue = settings.ADMISSION_MAX_QUEUE if max_queue is None else max_queue
+    self.queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+    self.user_rate = settings.ADMISSION_USER_RATE if user_rate is None else user_rate
+    self.user_burst = max(1, user_burst or settings.ADMISSION_USER_BURST)
+    self.max_tracked_users = max_tracked_users
+    self._semaphore = asyncio.Semaphore(self.max_in_flight)
+    self._user_buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+    self._in_flight = 0
+    self._queued = 0
+    self._counters = {"admitted": 0, "queued": 0, "shed_rate_limited": 0, "shed_queue_full": 0, "shed_queue_timeout": 0}
+
+  async def acquire(self, user_id: Optional[str] = None) -> AdmissionTicket:
+    """
+    Waits for a processing slot.
+
+    Args:
+      user_id (Optional[str]): The user making the request, used for the per-user rate limit.
+
+    Returns:
+      AdmissionTicket: The slot, to be released when the request ends.
+
+    Raises:
+      AdmissionRejected: If the user is over their rate limit, the wait queue is full or the wait timed out.
+    """
+    if user_id is not None and not self._take_user_token(user_id):
+      self._shed("rate_limited")
+      raise AdmissionRejected("rate_limited", retry_after=1 / self.user_rate)
+    if self._semaphore.locked():
+      if self._queued >= self.max_queue:
+        self._shed("queue_full")
+        raise AdmissionRejected("queue_full", retry_after=self.queue_timeout)
+      self._queued += 1
+      self._counters["queued"] += 1
+      try:
+        await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+      except asyncio.TimeoutError:
+        self._shed("queue_timeout")
+        raise AdmissionRejected("queue_timeout", retry_after=self.queue_timeout)
+      finally:
+        self._queued -= 1
+    else:
+      await self._semaphore.acquire()
+    self._in_flight += 1
+    self._counters["admitted"] += 1
+    return AdmissionTicket(self)
+
+  @asynccontextmanager
+  async def admit(self, user_id: Optional[str] = None) -> AsyncIterator[AdmissionTicket]:
+    """
+    Holds a processing slot for the duration of the block. See acquire.
+    """
+    ticket = await self.acquire(user_id)
+    try:
+      yield ticket
+    finally:
+      ticket.release()
+
+  def metrics(self) -> dict[str, Any]:
+    """
+    Returns the current load and the admitted, queued and shed counters.
+    """
+    return {
+      "max_in_flight": self.max_in_flight,
+      "max_queue": self.max_queue,
+      "in_flight": self._in_flight,
+      "waiting": self._queued,
+      **self._counters,
+      "shed": sum(value for key, value in self._counters.items() if key.startswith("shed_"))
+    }
+
+  def _release(self) -> None:
+    self._in_flight -= 1
+    self._semaphore.release()
+
+  def _shed(self, reason: str) -> None:
+    self._counters[f"shed_{reason}"] += 1
+    logging.warning(f"Request shed by admission control ({reason}): {self._in_flight} in flight, {self._queued} waiting.")
+
+  def _take_user_token(self, user_id: str) -> bool:
+    """
+    Takes a token from the user's bucket, refilled at user_rate tokens per second up to user_burst.
+
+    Returns:
+      bool: Whether the user had a token left. Always True when the per-user limit is disabled.
+    """
+    if not self.user_rate:
+      return True
+    now = time.monotonic()
+    tokens, updated_at = self._user_buckets.pop(user_id, (float(self.user_burst), now))
+    tokens = min(float(self.user_burst), tokens + (now - updated_at) * self.user_rate)
+    allowed = tokens >= 1
+    self._user_buckets[user_id] = (tokens - 1 if allowed else tokens, now)
+    while len(self._user_buckets) > self.max_tracked_users:
+      self._user_buckets.popitem(last=False)
+    return allowed
+
+admission_controller = AdmissionController()
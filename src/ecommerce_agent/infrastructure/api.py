@@ -1,49 +1,194 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 import logging
 
+from ecommerce_agent.infrastructure.startup import startup_monitor
 from ecommerce_agent.infrastructure.logger import setup_logging
 setup_logging()
 import asyncio
+import hashlib
+import hmac
+import importlib
+import json
+import math
+import secrets
+import time
+import uuid
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional
 from pydantic import BaseModel
 
-from ecommerce_agent.application.services.conversation_service.generate_response import generate_response, get_streaming_response
+# The conversation service (LangChain, LangGraph, the LLM clients) and the Telegram bot are heavy to import,
+# so they are imported by the warmup and by the handlers that use them, not when this module is imported.
+from ecommerce_agent.infrastructure.admission_control import AdmissionRejected, AdmissionTicket, admission_controller
 from ecommerce_agent.infrastructure.database.postgresql.postgres_client import db_transaction, db_client
-from ecommerce_agent.infrastructure.messaging.telegram.telegram_bot_handler import bot_instance, telegram_bot_main
+from ecommerce_agent.infrastructure.metrics import RouteMetricsMiddleware, registry, stage_timer
+from ecommerce_agent.infrastructure.profiling import (
+  ProfilingExecutor, SamplingBusy, collapsed_stacks, is_authorized, profiling_enabled, request_profiler, sample_process, sample_summary
+)
+from ecommerce_agent.infrastructure.messaging.telegram.update_dispatcher import TelegramUpdateDispatcher, get_restart_point, mark_turn_started
+from ecommerce_agent.infrastructure.tracing import tracer
 from ecommerce_agent.config import settings
 
+startup_monitor.record("import api", startup_monitor.started_at)
+
+CONVERSATION_SERVICE_MODULE = "ecommerce_agent.application.services.conversation_service.generate_response"
+TELEGRAM_BOT_MODULE = "ecommerce_agent.infrastructure.messaging.telegram.telegram_bot_handler"
+
+def _warmup_phases(app: FastAPI) -> list[tuple[str, Callable[[], Awaitable[Any]]]]:
+    """
+    Returns the warmup phases in order, as (name, coroutine function) pairs.
+    """
+    async def import_telegram_bot() -> None:
+        telegram_bot = await asyncio.to_thread(importlib.import_module, TELEGRAM_BOT_MODULE)
+        asyncio.create_task(telegram_bot.telegram_bot_main(app))
+
+    async def set_up_checkpointer() -> None:
+        from ecommerce_agent.application.services.conversation_service.workflow.graph import get_checkpointer
+        checkpointer = get_checkpointer()
+        if checkpointer is not None:
+            await asyncio.to_thread(checkpointer.setup)
+
+    async def expire_threads() -> None:
+        await expire_idle_threads()
+
+    async def compile_graph() -> None:
+        from ecommerce_agent.application.services.conversation_service.workflow.graph import get_compiled_graph
+        await asyncio.to_thread(get_compiled_graph)
+
+    async def load_embedding_model() -> None:
+        from ecommerce_agent.application.services.rag.embeddings import get_embeddings_service
+        await asyncio.to_thread(get_embeddings_service)
+
+    async def load_intent_router() -> None:
+        from ecommerce_agent.application.services.conversation_service.workflow.intent_router import intent_router
+        await asyncio.to_thread(intent_router.load)
+
+    async def warmup_retrieval() -> None:
+        from ecommerce_agent.application.services.conversation_service.workflow.tools import tools
+        await asyncio.gather(*(tool.ainvoke({"query": settings.WARMUP_QUERY, "top_k": 1}) for tool in tools))
+
+    phases = [
+        ("import conversation service", lambda: asyncio.to_thread(importlib.import_module, CONVERSATION_SERVICE_MODULE)),
+        ("import telegram bot", import_telegram_bot),
+        ("open database pool", lambda: asyncio.to_thread(db_client.ping)),
+        ("set up checkpointer", set_up_checkpointer),
+        ("compile graph", compile_graph),
+        ("expire idle threads", expire_threads),
+    ]
+    if settings.WARMUP_ENABLED:
+        phases.append(("load embedding model", load_embedding_model))
+        if settings.INTENT_ROUTER_MODE != "off":
+            phases.append(("load intent router", load_intent_router))
+        phases.append(("warmup retrieval", warmup_retrieval))
+    return phases
+
+async def expire_idle_threads() -> None:
+    """
+    Deletes the conversations whose last turn is older than settings.MEMORY_THREAD_TTL. Every /chat request without
+    a thread_id starts a conversation, so without this the checkpointer would keep growing.
+    """
+    from ecommerce_agent.application.services.conversation_service.workflow.graph import get_checkpointer
+    checkpointer = get_checkpointer()
+    if checkpointer is None or settings.MEMORY_THREAD_TTL <= 0:
+        return
+    deleted = await asyncio.to_thread(checkpointer.delete_expired_threads, settings.MEMORY_THREAD_TTL)
+    logging.info(f"Deleted {deleted} checkpoints of conversations idle for more than {settings.MEMORY_THREAD_TTL:g} s.")
+
+async def sweep_idle_threads() -> None:
+    """
+    Runs expire_idle_threads every settings.MEMORY_SWEEP_INTERVAL seconds once the application is ready.
+    The warmup runs the first sweep.
+    """
+    while True:
+        await asyncio.sleep(settings.MEMORY_SWEEP_INTERVAL)
+        if not startup_monitor.ready:
+            continue
+        try:
+            await expire_idle_threads()
+        except Exception as e:
+            logging.error(f"Error deleting idle conversations: {e}")
+
+async def warmup(app: FastAPI) -> None:
+    """
+    Prepares the application in the background once it is serving, so the first real request does not pay
+    for imports, model loading or connection setup. Liveness is reported from the start, readiness only once this finishes.
+    Each phase is timed and the breakdown is logged at the end.
+
+    Phases: import the conversation service and the Telegram bot (and set up its webhook), open the database pool,
+    set up the checkpointer tables, compile the graph and delete idle conversations. With settings.WARMUP_ENABLED it also loads the embedding model
+    and the intent router, and runs one retrieval per tool.
+
+    A failed phase is retried with exponential backoff, from settings.WARMUP_RETRY_BACKOFF up to settings.WARMUP_RETRY_MAX_BACKOFF
+    seconds, without running the phases that already succeeded again. After settings.WARMUP_MAX_ATTEMPTS failed attempts
+    the warmup gives up and liveness fails as well, so the process gets restarted instead of staying unready forever.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    phases = _warmup_phases(app)
+    completed = 0
+    max_attempts = max(1, settings.WARMUP_MAX_ATTEMPTS)
+    for attempt in range(1, max_attempts + 1):
+        try:
+            while completed < len(phases):
+                name, run = phases[completed]
+                with startup_monitor.phase(name):
+                    await run()
+                completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt == max_attempts:
+                logging.error(f"Warmup phase '{name}' failed {attempt} times, giving up: {e}")
+                startup_monitor.mark_failed(e)
+                return
+            delay = min(settings.WARMUP_RETRY_BACKOFF * 2 ** (attempt - 1), settings.WARMUP_RETRY_MAX_BACKOFF)
+            logging.warning(f"Warmup phase '{name}' failed (attempt {attempt} of {max_attempts}), retrying in {delay:g} s: {e}")
+            startup_monitor.mark_retrying(e)
+            await asyncio.sleep(delay)
+            continue
+        startup_monitor.mark_ready()
+        logging.info("Application warmed up and ready.")
+        return
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Context manager for managing the lifespan of the FastAPI application.
-    Initializes database connections, creates necessary tables and functions for document storage,
-    and sets up the Telegram bot webhook upon startup. Ensures proper shutdown procedures.
+    Starts the Telegram update dispatcher and the background warmup (database, checkpointer tables, graph,
+    embedding model and Telegram webhook) upon startup. Ensures proper shutdown procedures.
 
     Args:
         app (FastAPI): The FastAPI application instance.
 
     Yields:
         None: The execution context within the lifespan.
-
-    Raises:
-        Exception: If an error occurs during database initialization.
     """
     logging.info("Initializing FastAPI application...")
-    try:
-        asyncio.create_task(telegram_bot_main(app))
-    except Exception as e:
-        logging.error(f"Error initializing database at agent startup: {e}")
-        raise
+    if profiling_enabled():
+        # Lets a profiled request follow the work it hands to threads (asyncio.to_thread, LangChain executors)
+        asyncio.get_running_loop().set_default_executor(ProfilingExecutor(thread_name_prefix="asyncio"))
+    telegram_dispatcher.start()
+    warmup_task = asyncio.create_task(warmup(app))
+    sweep_task = asyncio.create_task(sweep_idle_threads())
     yield
     logging.info("Shutting down FastAPI application...")
+    warmup_task.cancel()
+    sweep_task.cancel()
+    await telegram_dispatcher.stop()
+    await asyncio.to_thread(tracer.shutdown)
     db_client.close_connection()
     logging.info("PostgreSQL connection closed for the agent tool.")
 
 app = FastAPI(lifespan=lifespan)
 
+app.add_middleware(RouteMetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -54,29 +199,264 @@ app.add_middleware(
 
 class ChatMessage(BaseModel):
     message: str
-    
+    thread_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+# Signs the conversation ids handed out by the HTTP routes, so a client can only resume conversations it was given
+_thread_id_key = (settings.THREAD_ID_SECRET or secrets.token_hex(32)).encode()
+
+def _sign_thread_id(conversation_id: str) -> str:
+  return hmac.new(_thread_id_key, conversation_id.encode(), hashlib.sha256).hexdigest()[:32]
+
+def _resolve_thread_id(chat_message: ChatMessage) -> str:
+  """
+  Returns the conversation id of an HTTP chat request: the given thread_id if this server issued it, or a new one.
+  Issued ids are "<uuid>.<signature>"; Telegram conversations ("telegram:<chat_id>") are never reachable over HTTP.
+
+  Raises:
+    HTTPException: 400 if the thread_id was not issued by this server.
+  """
+  if not chat_message.thread_id:
+    conversation_id = str(uuid.uuid4())
+    return f"{conversation_id}.{_sign_thread_id(conversation_id)}"
+  conversation_id, _, signature = chat_message.thread_id.rpartition(".")
+  if (
+    not conversation_id or conversation_id.startswith("telegram:")
+    or not hmac.compare_digest(signature.encode(), _sign_thread_id(conversation_id).encode())
+  ):
+    raise HTTPException(status_code=400, detail="Unknown thread_id, start a new conversation without one.")
+  return chat_message.thread_id
+
+def _get_user_id(chat_message: ChatMessage, request: Request) -> Optional[str]:
+  """
+  Identifies the caller for the per-user rate limit: the client address. The body's user_id is only used
+  with settings.ADMISSION_TRUST_USER_ID, when a gateway in front of the API authenticates users and sets it;
+  otherwise any caller could pick a fresh user_id per request and never be limited.
+  """
+  if settings.ADMISSION_TRUST_USER_ID and chat_message.user_id:
+    return chat_message.user_id
+  return request.client.host if request.client else None
+
+async def _admit(chat_message: ChatMessage, request: Request):
+  """
+  Waits for a processing slot for an HTTP chat request.
+
+  Raises:
+    HTTPException: 429 with a Retry-After header if the request is shed.
+  """
+  try:
+    return await admission_controller.acquire(user_id=_get_user_id(chat_message, request))
+  except AdmissionRejected as e:
+    raise HTTPException(
+      status_code=429,
+      detail=f"The assistant is busy ({e.reason}), please retry later.",
+      headers={"Retry-After": str(math.ceil(e.retry_after))}
+    )
+
+def _profile_requested(request: Request) -> bool:
+  """
+  Tells whether the request asks to be profiled with the X-Profile header. The header is ignored while profiling is off.
+
+  Raises:
+    HTTPException: 403 if profiling is on and the X-Profile-Token header is missing or wrong.
+  """
+  if not profiling_enabled() or request.headers.get("X-Profile", "").lower() not in ("1", "true"):
+    return False
+  if not is_authorized(request.headers.get("X-Profile-Token")):
+    raise HTTPException(status_code=403, detail="Invalid profiling token.")
+  return True
+
+def _require_profiling_token(request: Request) -> None:
+  """
+  Guards the profiling endpoints.
+
+  Raises:
+    HTTPException: 404 while profiling is off, 403 if the X-Profile-Token header is missing or wrong.
+  """
+  if not profiling_enabled():
+    raise HTTPException(status_code=404, detail="Not Found")
+  if not is_authorized(request.headers.get("X-Profile-Token")):
+    raise HTTPException(status_code=403, detail="Invalid profiling token.")
+
 @app.post("/chat")
-async def chat(chat_message: ChatMessage):
+async def chat(chat_message: ChatMessage, request: Request, http_response: Response):
   """
   Handles incoming chat messages and generates a response using the conversation agent.
+  With the X-Profile and X-Profile-Token headers, the turn is profiled and the X-Profile-Id response header
+  names the report to download from /profiling/requests.
 
   Args:
     chat_message (ChatMessage): The incoming chat message containing the user's message string.
+    request (Request): The incoming FastAPI request object.
+    http_response (Response): The outgoing response, to set the profiling headers on.
 
   Returns:
-    dict: A dictionary containing the agent's response.
+    dict: A dictionary containing the agent's response and the thread_id to send with the next message.
 
   Raises:
-    HTTPException: If an error occurs during response generation.
+    HTTPException: 400 if the thread_id was not issued by this server, 403 if profiling is asked for with a wrong token,
+      429 if the request is shed by admission control, 500 if an error occurs during response generation.
   """
+  from ecommerce_agent.application.services.conversation_service.generate_response import generate_response
+  profile_requested = _profile_requested(request)
+  thread_id = _resolve_thread_id(chat_message)
+  ticket = await _admit(chat_message, request)
   try:
       logging.info(f"Chat message received: {chat_message.message}")
-      response, _ = await generate_response(chat_message.message)
+      with request_profiler.profile(f"/chat thread {thread_id}") if profile_requested else nullcontext() as profile:
+          response, _ = await generate_response(chat_message.message, thread_id=thread_id)
+      if profile is not None:
+          http_response.headers["X-Profile-Id"] = profile.id
+      elif profile_requested:
+          http_response.headers["X-Profile-Error"] = "busy"
       logging.info(f"Response generated: {response}")
-      return {"response": response}
+      return {"response": response, "thread_id": thread_id}
   except Exception as e:
       raise HTTPException(status_code=500, detail=str(e))
+  finally:
+      ticket.release()
     
+def _format_sse(event: str, data: dict[str, Any]) -> str:
+  """
+  Formats an event as a server-sent events frame.
+  """
+  return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def _stream_chat_events(request: Request, message: str, thread_id: str, ticket: AdmissionTicket) -> AsyncGenerator[str, None]:
+  """
+  Streams the agent events of one message as SSE frames, stopping the generation if the client goes away.
+
+  Args:
+    request (Request): The incoming request, used to detect client disconnects.
+    message (str): The user's message.
+    thread_id (str): The conversation id.
+    ticket (AdmissionTicket): The admission slot held by the stream, released when it ends.
+
+  Yields:
+    str: SSE frames: "start", then "token", "tool_start" and "tool_end" events, then "end" or "error".
+  """
+  from ecommerce_agent.application.services.conversation_service.generate_response import get_streaming_events
+  events = get_streaming_events(message, thread_id=thread_id)
+  try:
+    yield _format_sse("start", {"thread_id": thread_id})
+    async for event in events:
+      if await request.is_disconnected():
+        logging.info(f"Client disconnected from stream for thread {thread_id}, cancelling generation.")
+        return
+      yield _format_sse(event["event"], event["data"])
+    yield _format_sse("end", {"thread_id": thread_id})
+  except asyncio.CancelledError:
+    logging.info(f"Stream for thread {thread_id} cancelled, cancelling generation.")
+    raise
+  except Exception as e:
+    logging.error(f"Error streaming response: {e}")
+    yield _format_sse("error", {"detail": str(e)})
+  finally:
+    # Closing the generator cancels the graph run and releases its tool calls and connections
+    await events.aclose()
+    ticket.release()
+
+@app.post("/chat/stream")
+async def chat_stream(chat_message: ChatMessage, request: Request):
+  """
+  Handles incoming chat messages and streams the response as server-sent events.
+
+  Tokens are sent as soon as the conversation node produces them, and tool calls are reported
+  with "tool_start" and "tool_end" events. Generation is cancelled if the client disconnects.
+
+  Args:
+    chat_message (ChatMessage): The incoming chat message containing the user's message string.
+    request (Request): The incoming FastAPI request object.
+
+  Returns:
+    StreamingResponse: A text/event-stream response.
+
+  Raises:
+    HTTPException: 400 if the thread_id was not issued by this server, 429 if the request is shed by admission control.
+  """
+  thread_id = _resolve_thread_id(chat_message)
+  ticket = await _admit(chat_message, request)
+  logging.info(f"Chat stream message received: {chat_message.message}")
+  return StreamingResponse(
+    _stream_chat_events(request, chat_message.message, thread_id, ticket),
+    media_type="text/event-stream",
+    headers={
+      "Cache-Control": "no-cache",
+      "X-Accel-Buffering": "no"
+    },
+    # Also released here in case the client leaves before the stream starts
+    background=BackgroundTask(ticket.release)
+  )
+
+async def handle_telegram_updates(updates: list[dict[str, Any]]) -> None:
+  """
+  Processes one turn of a Telegram chat in the background: generates a response with the conversation agent
+  and sends it back to the user. The texts of a burst of messages are joined into a single user message,
+  and updates without a text message are ignored. If generation fails the user gets an apology instead,
+  since the updates were already acknowledged and Telegram will not deliver them again.
+  The turn records the conversation checkpoint it starts from, so the dispatcher can cancel it for newer messages
+  and rerun it from there.
+
+  Args:
+    updates (list[dict[str, Any]]): The Telegram updates of the turn, oldest first.
+  """
+  from ecommerce_agent.application.services.conversation_service.generate_response import (
+    delete_conversation, generate_response, get_checkpoint_id, get_streaming_response
+  )
+  from ecommerce_agent.infrastructure.messaging.telegram.telegram_bot_handler import ERROR_REPLY, bot_instance, send_streaming_message
+  messages = [update["message"] for update in updates if "message" in update and "text" in update["message"]]
+  if not messages:
+      logging.info(f"Ignoring Telegram updates {[update.get('update_id') for update in updates]} without a text message.")
+      return
+  text = "\n".join(message["text"] for message in messages)
+  chat_id = messages[-1]["chat"]["id"]
+  if len(messages) > 1:
+      logging.info(f"Merged {len(messages)} Telegram messages from chat {chat_id} into one turn.")
+
+  thread_id = f"telegram:{chat_id}"
+  try:
+    ticket = await admission_controller.acquire(user_id=thread_id)
+  except AdmissionRejected as e:
+    logging.warning(f"Telegram chat {chat_id} shed by admission control: {e.reason}")
+    await bot_instance.send_message(chat_id=chat_id, text="I'm receiving a lot of messages right now. Please try again in a moment.")
+    return
+  try:
+    restart_point = get_restart_point()
+    if restart_point is None:
+      checkpoint_id = await get_checkpoint_id(thread_id)
+    else:
+      # A run of this turn was cancelled by newer messages after it saved to the conversation memory: start again from before it
+      checkpoint_id = restart_point["checkpoint_id"]
+      if checkpoint_id is None:
+        await delete_conversation(thread_id)
+    # From here the turn saves to the conversation memory, and newer messages rerun it from this checkpoint
+    mark_turn_started({"checkpoint_id": checkpoint_id})
+    logging.info("Generating response...")
+    if settings.TELEGRAM_DELIVERY_MODE == "stream":
+      # Send a placeholder right away and edit it as tokens arrive
+      agent_response_text = await send_streaming_message(
+        chat_id, get_streaming_response(text, thread_id=thread_id, trace_route="telegram", checkpoint_id=checkpoint_id)
+      )
+      logging.info(f"Agent response text: {agent_response_text}")
+    else:
+      try:
+        agent_response_obj, _ = await generate_response(text, thread_id=thread_id, trace_route="telegram", checkpoint_id=checkpoint_id)
+      except Exception:
+        # The update was acknowledged before this turn ran, so Telegram will not redeliver it: answer instead of staying silent
+        with stage_timer("telegram.send_message"):
+          await bot_instance.send_message(chat_id=chat_id, text=ERROR_REPLY)
+        raise
+      agent_response_text = str(agent_response_obj)
+      logging.info(f"Agent response text: {agent_response_text}")
+      # Send the response back to Telegram
+      with stage_timer("telegram.send_message"):
+        await bot_instance.send_message(chat_id=chat_id, text=agent_response_text)
+    logging.info("Response sent to Telegram")
+  finally:
+    ticket.release()
+
+telegram_dispatcher = TelegramUpdateDispatcher(handle_telegram_updates)
+
 # Telegram Webhook (will handle incoming bot requests)
 # This endpoint will be invoked by Telegram when a new message arrives.
 @app.post(f"/telegram_webhook/{settings.TELEGRAM_BOT_TOKEN}")
@@ -84,33 +464,221 @@ async def telegram_webhook(request: Request):
   """
   Handles incoming Telegram webhook updates.
 
-  Processes text messages from Telegram, generates a response using the conversation agent,
-  and sends the response back to the user.
+  The update is acknowledged immediately and processed in the background by the dispatcher,
+  so a slow generation never makes Telegram time out and redeliver it. Redelivered updates are ignored,
+  and a burst of messages from the same chat is answered as a single turn.
 
   Args:
     request (Request): The incoming FastAPI request object containing the Telegram update.
 
   Returns:
-    dict: A status dictionary indicating whether the update was processed or ignored.
+    dict: A status dictionary indicating whether the update was queued or was a duplicate.
+
+  Raises:
+    HTTPException: 503 if the update queue is full, so Telegram delivers it again later.
   """
   update = await request.json()
   logging.info(f"Telegram update received: {update}")
-  if "message" in update and "text" in update["message"]:
-      text = update["message"]["text"]
-      chat_id = update["message"]["chat"]["id"]
-      user_id = update["message"]["from"]["id"]
-      
-
-      logging.info("Generating response...")
-      agent_response_obj, _ = await generate_response(text)
-      agent_response_text = str(agent_response_obj)
-      logging.info(f"Agent response text: {agent_response_text}")
-      # Send the response back to Telegram
-      await bot_instance.send_message(chat_id=chat_id, text=agent_response_text)
-      logging.info("Response sent to Telegram")
-      return {"status": "ok"}
-  
-  return {"status": "ignored", "message": "No text message received or processed."}
+  status = telegram_dispatcher.submit(update)
+  if status == "rejected":
+      raise HTTPException(status_code=503, detail="Telegram update queue is full.")
+  return {"status": status}
+
+@app.get("/telegram/metrics")
+async def telegram_metrics():
+  """
+  Returns the Telegram update queue depth and processing counters.
+
+  Returns:
+    dict: The dispatcher metrics.
+  """
+  return telegram_dispatcher.metrics()
+
+@app.get("/speculation/metrics")
+async def speculation_metrics():
+  """
+  Returns the speculative retrieval hit rate and wasted work.
+
+  Returns:
+    dict: The speculative retriever metrics.
+  """
+  from ecommerce_agent.application.services.conversation_service.workflow.speculation import speculative_retriever
+  return speculative_retriever.metrics()
+
+@app.get("/intent_router/metrics")
+async def intent_router_metrics():
+  """
+  Returns how many turns the intent router handled, its agreement with the LLM and the estimated time saved.
+
+  Returns:
+    dict: The intent router metrics.
+  """
+  from ecommerce_agent.application.services.conversation_service.workflow.intent_router import intent_router
+  return intent_router.metrics()
+
+@app.get("/tool_memo/metrics")
+async def tool_memo_metrics():
+  """
+  Returns how many tool calls were repeats answered from the per-thread memo, overall and per tool.
+
+  Returns:
+    dict: The tool memo metrics.
+  """
+  from ecommerce_agent.application.services.conversation_service.workflow.tool_memo import tool_result_memo
+  return tool_result_memo.metrics()
+
+@app.get("/llm/metrics")
+async def llm_metrics():
+  """
+  Returns the per-model LLM latency histograms, errors and timeouts, and the hedge and failover counters.
+
+  Returns:
+    dict: The LLM latency tracker metrics.
+  """
+  from ecommerce_agent.application.services.conversation_service.workflow.hedged_llm import llm_latency_tracker
+  return llm_latency_tracker.metrics()
+
+@app.get("/tracing/metrics")
+async def tracing_metrics():
+  """
+  Returns the tracing sampling counters and the state of the Langfuse client.
+
+  Returns:
+    dict: The tracer metrics.
+  """
+  return tracer.metrics()
+
+@app.get("/admission/metrics")
+async def admission_metrics():
+  """
+  Returns the admission control load and its admitted, queued and shed counters.
+
+  Returns:
+    dict: The admission controller metrics.
+  """
+  return admission_controller.metrics()
+
+@app.get("/metrics")
+async def metrics():
+  """
+  Exposes the stage latency histograms, stage error counters and route latencies in the Prometheus text format,
+  to be scraped directly by Prometheus.
+
+  Returns:
+    PlainTextResponse: The metrics in the Prometheus text exposition format.
+  """
+  return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/profiling/sample")
+async def profiling_sample(request: Request, seconds: float = 10.0, interval_ms: float = 10.0, format: str = "collapsed"):
+  """
+  Samples the stacks of every thread of the process for a while and returns them for download.
+  Needs the X-Profile-Token header.
+
+  Args:
+    request (Request): The incoming FastAPI request object.
+    seconds (float): How long to sample, capped at PROFILING_MAX_SECONDS.
+    interval_ms (float): Milliseconds between samples.
+    format (str): "collapsed" for flamegraph.pl or speedscope, "text" for the functions seen most often.
+
+  Returns:
+    PlainTextResponse: The samples as an attachment.
+
+  Raises:
+    HTTPException: 400 for an unknown format, 403 or 404 as for every profiling endpoint, 409 if another sample is running.
+  """
+  _require_profiling_token(request)
+  if format not in ("collapsed", "text"):
+    raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'text'.")
+  try:
+    samples = await asyncio.to_thread(sample_process, max(0.0, seconds), max(1.0, interval_ms) / 1000)
+  except SamplingBusy as e:
+    raise HTTPException(status_code=409, detail=str(e))
+  body = collapsed_stacks(samples) if format == "collapsed" else sample_summary(samples)
+  filename = f"process-{int(time.time())}.{'folded' if format == 'collapsed' else 'txt'}"
+  return PlainTextResponse(body, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/profiling/requests")
+async def profiling_requests(request: Request):
+  """
+  Lists the kept request profiles, newest first. Needs the X-Profile-Token header.
+
+  Returns:
+    list[dict]: The id, label, start time, duration and number of thread tasks of each profile.
+  """
+  _require_profiling_token(request)
+  return request_profiler.reports()
+
+@app.get("/profiling/requests/{profile_id}")
+async def profiling_request(profile_id: str, request: Request, format: str = "text", sort: str = "cumulative", limit: int = 50):
+  """
+  Downloads a request profile. Needs the X-Profile-Token header.
+
+  Args:
+    profile_id (str): The X-Profile-Id returned with the profiled response.
+    request (Request): The incoming FastAPI request object.
+    format (str): "text" for a pstats table, "pstats" for the binary profile (pstats, snakeviz, gprof2dot).
+    sort (str): pstats sort key of the text table, e.g. "cumulative" or "tottime".
+    limit (int): Number of functions in the text table.
+
+  Returns:
+    PlainTextResponse | Response: The profile as an attachment.
+
+  Raises:
+    HTTPException: 400 for an unknown format or sort key, 403 or 404 as for every profiling endpoint,
+      404 if the profile is unknown or was dropped.
+  """
+  _require_profiling_token(request)
+  profile = request_profiler.get(profile_id)
+  if profile is None:
+    raise HTTPException(status_code=404, detail="Unknown profile.")
+  if format == "pstats":
+    return Response(
+      profile.pstats_bytes(),
+      media_type="application/octet-stream",
+      headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+    )
+  if format != "text":
+    raise HTTPException(status_code=400, detail="format must be 'text' or 'pstats'.")
+  try:
+    body = profile.text(sort=sort, limit=limit)
+  except KeyError as e:
+    raise HTTPException(status_code=400, detail=f"Unknown sort key {e}.")
+  return PlainTextResponse(body, headers={"Content-Disposition": f'attachment; filename="{profile_id}.txt"'})
+
+@app.get("/health/live")
+async def liveness():
+  """
+  Liveness probe: reports that the process is up and serving requests, without checking its dependencies,
+  so a slow warmup or a database outage does not get the process restarted. It only fails once the warmup gave up
+  retrying, since the process will never become ready then.
+
+  Returns:
+    dict | JSONResponse: The liveness status, with a 503 status code after the warmup gave up.
+  """
+  if startup_monitor.failed:
+    return JSONResponse(status_code=503, content={"status": "failed", **startup_monitor.status()})
+  return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+  """
+  Readiness probe: reports whether the application should receive traffic, i.e. the startup warmup finished
+  and the database answers. The body includes the per-phase startup timing breakdown.
+
+  Returns:
+    dict | JSONResponse: The readiness status, with a 503 status code while starting (the body shows the last warmup error
+      while it is retried), after the warmup gave up or without database.
+  """
+  status = startup_monitor.status()
+  if not startup_monitor.ready:
+    return JSONResponse(status_code=503, content={"status": "failed" if startup_monitor.failed else "starting", **status})
+  try:
+    await asyncio.wait_for(asyncio.to_thread(db_client.ping), timeout=settings.READINESS_DB_TIMEOUT)
+  except Exception as e:
+    logging.warning(f"Readiness check failed, database unavailable: {e!r}")
+    return JSONResponse(status_code=503, content={"status": "database_unavailable", **status, "error": repr(e)})
+  return {"status": "ready", **status}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,297 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+import psycopg2
+from psycopg2.extras import execute_values
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+  WRITES_IDX_MAP,
+  BaseCheckpointSaver,
+  ChannelVersions,
+  Checkpoint,
+  CheckpointMetadata,
+  CheckpointTuple,
+  get_checkpoint_id,
+)
+from ecommerce_agent.config import settings
+from ecommerce_agent.infrastructure.database.postgresql.postgres_client import PostgresClient, db_client, db_transaction
+import logging
+
+class PostgresCheckpointSaver(BaseCheckpointSaver[int]):
+  """
+  LangGraph checkpoint saver that persists conversation checkpoints in PostgreSQL
+  through the shared psycopg2 connection pool.
+
+  Each checkpoint is stored as one serialized row keyed by (thread_id, checkpoint_ns, checkpoint_id),
+  and pending writes are stored in a separate table. Async methods run the sync ones in a worker thread.
+  """
+  def __init__(self, client: PostgresClient = db_client, keep_last: int = None):
+    """
+    Initializes the PostgresCheckpointSaver with a database client.
+
+    Args:
+      client (PostgresClient): The database client. Defaults to the global db_client.
+      keep_last (int, optional): Checkpoints kept per thread when a turn starts. Defaults to settings.MEMORY_CHECKPOINTS_PER_THREAD.
+    """
+    super().__init__()
+    self.db_client = client
+    self.keep_last = keep_last if keep_last is not None else settings.MEMORY_CHECKPOINTS_PER_THREAD
+
+  def setup(self) -> None:
+    """
+    Creates the checkpoint tables if they do not exist.
+    """
+    try:
+      with db_transaction() as conn:
+        cursor = conn.cursor()
+        logging.info("Creating checkpoint tables...")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS checkpoints (
+          thread_id TEXT NOT NULL,
+          checkpoint_ns TEXT NOT NULL DEFAULT '',
+          checkpoint_id TEXT NOT NULL,
+          parent_checkpoint_id TEXT,
+          checkpoint_type TEXT NOT NULL,
+          checkpoint BYTEA NOT NULL,
+          metadata_type TEXT NOT NULL,
+          metadata BYTEA NOT NULL,
+          created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+          PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+        );
+        CREATE TABLE IF NOT EXISTS checkpoint_writes (
+          thread_id TEXT NOT NULL,
+          checkpoint_ns TEXT NOT NULL DEFAULT '',
+          checkpoint_id TEXT NOT NULL,
+          task_id TEXT NOT NULL,
+          idx INTEGER NOT NULL,
+          channel TEXT NOT NULL,
+          value_type TEXT NOT NULL,
+          value BYTEA NOT NULL,
+          task_path TEXT NOT NULL DEFAULT '',
+          PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        );
+        """)
+        cursor.close()
+    except Exception as e:
+      logging.error(f"Error creating checkpoint tables: {e}")
+      raise
+
+  def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[tuple[str, str, Any]]:
+    """
+    Loads the pending writes of a checkpoint.
+    """
+    query = """
+        SELECT task_id, channel, value_type, value FROM checkpoint_writes
+        WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s
+        ORDER BY task_id, idx
+    """
+    rows = self.db_client.execute_query(query, (thread_id, checkpoint_ns, checkpoint_id), fetch_all=True) or []
+    return [
+      (row['task_id'], row['channel'], self.serde.loads_typed((row['value_type'], bytes(row['value']))))
+      for row in rows
+    ]
+
+  def _row_to_tuple(self, row: dict) -> CheckpointTuple:
+    """
+    Builds a CheckpointTuple from a checkpoints row.
+    """
+    thread_id, checkpoint_ns, checkpoint_id = row['thread_id'], row['checkpoint_ns'], row['checkpoint_id']
+    parent_config = None
+    if row['parent_checkpoint_id']:
+      parent_config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": row['parent_checkpoint_id']}}
+    return CheckpointTuple(
+      config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+      checkpoint=self.serde.loads_typed((row['checkpoint_type'], bytes(row['checkpoint']))),
+      metadata=self.serde.loads_typed((row['metadata_type'], bytes(row['metadata']))),
+      parent_config=parent_config,
+      pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id)
+    )
+
+  def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+    """
+    Returns the requested checkpoint of a thread, or its latest checkpoint when no id is given.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+    checkpoint_id = get_checkpoint_id(config)
+    if checkpoint_id:
+      query = """
+          SELECT * FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s
+      """
+      params = (thread_id, checkpoint_ns, checkpoint_id)
+    else:
+      query = """
+          SELECT * FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s
+          ORDER BY checkpoint_id DESC LIMIT 1
+      """
+      params = (thread_id, checkpoint_ns)
+    row = self.db_client.execute_query(query, params, fetch_one=True)
+    return self._row_to_tuple(row) if row else None
+
+  def list(
+    self,
+    config: Optional[RunnableConfig],
+    *,
+    filter: Optional[dict[str, Any]] = None,
+    before: Optional[RunnableConfig] = None,
+    limit: Optional[int] = None
+  ) -> Iterator[CheckpointTuple]:
+    """
+    Lists checkpoints, newest first, optionally restricted to a thread, a metadata filter and an upper bound.
+    """
+    conditions, params = [], []
+    if config is not None:
+      conditions.append("thread_id = %s")
+      params.append(config["configurable"]["thread_id"])
+      if config["configurable"].get("checkpoint_ns") is not None:
+        conditions.append("checkpoint_ns = %s")
+        params.append(config["configurable"]["checkpoint_ns"])
+    if before is not None and get_checkpoint_id(before):
+      conditions.append("checkpoint_id < %s")
+      params.append(get_checkpoint_id(before))
+    query = "SELECT * FROM checkpoints"
+    if conditions:
+      query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY checkpoint_id DESC"
+    if limit is not None and not filter:
+      query += " LIMIT %s"
+      params.append(limit)
+    rows = self.db_client.execute_query(query, tuple(params), fetch_all=True) or []
+    returned = 0
+    for row in rows:
+      checkpoint_tuple = self._row_to_tuple(row)
+      if filter and not all(checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()):
+        continue
+      yield checkpoint_tuple
+      returned += 1
+      if limit is not None and returned >= limit:
+        return
+
+  def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+    """
+    Stores a checkpoint and returns the config pointing at it.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+    checkpoint_type, checkpoint_value = self.serde.dumps_typed(checkpoint)
+    metadata_type, metadata_value = self.serde.dumps_typed(metadata)
+    query = """
+        INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id) DO UPDATE SET
+          checkpoint_type = EXCLUDED.checkpoint_type,
+          checkpoint = EXCLUDED.checkpoint,
+          metadata_type = EXCLUDED.metadata_type,
+          metadata = EXCLUDED.metadata
+    """
+    prune_query = """
+        DELETE FROM {table}
+        WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id NOT IN (
+          SELECT checkpoint_id FROM checkpoints
+          WHERE thread_id = %s AND checkpoint_ns = %s
+          ORDER BY checkpoint_id DESC
+          LIMIT %s
+        )
+    """
+    prune_params = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+    with db_transaction() as conn:
+      cursor = conn.cursor()
+      cursor.execute(query, (
+        thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+        checkpoint_type, psycopg2.Binary(checkpoint_value), metadata_type, psycopg2.Binary(metadata_value)
+      ))
+      # Only the latest checkpoints are needed to resume a conversation, so older ones are dropped. This only happens
+      # when a turn saves its input: the checkpoint a turn started from is kept until it ends, so the turn can be rerun from it
+      if metadata.get("source") == "input":
+        cursor.execute(prune_query.format(table="checkpoint_writes"), prune_params)
+        cursor.execute(prune_query.format(table="checkpoints"), prune_params)
+      cursor.close()
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+  def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+    """
+    Stores the intermediate writes of a task for a checkpoint.
+    Special channels (errors, interrupts) overwrite previous values; regular writes are stored once.
+    """
+    if not writes:
+      return
+    thread_id = config["configurable"]["thread_id"]
+    checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+    checkpoint_id = config["configurable"]["checkpoint_id"]
+    rows = []
+    for i, (channel, value) in enumerate(writes):
+      value_type, serialized = self.serde.dumps_typed(value)
+      rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, i), channel, value_type, psycopg2.Binary(serialized), task_path))
+    if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+      on_conflict = "DO UPDATE SET channel = EXCLUDED.channel, value_type = EXCLUDED.value_type, value = EXCLUDED.value"
+    else:
+      on_conflict = "DO NOTHING"
+    query = f"""
+        INSERT INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path)
+        VALUES %s
+        ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) {on_conflict}
+    """
+    with db_transaction() as conn:
+      cursor = conn.cursor()
+      execute_values(cursor, query, rows)
+      cursor.close()
+
+  def delete_thread(self, thread_id: str) -> None:
+    """
+    Deletes every checkpoint and write of a thread.
+    """
+    with db_transaction() as conn:
+      cursor = conn.cursor()
+      cursor.execute("DELETE FROM checkpoint_writes WHERE thread_id = %s", (thread_id,))
+      cursor.execute("DELETE FROM checkpoints WHERE thread_id = %s", (thread_id,))
+      cursor.close()
+
+  def delete_expired_threads(self, ttl: float) -> int:
+    """
+    Deletes every thread whose latest checkpoint is older than ttl seconds, with its writes.
+
+    Args:
+      ttl (float): Seconds a thread is kept after its last checkpoint.
+
+    Returns:
+      int: The number of checkpoints deleted.
+    """
+    query = """
+        WITH expired AS (
+          SELECT thread_id FROM checkpoints
+          GROUP BY thread_id
+          HAVING max(created_at) < now() - make_interval(secs => %s)
+        ), deleted_writes AS (
+          DELETE FROM checkpoint_writes WHERE thread_id IN (SELECT thread_id FROM expired)
+        )
+        DELETE FROM checkpoints WHERE thread_id IN (SELECT thread_id FROM expired)
+    """
+    with db_transaction() as conn:
+      cursor = conn.cursor()
+      cursor.execute(query, (ttl,))
+      deleted = cursor.rowcount
+      cursor.close()
+    return deleted
+
+  async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+    return await asyncio.to_thread(self.get_tuple, config)
+
+  async def alist(
+    self,
+    config: Optional[RunnableConfig],
+    *,
+    filter: Optional[dict[str, Any]] = None,
+    before: Optional[RunnableConfig] = None,
+    limit: Optional[int] = None
+  ) -> AsyncIterator[CheckpointTuple]:
+    checkpoint_tuples = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+    for checkpoint_tuple in checkpoint_tuples:
+      yield checkpoint_tuple
+
+  async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+    return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+  async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+    await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+  async def adelete_thread(self, thread_id: str) -> None:
+    await asyncio.to_thread(self.delete_thread, thread_id)
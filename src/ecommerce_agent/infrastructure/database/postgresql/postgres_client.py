@@ -1,21 +1,30 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from contextlib import contextmanager
 from ecommerce_agent.config import settings
+from ecommerce_agent.infrastructure.metrics import timed
 import logging
-from typing import Optional, Union
+import threading
+from typing import Iterator, Optional, Union
 
 class PostgresClient:
   """
   A client for interacting with the PostgreSQL database.
   Provides methods for establishing and closing connections, and executing queries.
+  Connections are handed out from a thread-safe pool so concurrent callers (e.g. tools
+  running in parallel) never share a single connection. When every connection is checked out,
+  callers wait for one to be given back instead of failing.
   """
   def __init__(self):
     """
     Initializes the PostgresClient by loading connection parameters.
     """
     self.conn_params = self._load_conn_params()
-    self._connection = None
+    self._pool: Optional[ThreadedConnectionPool] = None
+    self._pool_lock = threading.Lock()
+    # One slot per pooled connection: the pool itself raises PoolError instead of waiting when it is exhausted
+    self._slots = threading.BoundedSemaphore(max(1, settings.POSTGRES_POOL_MAX_SIZE))
     
   def _load_conn_params(self) -> dict[str, Union[str, int]]:
     """
@@ -33,35 +42,116 @@ class PostgresClient:
       "password": settings.POSTGRES_PASSWORD
     }
     
+  def _get_pool(self) -> ThreadedConnectionPool:
+    """
+    Returns the connection pool, creating it on first use.
+
+    Returns:
+      ThreadedConnectionPool: The pool of PostgreSQL connections.
+
+    Raises:
+      ConnectionError: If there is an error connecting to the database.
+    """
+    if self._pool is None or self._pool.closed:
+      with self._pool_lock:
+        if self._pool is None or self._pool.closed:
+          try:
+            self._pool = ThreadedConnectionPool(
+              minconn=settings.POSTGRES_POOL_MIN_SIZE,
+              maxconn=settings.POSTGRES_POOL_MAX_SIZE,
+              **self.conn_params
+            )
+            logging.info("Successfully connected to the PostgreSQL database.")
+          except psycopg2.Error as e:
+            logging.error(f"Error connecting to the database: {e}")
+            raise ConnectionError(f"Error connecting to the database: {e}")
+    return self._pool
+    
   def _get_connection(self) -> psycopg2.extensions.connection:
     """
-    Establishes and returns a new PostgreSQL database connection if one does not exist or is closed.
+    Checks out a PostgreSQL database connection from the pool, waiting up to settings.POSTGRES_POOL_TIMEOUT
+    seconds for one to be given back if all of them are in use.
+    The connection must be given back with `_release_connection`.
 
     Returns:
       psycopg2.extensions.connection: An active database connection object.
 
     Raises:
-      ConnectionError: If there is an error connecting to the database.
+      ConnectionError: If there is an error connecting to the database or no connection is free in time.
     """
-    if self._connection is None or self._connection.closed:
-      try:
-        self._connection = psycopg2.connect(**self.conn_params)
-        self._connection.autocommit = False # Control transactions manually
-        logging.info("Successfully connected to the PostgreSQL database.")
-      except psycopg2.Error as e:
-        logging.error(f"Error connecting to the database: {e}")
-        raise ConnectionError(f"Error connecting to the database: {e}")
-    return self._connection
+    if not self._slots.acquire(timeout=settings.POSTGRES_POOL_TIMEOUT):
+      logging.error(f"No database connection was free within {settings.POSTGRES_POOL_TIMEOUT} s.")
+      raise ConnectionError(f"No database connection was free within {settings.POSTGRES_POOL_TIMEOUT} s.")
+    try:
+      return self._checkout_connection()
+    except BaseException:
+      self._slots.release()
+      raise
+
+  def _checkout_connection(self) -> psycopg2.extensions.connection:
+    try:
+      connection = self._get_pool().getconn()
+    except PoolError as e:
+      logging.error(f"Error getting a connection from the pool: {e}")
+      raise ConnectionError(f"Error getting a connection from the pool: {e}")
+    if connection.closed:
+      self._get_pool().putconn(connection, close=True)
+      return self._checkout_connection()
+    connection.autocommit = False # Control transactions manually
+    return connection
   
+  def _release_connection(self, connection: psycopg2.extensions.connection) -> None:
+    """
+    Returns a connection to the pool.
+
+    Args:
+      connection (psycopg2.extensions.connection): The connection to give back.
+    """
+    try:
+      if self._pool is not None and not self._pool.closed:
+        self._pool.putconn(connection, close=bool(connection.closed))
+    finally:
+      self._slots.release()
+  
+  @contextmanager
+  def connection(self) -> Iterator[psycopg2.extensions.connection]:
+    """
+    Provides a context manager that checks out a connection and always returns it to the pool.
+
+    Yields:
+      psycopg2.extensions.connection: The database connection object.
+    """
+    connection = self._get_connection()
+    try:
+      yield connection
+    finally:
+      self._release_connection(connection)
+  
+  def ping(self) -> None:
+    """
+    Checks that the database answers, opening the connection pool if needed.
+
+    Raises:
+      ConnectionError: If the pool cannot be opened.
+      psycopg2.Error: If the database does not answer the query.
+    """
+    with self.connection() as connection:
+      try:
+        with connection.cursor() as cursor:
+          cursor.execute("SELECT 1")
+      finally:
+        connection.rollback()
+
   def close_connection(self) -> None:
     """
-    Closes the current PostgreSQL database connection if it is open.
+    Closes every PostgreSQL database connection held by the pool.
     """
-    if self._connection and not self._connection.closed:
-      self._connection.close()
-      self._connection = None
+    if self._pool is not None and not self._pool.closed:
+      self._pool.closeall()
+      self._pool = None
       logging.info("Disconnected from the PostgreSQL database.")
   
+  @timed("db.execute_query")
   def execute_query(self, query: str, params: Optional[tuple] = None, fetch_one: bool = False, fetch_all: bool = False) -> Optional[Union[dict, list[dict]]]:
     """
     Executes a SQL query on the PostgreSQL database.
@@ -113,6 +203,7 @@ class PostgresClient:
       if cursor:
         cursor.close()
         logging.debug("Cursor closed.")
+      self._release_connection(connection)
 
 # Global database client instance
 db_client = PostgresClient()
@@ -129,17 +220,17 @@ def db_transaction():
   Raises:
     psycopg2.Error: If an error occurs within the transaction block.
   """
-  connection = db_client._get_connection()
-  try:
-    logging.info("Starting database transaction.")
-    yield connection
-    connection.commit()
-    logging.info("Database transaction committed successfully.")
-  except psycopg2.Error as e:
-    logging.error(f"Error in database transaction: {e}")
-    connection.rollback()
-    logging.warning("Database transaction rolled back due to error.")
-    raise
-  finally:
-    logging.info("Database transaction context exited.")
+  with db_client.connection() as connection:
+    try:
+      logging.info("Starting database transaction.")
+      yield connection
+      connection.commit()
+      logging.info("Database transaction committed successfully.")
+    except psycopg2.Error as e:
+      logging.error(f"Error in database transaction: {e}")
+      connection.rollback()
+      logging.warning("Database transaction rolled back due to error.")
+      raise
+    finally:
+      logging.info("Database transaction context exited.")
 
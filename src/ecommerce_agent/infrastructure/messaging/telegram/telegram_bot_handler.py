@@ -1,12 +1,151 @@
+from datetime import timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 from telegram import Update, Bot
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import Application, MessageHandler, filters, ContextTypes, CommandHandler
 import asyncio
+import time
 from ecommerce_agent.config import settings 
+from ecommerce_agent.infrastructure.metrics import stage_timer, timed
 from fastapi import FastAPI
 import logging
 
 # Initializes the Telegram bot
-bot_instance = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+bot_instance = Bot(token=settings.TELEGRAM_BOT_TOKEN, base_url=settings.TELEGRAM_BASE_URL)
+
+TELEGRAM_MESSAGE_MAX_LENGTH = 4096
+ERROR_REPLY = "Sorry, something went wrong while answering. Please try again."
+
+class StreamingMessage:
+    """
+    A Telegram reply that is sent as a placeholder and then edited in place as content streams in.
+
+    Edits are throttled to one every `edit_interval` seconds to stay within Telegram's edit rate limits,
+    and text beyond Telegram's message length limit continues in a new message.
+    """
+    def __init__(self, chat_id: int, edit_interval: Optional[float] = None):
+        self.chat_id = chat_id
+        self.edit_interval = settings.TELEGRAM_STREAM_EDIT_INTERVAL if edit_interval is None else edit_interval
+        self.text = ""
+        self._message_id: Optional[int] = None
+        self._offset = 0
+        self._shown = ""
+        self._last_edit = 0.0
+        # Set once the current message is full, until the text that continues it is sent
+        self._message_full = False
+
+    @timed("telegram.send_placeholder")
+    async def start(self) -> None:
+        """
+        Sends the placeholder message.
+        """
+        message = await bot_instance.send_message(chat_id=self.chat_id, text=settings.TELEGRAM_STREAM_PLACEHOLDER)
+        self._message_id = message.message_id
+        self._last_edit = time.monotonic()
+
+    async def append(self, chunk: str) -> None:
+        """
+        Adds a chunk of content, editing the message if the throttle interval has passed.
+        """
+        self.text += chunk
+        if time.monotonic() - self._last_edit >= self.edit_interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Shows all the content received so far, opening new messages when the current one is full.
+        """
+        pending = self.text[self._offset:]
+        while True:
+            if self._message_full:
+                # Telegram rejects blank messages, so the next one is only opened once there is text to show in it
+                if not pending.strip():
+                    break
+                await self._send(pending[:TELEGRAM_MESSAGE_MAX_LENGTH])
+            if len(pending) <= TELEGRAM_MESSAGE_MAX_LENGTH:
+                if pending.strip():
+                    await self._edit(pending)
+                break
+            await self._edit(pending[:TELEGRAM_MESSAGE_MAX_LENGTH])
+            self._offset += TELEGRAM_MESSAGE_MAX_LENGTH
+            pending = pending[TELEGRAM_MESSAGE_MAX_LENGTH:]
+            self._message_full = True
+        self._last_edit = time.monotonic()
+
+    async def finish(self, fallback_text: str) -> None:
+        """
+        Shows the final content, or replaces the placeholder with fallback_text if nothing was streamed.
+        """
+        if self.text.strip():
+            await self.flush()
+        else:
+            await self._edit(fallback_text)
+
+    async def discard(self) -> None:
+        """
+        Deletes the message being streamed, e.g. when its generation was cancelled.
+        """
+        try:
+            await bot_instance.delete_message(chat_id=self.chat_id, message_id=self._message_id)
+        except Exception as e:
+            logging.warning(f"Could not delete the streamed message in chat {self.chat_id}: {e}")
+
+    async def _send(self, text: str) -> None:
+        with stage_timer("telegram.send_message"):
+            message = await self._with_retry(bot_instance.send_message, chat_id=self.chat_id, text=text)
+        self._message_id, self._shown = message.message_id, text
+        self._message_full = False
+
+    async def _edit(self, text: str) -> None:
+        if text == self._shown:
+            return
+        with stage_timer("telegram.edit_message"):
+            try:
+                await self._with_retry(bot_instance.edit_message_text, chat_id=self.chat_id, message_id=self._message_id, text=text)
+            except BadRequest as e:
+                if "message is not modified" not in str(e).lower():
+                    raise
+        self._shown = text
+
+    async def _with_retry(self, method: Callable[..., Awaitable[Any]], **kwargs: Any) -> Any:
+        """
+        Calls a Bot API method, retrying it once after the delay Telegram asks for when rate limited.
+        """
+        try:
+            return await method(**kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after
+            logging.warning(f"Telegram rate limited chat {self.chat_id}, retrying in {retry_after} s.")
+            await asyncio.sleep(retry_after)
+            return await method(**kwargs)
+
+async def send_streaming_message(chat_id: int, chunks: AsyncIterator[str], edit_interval: Optional[float] = None) -> str:
+    """
+    Sends a placeholder right away and progressively edits it with the streamed chunks,
+    so the user sees the answer from the first chunk instead of waiting for the whole of it.
+
+    Args:
+        chat_id (int): The Telegram chat to reply to.
+        chunks (AsyncIterator[str]): The streamed content, e.g. from get_streaming_response.
+        edit_interval (Optional[float]): Minimum seconds between edits. Defaults to settings.TELEGRAM_STREAM_EDIT_INTERVAL.
+
+    Returns:
+        str: The full text sent.
+    """
+    message = StreamingMessage(chat_id, edit_interval=edit_interval)
+    await message.start()
+    try:
+        async for chunk in chunks:
+            await message.append(chunk)
+    except asyncio.CancelledError:
+        # Superseded by a newer message: remove the partial answer, the new turn will send its own
+        await message.discard()
+        raise
+    except Exception:
+        await message.finish(ERROR_REPLY)
+        raise
+    await message.finish("Sorry, I could not generate an answer. Please try again.")
+    return message.text
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -37,7 +176,7 @@ async def telegram_bot_main(app_instance: FastAPI) -> None:
     Args:
         app_instance (FastAPI): The FastAPI application instance to which the webhook will be linked.
     """
-    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).base_url(settings.TELEGRAM_BASE_URL).build()
 
     # Build the webhook URL using the configuration
     webhook_url = f"{settings.WEBHOOK_URL}/telegram_webhook/{settings.TELEGRAM_BOT_TOKEN}"
@@ -59,7 +198,7 @@ def run_polling_bot() -> None:
     Runs the Telegram bot in polling mode for local testing.
     This function will check for new messages periodically.
     """
-    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).base_url(settings.TELEGRAM_BASE_URL).build()
 
     # Add handlers for commands and text messages
     application.add_handler(CommandHandler("start", start_command))
@@ -0,0 +1,273 @@
+from collections import OrderedDict, deque
+from contextvars import ContextVar, copy_context
+from typing import Any, Awaitable, Callable, Hashable, Optional
+import asyncio
+import logging
+from ecommerce_agent.config import settings
+
+UpdateHandler = Callable[[list[dict[str, Any]]], Awaitable[None]]
+
+class _Turn:
+    """
+    What the worker and the handler of one turn share, through the turn's context.
+    """
+    def __init__(self, restart_point: Any = None):
+        self.started = asyncio.Event()
+        # Recorded by the handler when it starts, to rerun the turn if it is cancelled afterwards
+        self.restart_point: Any = None
+        # Recorded by a cancelled run of this turn, to undo what it saved
+        self.rerun_restart_point = restart_point
+
+# Set by the worker in the context of each turn
+_current_turn: ContextVar[Optional[_Turn]] = ContextVar("current_turn", default=None)
+
+def mark_turn_started(restart_point: Any = None) -> None:
+    """
+    Marks the current turn as started, called by the handler right before it runs the graph.
+
+    From then on the turn saves the user message (and possibly tool calls) to the conversation memory.
+    Without a restart point it is no longer cancelled by newer updates, since retrying it would save those messages again.
+    With one, e.g. the conversation checkpoint the turn starts from, newer updates can still cancel it: the rerun gets the
+    restart point back from `get_restart_point`, to start again from there and leave out what the cancelled run saved.
+    Does nothing outside a dispatcher turn.
+
+    Args:
+        restart_point (Any): What the handler needs to undo the saves of this turn, None if they cannot be undone.
+    """
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.restart_point = restart_point
+        turn.started.set()
+
+def get_restart_point() -> Any:
+    """
+    Returns the restart point recorded by an earlier run of the current turn that was cancelled after it started,
+    or None if no run of it started saving yet.
+    """
+    turn = _current_turn.get()
+    return turn.rerun_restart_point if turn is not None else None
+
+class TelegramUpdateDispatcher:
+    """
+    Processes Telegram updates in the background so the webhook can acknowledge them immediately.
+
+    Updates are deduplicated by `update_id` (Telegram redelivers updates it considers unanswered),
+    then queued per chat. A bounded pool of workers processes different chats in parallel,
+    while the updates of a single chat are always processed one at a time, in arrival order.
+
+    Bursts are coalesced: a chat only becomes ready once no new update arrived for the debounce window,
+    and all its pending updates are handed to the handler together as one turn. An update arriving while
+    the chat's previous turn is still waiting to start (see `mark_turn_started`) cancels that turn, which is then retried
+    merged with the new update. A turn that has started is only cancelled if it recorded a restart point, and at most
+    `max_superseded` times in a row; otherwise newer updates wait for it and form the next turn.
+    """
+    def __init__(
+        self,
+        handler: UpdateHandler,
+        max_concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        dedupe_size: Optional[int] = None,
+        debounce_ms: Optional[int] = None,
+        cancel_superseded: Optional[bool] = None,
+        max_superseded: Optional[int] = None
+    ):
+        """
+        Args:
+            handler (UpdateHandler): Coroutine function that processes the updates of one chat turn, oldest first.
+            max_concurrency (Optional[int]): Number of updates processed at the same time. Defaults to settings.TELEGRAM_WORKERS.
+            queue_size (Optional[int]): Maximum number of pending updates across all chats. Defaults to settings.TELEGRAM_QUEUE_SIZE.
+            dedupe_size (Optional[int]): Number of recent update ids remembered for deduplication. Defaults to settings.TELEGRAM_DEDUPE_SIZE.
+            debounce_ms (Optional[int]): Quiet time after a chat's last update before its turn starts, 0 to disable.
+                Defaults to settings.TELEGRAM_DEBOUNCE_MS.
+            cancel_superseded (Optional[bool]): Whether a new update cancels the chat's turn while it has not started.
+                Defaults to settings.TELEGRAM_CANCEL_SUPERSEDED.
+            max_superseded (Optional[int]): Consecutive cancellations of a chat's turn before newer updates wait for it.
+                Defaults to settings.TELEGRAM_MAX_SUPERSEDED.
+        """
+        self.handler = handler
+        self.max_concurrency = max(1, max_concurrency or settings.TELEGRAM_WORKERS)
+        self.queue_size = queue_size or settings.TELEGRAM_QUEUE_SIZE
+        self.dedupe_size = dedupe_size or settings.TELEGRAM_DEDUPE_SIZE
+        self.debounce_seconds = (settings.TELEGRAM_DEBOUNCE_MS if debounce_ms is None else debounce_ms) / 1000
+        self.cancel_superseded = settings.TELEGRAM_CANCEL_SUPERSEDED if cancel_superseded is None else cancel_superseded
+        self.max_superseded = settings.TELEGRAM_MAX_SUPERSEDED if max_superseded is None else max_superseded
+        self._seen_update_ids: OrderedDict[int, None] = OrderedDict()
+        self._chat_queues: dict[Hashable, deque[dict[str, Any]]] = {}
+        # Holds each chat with pending updates at most once, which is what keeps a chat's updates sequential
+        self._ready_chats: asyncio.Queue[Hashable] = asyncio.Queue()
+        self._debounce_timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self._running_turns: dict[Hashable, tuple[asyncio.Task, _Turn]] = {}
+        # Per chat: consecutive cancelled turns, and the restart point of the cancelled run to rerun from
+        self._superseded_streaks: dict[Hashable, int] = {}
+        self._restart_points: dict[Hashable, Any] = {}
+        self._workers: list[asyncio.Task] = []
+        self._pending = 0
+        self._in_flight = 0
+        self._counters = {
+            "received": 0, "duplicates": 0, "rejected": 0, "processed": 0, "failed": 0,
+            "turns": 0, "superseded": 0, "restarted": 0
+        }
+        self._max_queue_depth = 0
+
+    def start(self) -> None:
+        """
+        Starts the worker pool. Must be called from within the running event loop.
+        """
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"telegram-worker-{index}")
+            for index in range(self.max_concurrency)
+        ]
+        logging.info(f"Telegram update dispatcher started with {self.max_concurrency} workers and a queue of {self.queue_size}.")
+
+    async def stop(self) -> None:
+        """
+        Cancels the workers. Updates still queued are dropped; Telegram will redeliver the ones it did not see acknowledged.
+        """
+        for timer in self._debounce_timers.values():
+            timer.cancel()
+        self._debounce_timers.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logging.info(f"Telegram update dispatcher stopped with {self._pending} updates pending.")
+
+    def submit(self, update: dict[str, Any]) -> str:
+        """
+        Enqueues an update for background processing.
+
+        Args:
+            update (dict[str, Any]): The Telegram update.
+
+        Returns:
+            str: "queued", "duplicate" if the update id was already accepted, or "rejected" if the queue is full.
+        """
+        self._counters["received"] += 1
+        update_id = update.get("update_id")
+        if update_id is not None and update_id in self._seen_update_ids:
+            self._counters["duplicates"] += 1
+            logging.info(f"Ignoring duplicate Telegram update {update_id}.")
+            return "duplicate"
+        if self._pending >= self.queue_size:
+            # Not marked as seen, so the redelivery Telegram makes after an error is accepted once there is room
+            self._counters["rejected"] += 1
+            logging.warning(f"Telegram update queue is full ({self._pending} pending), rejecting update {update_id}.")
+            return "rejected"
+        if update_id is not None:
+            self._seen_update_ids[update_id] = None
+            while len(self._seen_update_ids) > self.dedupe_size:
+                self._seen_update_ids.popitem(last=False)
+
+        chat_id = self._get_chat_id(update)
+        chat_queue = self._chat_queues.get(chat_id)
+        if chat_queue is None:
+            self._chat_queues[chat_id] = deque([update])
+            self._schedule(chat_id)
+        else:
+            chat_queue.append(update)
+            running_turn = self._running_turns.get(chat_id)
+            if running_turn is not None:
+                task, turn = running_turn
+                if self._can_supersede(chat_id, task, turn):
+                    logging.info(f"New Telegram update for chat {chat_id}, cancelling its turn to merge them.")
+                    task.cancel()
+            elif chat_id in self._debounce_timers:
+                self._schedule(chat_id)
+        self._pending += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._pending)
+        return "queued"
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Returns the queue depth and the processing counters.
+        """
+        return {
+            "workers": self.max_concurrency,
+            "queue_size": self.queue_size,
+            "queue_depth": self._pending,
+            "max_queue_depth": self._max_queue_depth,
+            "in_flight": self._in_flight,
+            "chats_pending": len(self._chat_queues),
+            "chats_debouncing": len(self._debounce_timers),
+            **self._counters
+        }
+
+    @staticmethod
+    def _get_chat_id(update: dict[str, Any]) -> Hashable:
+        message = update.get("message") or update.get("edited_message") or {}
+        return message.get("chat", {}).get("id", update.get("update_id"))
+
+    def _can_supersede(self, chat_id: Hashable, task: asyncio.Task, turn: _Turn) -> bool:
+        if not self.cancel_superseded or task.done():
+            return False
+        if self._superseded_streaks.get(chat_id, 0) >= self.max_superseded:
+            return False
+        return not turn.started.is_set() or turn.restart_point is not None
+
+    def _schedule(self, chat_id: Hashable) -> None:
+        """
+        Marks a chat as ready once the debounce window passes without new updates, restarting the window if it is already waiting.
+        """
+        if not self.debounce_seconds:
+            self._ready_chats.put_nowait(chat_id)
+            return
+        timer = self._debounce_timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._debounce_timers[chat_id] = asyncio.get_running_loop().call_later(
+            self.debounce_seconds, self._mark_ready, chat_id
+        )
+
+    def _mark_ready(self, chat_id: Hashable) -> None:
+        del self._debounce_timers[chat_id]
+        self._ready_chats.put_nowait(chat_id)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            chat_id = await self._ready_chats.get()
+            chat_queue = self._chat_queues[chat_id]
+            updates = list(chat_queue)
+            chat_queue.clear()
+            self._pending -= len(updates)
+            self._in_flight += 1
+            turn = _Turn(self._restart_points.pop(chat_id, None))
+            context = copy_context()
+            context.run(_current_turn.set, turn)
+            task = asyncio.create_task(self.handler(updates), context=context)
+            self._running_turns[chat_id] = (task, turn)
+            try:
+                # wait() instead of awaiting the turn, so cancelling the turn does not cancel the worker
+                await asyncio.wait({task})
+                if task.cancelled():
+                    # Superseded by a newer update: retry these updates merged with the ones that arrived since
+                    self._counters["superseded"] += 1
+                    self._superseded_streaks[chat_id] = self._superseded_streaks.get(chat_id, 0) + 1
+                    if turn.started.is_set():
+                        # The cancelled run saved to the conversation memory, the rerun starts again from before it
+                        self._counters["restarted"] += 1
+                        self._restart_points[chat_id] = turn.restart_point
+                    elif turn.rerun_restart_point is not None:
+                        self._restart_points[chat_id] = turn.rerun_restart_point
+                    chat_queue.extendleft(reversed(updates))
+                    self._pending += len(updates)
+                else:
+                    self._superseded_streaks.pop(chat_id, None)
+                    if task.exception() is not None:
+                        self._counters["failed"] += len(updates)
+                        logging.error(f"Error processing Telegram updates {[update.get('update_id') for update in updates]} for chat {chat_id}: {task.exception()}")
+                    else:
+                        self._counters["processed"] += len(updates)
+                        self._counters["turns"] += 1
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._in_flight -= 1
+                del self._running_turns[chat_id]
+                # Hand the chat back to the pool only once this turn is done, preserving its order
+                if chat_queue:
+                    self._schedule(chat_id)
+                else:
+                    del self._chat_queues[chat_id]
@@ -0,0 +1,206 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional, TypeVar
+import asyncio
+import math
+import threading
+import time
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Latency buckets in seconds, from a cached query to a slow LLM answer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+def _escape_label_value(value: str) -> str:
+  return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+  pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+  if extra:
+    pairs.append(extra)
+  return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+  return "+Inf" if math.isinf(value) else repr(float(value))
+
+class Counter:
+  """
+  A Prometheus counter with labels.
+  """
+  def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+    self.name = name
+    self.documentation = documentation
+    self.label_names = label_names
+    self._values: dict[tuple[str, ...], float] = {}
+    self._lock = threading.Lock()
+
+  def inc(self, amount: float = 1.0, **labels: str) -> None:
+    key = tuple(str(labels[name]) for name in self.label_names)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0.0) + amount
+
+  def render(self) -> list[str]:
+    lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+    with self._lock:
+      values = list(self._values.items())
+    for key, value in values:
+      lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+    return lines
+
+class Histogram:
+  """
+  A Prometheus histogram with labels. Observing costs a bisect and three increments under a lock.
+  """
+  def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+    self.name = name
+    self.documentation = documentation
+    self.label_names = label_names
+    self.buckets = buckets
+    # Per label set: [count per bucket (not cumulative)], sum, count
+    self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+    self._lock = threading.Lock()
+
+  def observe(self, seconds: float, **labels: str) -> None:
+    key = tuple(str(labels[name]) for name in self.label_names)
+    index = bisect_left(self.buckets, seconds)
+    with self._lock:
+      series = self._series.get(key)
+      if series is None:
+        series = self._series[key] = ([0] * len(self.buckets), [0.0, 0])
+      series[0][index] += 1
+      series[1][0] += seconds
+      series[1][1] += 1
+
+  def render(self) -> list[str]:
+    lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+    with self._lock:
+      series = [(key, list(counts), list(totals)) for key, (counts, totals) in self._series.items()]
+    for key, counts, (total, count) in series:
+      cumulative = 0
+      for bound, bucket_count in zip(self.buckets, counts):
+        cumulative += bucket_count
+        labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+        lines.append(f"{self.name}_bucket{labels} {cumulative}")
+      lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+      lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+    return lines
+
+class MetricsRegistry:
+  """
+  Holds the process metrics and renders them in the Prometheus text exposition format,
+  so they can be scraped from the API without an external collector or client library.
+  """
+  def __init__(self):
+    self._metrics: list[Any] = []
+
+  def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+    metric = Counter(name, documentation, label_names)
+    self._metrics.append(metric)
+    return metric
+
+  def histogram(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, documentation, label_names, buckets)
+    self._metrics.append(metric)
+    return metric
+
+  def render(self) -> str:
+    """
+    Returns every metric in the Prometheus text format (version 0.0.4).
+    """
+    lines: list[str] = []
+    for metric in self._metrics:
+      lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+stage_duration = registry.histogram(
+  "ecommerce_agent_stage_duration_seconds",
+  "Latency of each processing stage (embedding, database query, retrieval, graph node, Telegram delivery).",
+  ("stage",)
+)
+stage_errors = registry.counter(
+  "ecommerce_agent_stage_errors_total",
+  "Processing stages that raised an exception.",
+  ("stage",)
+)
+http_request_duration = registry.histogram(
+  "ecommerce_agent_http_request_duration_seconds",
+  "Latency of the API routes, until the whole response (including streamed bodies) is sent.",
+  ("route", "method", "status")
+)
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+  """
+  Records the latency of the wrapped block as the given stage, and counts it as an error if it raises.
+  Cancellations are recorded as latency only.
+
+  Args:
+    stage (str): The stage name, e.g. "db.execute_query".
+  """
+  start = time.perf_counter()
+  try:
+    yield
+  except Exception:
+    stage_errors.inc(stage=stage)
+    raise
+  finally:
+    stage_duration.observe(time.perf_counter() - start, stage=stage)
+
+def timed(stage: Optional[str] = None) -> Callable[[F], F]:
+  """
+  Decorator that records each call of a function or coroutine function as a stage.
+
+  Args:
+    stage (Optional[str]): The stage name. Defaults to the function's qualified name.
+  """
+  def decorator(function: F) -> F:
+    name = stage or function.__qualname__
+    if asyncio.iscoroutinefunction(function):
+      @wraps(function)
+      async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+        with stage_timer(name):
+          return await function(*args, **kwargs)
+      return async_wrapper
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+      with stage_timer(name):
+        return function(*args, **kwargs)
+    return wrapper
+  return decorator
+
+class RouteMetricsMiddleware:
+  """
+  ASGI middleware recording the latency of every HTTP request by route, method and status code.
+
+  Routes are labelled with the name of their endpoint function rather than their path, which keeps the label set
+  bounded and keeps path secrets (like the Telegram webhook token) out of the metrics.
+  """
+  def __init__(self, app: Callable[..., Any]):
+    self.app = app
+
+  async def __call__(self, scope: dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    start = time.perf_counter()
+    status = "500"
+
+    async def send_with_status(message: dict[str, Any]) -> None:
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = str(message["status"])
+      await send(message)
+
+    try:
+      await self.app(scope, receive, send_with_status)
+    finally:
+      endpoint = scope.get("endpoint")
+      http_request_duration.observe(
+        time.perf_counter() - start,
+        route=getattr(endpoint, "__name__", "unmatched"),
+        method=scope["method"],
+        status=status
+      )
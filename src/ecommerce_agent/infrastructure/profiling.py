@@ -0,0 +1,260 @@
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+import cProfile
+import hmac
+import io
+import logging
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+from ecommerce_agent.config import settings
+
+class RequestProfile:
+  """
+  The function-level profile of one request: a cProfile profile of the event loop thread while the request
+  runs, plus one per piece of work the request hands to a thread (tools, retrievers, checkpointer calls).
+  """
+  def __init__(self, label: str):
+    self.id = uuid.uuid4().hex
+    self.label = label
+    self.started_at = time.time()
+    self.duration: Optional[float] = None
+    self.stats: Optional[pstats.Stats] = None
+    self._loop_profile = cProfile.Profile()
+    self._thread_profiles: list[cProfile.Profile] = []
+    self._lock = threading.Lock()
+    self._finished = False
+
+  def run_in_thread(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs fn in the calling worker thread under a profile of its own, kept for the request's report.
+    """
+    profile = cProfile.Profile()
+    try:
+      profile.enable()
+    except ValueError:
+      # Python 3.12+ allows a single active profiler per process, and the event loop profile
+      # already records the calls of every thread
+      return fn(*args, **kwargs)
+    try:
+      return fn(*args, **kwargs)
+    finally:
+      profile.disable()
+      with self._lock:
+        # Work that outlives the request is left out of its report
+        if not self._finished:
+          self._thread_profiles.append(profile)
+
+  def _start(self) -> None:
+    self._start_time = time.perf_counter()
+    self._loop_profile.enable()
+
+  def _finish(self) -> None:
+    self._loop_profile.disable()
+    self.duration = time.perf_counter() - self._start_time
+    with self._lock:
+      self._finished = True
+      self.stats = pstats.Stats(self._loop_profile)
+      if self._thread_profiles:
+        self.stats.add(*self._thread_profiles)
+
+  def summary(self) -> dict[str, Any]:
+    return {
+      "id": self.id,
+      "label": self.label,
+      "started_at": self.started_at,
+      "duration_seconds": self.duration,
+      "thread_tasks": len(self._thread_profiles),
+    }
+
+  def text(self, sort: str = "cumulative", limit: int = 50) -> str:
+    """
+    Renders the profile as a pstats table of the `limit` first functions by `sort`.
+    """
+    buffer = io.StringIO()
+    buffer.write(
+      f"Profile {self.id} of {self.label}: {self.duration:.3f} s, "
+      f"{len(self._thread_profiles)} thread tasks merged with the event loop thread.\n"
+    )
+    self.stats.stream = buffer
+    self.stats.sort_stats(sort).print_stats(limit)
+    return buffer.getvalue()
+
+  def pstats_bytes(self) -> bytes:
+    """
+    Serializes the profile in the format of pstats.Stats.dump_stats, readable by pstats, snakeviz or gprof2dot.
+    """
+    return marshal.dumps(self.stats.stats)
+
+# The profile of the request being handled, copied into the threads it hands work to
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+class ProfilingExecutor(ThreadPoolExecutor):
+  """
+  A thread pool that profiles the work submitted while a request is being profiled.
+
+  Installed as the event loop's default executor, it covers asyncio.to_thread and LangChain's run_in_executor.
+  Both submit from the calling task, so the request's context is still current at submit time.
+  """
+  def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+    profile = current_profile.get()
+    if profile is None:
+      return super().submit(fn, *args, **kwargs)
+    return super().submit(profile.run_in_thread, fn, *args, **kwargs)
+
+class RequestProfiler:
+  """
+  Profiles single requests on demand and keeps the latest reports for download.
+
+  cProfile traces every function call on the event loop thread while a request is profiled. So only one
+  request is profiled at a time, and the work of other requests served meanwhile on the event loop
+  shows up in its report too. From Python 3.12 cProfile traces every thread of the process, so the
+  event loop profile alone covers the request's thread work, along with any other thread's.
+  """
+  def __init__(self, keep_reports: Optional[int] = None):
+    """
+    Args:
+      keep_reports (Optional[int]): Reports kept, the oldest ones are dropped first. Defaults to settings.PROFILING_KEEP_REPORTS.
+    """
+    self.keep_reports = max(1, keep_reports or settings.PROFILING_KEEP_REPORTS)
+    self._reports: OrderedDict[str, RequestProfile] = OrderedDict()
+    self._active = threading.Lock()
+
+  @contextmanager
+  def profile(self, label: str) -> Iterator[Optional[RequestProfile]]:
+    """
+    Profiles the enclosed block and the thread work it submits.
+
+    Args:
+      label (str): Describes the profiled request in the report.
+
+    Yields:
+      Optional[RequestProfile]: The profile, or None if another request is being profiled or another profiler is active.
+    """
+    if not self._active.acquire(blocking=False):
+      logging.warning(f"Not profiling {label}: another request is being profiled.")
+      yield None
+      return
+    profile = RequestProfile(label)
+    try:
+      profile._start()
+    except ValueError as e:
+      # Python 3.12+: another profiler (e.g. one attached to the process) is already active
+      self._active.release()
+      logging.warning(f"Not profiling {label}: {e}")
+      yield None
+      return
+    token = current_profile.set(profile)
+    try:
+      yield profile
+    finally:
+      profile._finish()
+      current_profile.reset(token)
+      self._reports[profile.id] = profile
+      while len(self._reports) > self.keep_reports:
+        self._reports.popitem(last=False)
+      self._active.release()
+      logging.info(f"Profiled {label} in {profile.duration:.3f} s, report {profile.id}.")
+
+  def get(self, profile_id: str) -> Optional[RequestProfile]:
+    return self._reports.get(profile_id)
+
+  def reports(self) -> list[dict[str, Any]]:
+    return [profile.summary() for profile in reversed(self._reports.values())]
+
+def profiling_enabled() -> bool:
+  """
+  Tells whether profiling is on: it needs PROFILING_ENABLED and a PROFILING_TOKEN.
+  """
+  return settings.PROFILING_ENABLED and bool(settings.PROFILING_TOKEN)
+
+def is_authorized(token: Optional[str]) -> bool:
+  """
+  Checks a profiling token against PROFILING_TOKEN in constant time.
+  """
+  return profiling_enabled() and token is not None and hmac.compare_digest(token.encode(), settings.PROFILING_TOKEN.encode())
+
+def _frame_label(code: Any) -> str:
+  filename = code.co_filename.replace("\\", "/")
+  for marker in ("/site-packages/", "/src/", "/lib/"):
+    if marker in filename:
+      filename = filename.split(marker, 1)[1]
+      break
+  return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+_sampling = threading.Lock()
+
+class SamplingBusy(Exception):
+  """
+  Raised when a process sample is requested while another one is running.
+  """
+
+def sample_process(seconds: float, interval: float) -> Counter:
+  """
+  Samples the stack of every thread of the process at a fixed interval. The samples are wall-clock,
+  so threads waiting on I/O or for work show up as well.
+
+  Args:
+    seconds (float): How long to sample, capped at settings.PROFILING_MAX_SECONDS.
+    interval (float): Seconds between samples.
+
+  Returns:
+    Counter: Sample counts per collapsed stack, "thread;outermost frame;...;innermost frame".
+
+  Raises:
+    SamplingBusy: If another sample is running.
+  """
+  if not _sampling.acquire(blocking=False):
+    raise SamplingBusy("Another process sample is running.")
+  try:
+    own_thread = threading.get_ident()
+    samples: Counter = Counter()
+    deadline = time.monotonic() + min(seconds, settings.PROFILING_MAX_SECONDS)
+    while time.monotonic() < deadline:
+      names = {thread.ident: thread.name for thread in threading.enumerate()}
+      for ident, frame in sys._current_frames().items():
+        if ident == own_thread:
+          continue
+        stack = []
+        while frame is not None:
+          stack.append(_frame_label(frame.f_code))
+          frame = frame.f_back
+        stack.append(names.get(ident, f"thread-{ident}"))
+        samples[";".join(reversed(stack))] += 1
+      time.sleep(interval)
+    return samples
+  finally:
+    _sampling.release()
+
+def collapsed_stacks(samples: Counter) -> str:
+  """
+  Renders samples in the collapsed format read by flamegraph.pl, speedscope and inferno.
+  """
+  return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+def sample_summary(samples: Counter, limit: int = 50) -> str:
+  """
+  Renders the functions seen most often in the samples, on top of the stack (self) and anywhere in it (total).
+  """
+  total = sum(samples.values())
+  own, anywhere = Counter(), Counter()
+  for stack, count in samples.items():
+    frames = stack.split(";")[1:]
+    if frames:
+      own[frames[-1]] += count
+    for frame in set(frames):
+      anywhere[frame] += count
+  lines = [f"{total} stack samples."]
+  for title, counts in (("Self", own), ("Total", anywhere)):
+    lines.append(f"\n{title} samples:")
+    lines.extend(f"{count:8d} {100 * count / total:6.1f}%  {frame}" for frame, count in counts.most_common(limit))
+  return "\n".join(lines) + "\n"
+
+# Global request profiler instance
+request_profiler = RequestProfiler()
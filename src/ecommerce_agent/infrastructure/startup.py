@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+import logging
+import time
+
+class StartupMonitor:
+  """
+  Tracks the application startup: how long each import and initialization phase took,
+  and whether the warmup finished, so readiness can be reported separately from liveness.
+  """
+  def __init__(self):
+    self._start = time.perf_counter()
+    self._phases: list[tuple[str, float]] = []
+    self._ready = False
+    self._failed = False
+    self._error: Optional[str] = None
+    self._attempts = 0
+
+  @contextmanager
+  def phase(self, name: str) -> Iterator[None]:
+    """
+    Times a startup phase. Can wrap awaited code as well.
+
+    Args:
+      name (str): The phase name shown in the breakdown.
+    """
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.record(name, start)
+
+  def record(self, name: str, start: float) -> None:
+    """
+    Records a phase that started at the given time.perf_counter() value and ends now.
+    """
+    self._phases.append((name, time.perf_counter() - start))
+
+  @property
+  def started_at(self) -> float:
+    """
+    The time.perf_counter() value when this module was imported, i.e. when the application started importing.
+    """
+    return self._start
+
+  def mark_ready(self) -> None:
+    """
+    Marks the warmup as finished and logs the startup breakdown.
+    """
+    self._ready = True
+    self._error = None
+    self._attempts += 1
+    self.log_breakdown()
+
+  def mark_retrying(self, error: BaseException) -> None:
+    """
+    Records a failed warmup attempt that will be retried, keeping the application not ready.
+    """
+    self._error = f"{type(error).__name__}: {error}"
+    self._attempts += 1
+
+  def mark_failed(self, error: BaseException) -> None:
+    """
+    Marks the warmup as given up, keeping the application not ready, and logs the startup breakdown.
+    """
+    self.mark_retrying(error)
+    self._failed = True
+    self.log_breakdown()
+
+  @property
+  def ready(self) -> bool:
+    return self._ready
+
+  @property
+  def failed(self) -> bool:
+    """
+    Whether the warmup gave up, so the process will never become ready.
+    """
+    return self._failed
+
+  def log_breakdown(self) -> None:
+    """
+    Logs how long each startup phase took, and the total since the process started importing the application.
+    """
+    width = max((len(name) for name, _ in self._phases), default=0)
+    lines = [f"  {name.ljust(width)}  {seconds * 1000:9.1f} ms" for name, seconds in self._phases]
+    lines.append(f"  {'total'.ljust(width)}  {(time.perf_counter() - self._start) * 1000:9.1f} ms")
+    logging.info("Startup timing breakdown:\n" + "\n".join(lines))
+
+  def status(self) -> dict[str, Any]:
+    """
+    Returns the readiness state and the duration of each startup phase.
+    """
+    return {
+      "ready": self._ready,
+      "error": self._error,
+      "attempts": self._attempts,
+      "uptime_seconds": time.perf_counter() - self._start,
+      "phases_ms": {name: seconds * 1000 for name, seconds in self._phases}
+    }
+
+startup_monitor = StartupMonitor()
@@ -0,0 +1,122 @@
+from typing import TYPE_CHECKING, Any, Optional
+from ecommerce_agent.config import settings
+import logging
+import os
+import random
+import threading
+
+if TYPE_CHECKING:
+  from langchain_core.callbacks import BaseCallbackHandler
+
+class Tracer:
+  """
+  Lazy and sampled Langfuse tracing.
+
+  Nothing is imported or contacted until the first sampled request: the Langfuse client is then created
+  (and its credentials checked) on a background thread, and requests sampled meanwhile are not traced.
+  Once it is ready, the Langfuse LangChain handler is attached to the sampled requests as is, so each span is
+  stamped when its event happens. The Langfuse SDK exports the finished spans in background batches, from a queue
+  of settings.TRACING_BUFFER_SIZE spans that drops whole spans rather than slowing requests down.
+  Each route is sampled at its own rate, and when tracing is disabled no callbacks are attached at all.
+  """
+  def __init__(
+    self,
+    enabled: Optional[bool] = None,
+    sample_rate: Optional[float] = None,
+    route_sample_rates: Optional[dict[str, float]] = None,
+    buffer_size: Optional[int] = None
+  ):
+    """
+    Args:
+      enabled (Optional[bool]): Whether to trace at all. Defaults to settings.TRACING_ENABLED; never traces without Langfuse keys.
+      sample_rate (Optional[float]): Share of requests traced on routes without their own rate. Defaults to settings.TRACING_SAMPLE_RATE.
+      route_sample_rates (Optional[dict[str, float]]): Sample rate per route. Defaults to settings.TRACING_ROUTE_SAMPLE_RATES.
+      buffer_size (Optional[int]): Maximum number of spans waiting for export. Defaults to settings.TRACING_BUFFER_SIZE.
+    """
+    self.enabled = (settings.TRACING_ENABLED if enabled is None else enabled) and bool(settings.LANGFUSE_PUBLIC_KEY)
+    self.sample_rate = settings.TRACING_SAMPLE_RATE if sample_rate is None else sample_rate
+    self.route_sample_rates = settings.TRACING_ROUTE_SAMPLE_RATES if route_sample_rates is None else route_sample_rates
+    self.buffer_size = max(1, buffer_size or settings.TRACING_BUFFER_SIZE)
+    self._client: Optional[Any] = None
+    self._handler: Optional["BaseCallbackHandler"] = None
+    self._state = "idle"
+    self._init_lock = threading.Lock()
+    self._counters = {"sampled": 0, "sampled_out": 0, "not_ready": 0}
+
+  def get_callbacks(self, route: str) -> list["BaseCallbackHandler"]:
+    """
+    Returns the callbacks to attach to a request on the given route: the Langfuse handler if the request is sampled
+    and the client is ready, nothing otherwise.
+
+    Args:
+      route (str): The route name, e.g. "chat", "chat_stream" or "telegram".
+
+    Returns:
+      list[BaseCallbackHandler]: The callbacks for the graph run.
+    """
+    if not self.enabled:
+      return []
+    if random.random() >= self.route_sample_rates.get(route, self.sample_rate):
+      self._counters["sampled_out"] += 1
+      return []
+    if self._handler is None:
+      self._start_client()
+      self._counters["not_ready"] += 1
+      return []
+    self._counters["sampled"] += 1
+    return [self._handler]
+
+  def shutdown(self, timeout: float = 5.0) -> None:
+    """
+    Exports the spans still queued by the Langfuse client, waiting at most timeout seconds.
+    """
+    if self._client is None:
+      return
+    flusher = threading.Thread(target=self._client.flush, name="tracing-flush", daemon=True)
+    flusher.start()
+    flusher.join(timeout)
+    if flusher.is_alive():
+      logging.warning("Langfuse did not finish exporting at shutdown, the queued spans are lost.")
+
+  def metrics(self) -> dict[str, Any]:
+    """
+    Returns the sampling counters and the state of the Langfuse client.
+    """
+    return {**self._counters, "enabled": self.enabled, "client": self._state, "buffer_size": self.buffer_size}
+
+  def _start_client(self) -> None:
+    with self._init_lock:
+      if self._state != "idle":
+        return
+      self._state = "initializing"
+    threading.Thread(target=self._init_client, name="tracing-init", daemon=True).start()
+
+  def _init_client(self) -> None:
+    """
+    Background thread: creates the Langfuse client and its LangChain handler.
+    If Langfuse cannot be set up, requests keep running without tracing.
+    """
+    try:
+      # Langfuse exports through an OpenTelemetry batch span processor, whose queue is only sized by this variable
+      os.environ.setdefault("OTEL_BSP_MAX_QUEUE_SIZE", str(self.buffer_size))
+      from langfuse import Langfuse
+      from langfuse.langchain import CallbackHandler
+      client = Langfuse(
+        public_key=settings.LANGFUSE_PUBLIC_KEY,
+        secret_key=settings.LANGFUSE_SECRET_KEY,
+        host=settings.LANGFUSE_HOST,
+        # A batch cannot be larger than the queue
+        flush_at=min(512, self.buffer_size)
+      )
+      if client.auth_check():
+        logging.info("Langfuse client is authenticated and ready!")
+      else:
+        logging.error("Langfuse authentication failed. Please check your credentials and host.")
+      self._client = client
+      self._handler = CallbackHandler(public_key=settings.LANGFUSE_PUBLIC_KEY)
+      self._state = "ready"
+    except Exception as e:
+      logging.error(f"Could not initialize Langfuse tracing, requests will not be traced: {e}")
+      self._state = "failed"
+
+tracer = Tracer()
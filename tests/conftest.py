@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# The settings require these, the tests never reach the services behind them
+for name in ("GROQ_API_KEY", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB", "POSTGRES_HOST", "TELEGRAM_BOT_TOKEN"):
+  os.environ.setdefault(name, "test")
+os.environ.setdefault("WEBHOOK_URL", "http://localhost")
@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any, AsyncIterator, Optional
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.language_models import BaseChatModel
+from ecommerce_agent.application.services.conversation_service.workflow import hedged_llm
+from ecommerce_agent.application.services.conversation_service.workflow.hedged_llm import HedgedChatModel, LLMLatencyTracker
+
+MESSAGES = [HumanMessage(content="hi")]
+
+class FakeChatModel(BaseChatModel):
+  """
+  Answers with its own name after a delay, or fails with the given error.
+  Its streams record whether they were closed.
+  """
+  model_name: str
+  delay: float = 0.0
+  error: Optional[str] = None
+  calls: int = 0
+  closed_streams: int = 0
+
+  @property
+  def _llm_type(self) -> str:
+    return "fake-chat"
+
+  def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+    raise NotImplementedError
+
+  async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+    self.calls += 1
+    await asyncio.sleep(self.delay)
+    if self.error:
+      raise RuntimeError(self.error)
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.model_name))])
+
+  async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+    self.calls += 1
+    try:
+      await asyncio.sleep(self.delay)
+      if self.error:
+        raise RuntimeError(self.error)
+      for token in (self.model_name, " done"):
+        yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+    finally:
+      self.closed_streams += 1
+
+@pytest.fixture(autouse=True)
+def fresh_tracker(monkeypatch):
+  tracker = LLMLatencyTracker()
+  monkeypatch.setattr(hedged_llm, "llm_latency_tracker", tracker)
+  monkeypatch.setattr(hedged_llm.settings, "LLM_HEDGE_MIN_DELAY", 0.05)
+  return tracker
+
+def make_model(primary: FakeChatModel, secondary: FakeChatModel) -> HedgedChatModel:
+  return HedgedChatModel(primary=primary, secondary=secondary, request_timeout=5.0)
+
+def test_hedge_fires_after_delay_and_wins(fresh_tracker):
+  primary = FakeChatModel(model_name="primary", delay=1.0)
+  secondary = FakeChatModel(model_name="secondary")
+  result = asyncio.run(make_model(primary, secondary)._agenerate(MESSAGES))
+  assert result.generations[0].message.content == "secondary"
+  metrics = fresh_tracker.metrics()
+  assert metrics["hedges"] == 1
+  assert metrics["hedge_wins"] == 1
+  assert metrics["failovers"] == 0
+
+def test_fast_primary_is_not_hedged(fresh_tracker):
+  primary = FakeChatModel(model_name="primary")
+  secondary = FakeChatModel(model_name="secondary")
+  result = asyncio.run(make_model(primary, secondary)._agenerate(MESSAGES))
+  assert result.generations[0].message.content == "primary"
+  assert secondary.calls == 0
+  assert fresh_tracker.metrics()["hedges"] == 0
+
+def test_primary_error_fails_over(fresh_tracker):
+  primary = FakeChatModel(model_name="primary", error="primary down")
+  secondary = FakeChatModel(model_name="secondary")
+  result = asyncio.run(make_model(primary, secondary)._agenerate(MESSAGES))
+  assert result.generations[0].message.content == "secondary"
+  metrics = fresh_tracker.metrics()
+  assert metrics["failovers"] == 1
+  assert metrics["failover_successes"] == 1
+  assert metrics["hedges"] == 0
+  assert metrics["models"]["primary"]["errors"] == 1
+
+def test_both_failing_raises_the_last_error(fresh_tracker):
+  primary = FakeChatModel(model_name="primary", error="primary down")
+  secondary = FakeChatModel(model_name="secondary", error="secondary down")
+  with pytest.raises(RuntimeError, match="secondary down"):
+    asyncio.run(make_model(primary, secondary)._agenerate(MESSAGES))
+  assert primary.calls == 1
+  assert secondary.calls == 1
+
+def test_stream_hedge_wins_and_losing_stream_is_closed(fresh_tracker):
+  primary = FakeChatModel(model_name="primary", delay=1.0)
+  secondary = FakeChatModel(model_name="secondary")
+
+  async def collect() -> list[str]:
+    return [chunk.text async for chunk in make_model(primary, secondary)._astream(MESSAGES)]
+
+  assert asyncio.run(collect()) == ["secondary", " done"]
+  assert primary.closed_streams == 1
+  assert secondary.closed_streams == 1
+  assert fresh_tracker.metrics()["hedge_wins"] == 1
@@ -0,0 +1,163 @@
+import asyncio
+from typing import Any
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+from ecommerce_agent.infrastructure.messaging.telegram.update_dispatcher import TelegramUpdateDispatcher, get_restart_point, mark_turn_started
+
+THREAD = {"configurable": {"thread_id": "telegram:1"}}
+
+def make_update(update_id: int, text: str) -> dict[str, Any]:
+  return {"update_id": update_id, "message": {"chat": {"id": 1}, "text": text}}
+
+class ChatHarness:
+  """
+  Mimics handle_telegram_updates: waits for admission, marks the turn as started and runs a one-node graph
+  whose model step waits until the test lets it answer. With restartable, the turn records the checkpoint it starts from
+  and a rerun starts again from the one recorded by the cancelled run.
+  """
+  def __init__(self, restartable: bool = False, max_superseded: int = 3):
+    self.restartable = restartable
+    self.admitted = asyncio.Event()
+    self.answer = asyncio.Event()
+    self.admission_entered = asyncio.Event()
+    self.model_entered = asyncio.Event()
+    self.checkpointer = InMemorySaver()
+    builder = StateGraph(MessagesState)
+    builder.add_node("model", self._model)
+    builder.add_edge(START, "model")
+    builder.add_edge("model", END)
+    self.graph = builder.compile(checkpointer=self.checkpointer)
+    self.dispatcher = TelegramUpdateDispatcher(self.handle, max_concurrency=1, queue_size=10, dedupe_size=10, debounce_ms=0, cancel_superseded=True, max_superseded=max_superseded)
+
+  async def _model(self, state: MessagesState) -> dict:
+    self.model_entered.set()
+    await self.answer.wait()
+    return {"messages": [AIMessage(content=f"answer to {state['messages'][-1].content}")]}
+
+  async def handle(self, updates: list[dict[str, Any]]) -> None:
+    text = "\n".join(update["message"]["text"] for update in updates)
+    self.admission_entered.set()
+    await self.admitted.wait()
+    if not self.restartable:
+      mark_turn_started()
+      await self.graph.ainvoke({"messages": [HumanMessage(content=text)]}, THREAD)
+      return
+    restart_point = get_restart_point()
+    if restart_point is None:
+      checkpoint_tuple = await self.checkpointer.aget_tuple(THREAD)
+      checkpoint_id = checkpoint_tuple.checkpoint["id"] if checkpoint_tuple else None
+    else:
+      checkpoint_id = restart_point["checkpoint_id"]
+      if checkpoint_id is None:
+        await self.checkpointer.adelete_thread(THREAD["configurable"]["thread_id"])
+    mark_turn_started({"checkpoint_id": checkpoint_id})
+    config = {"configurable": {**THREAD["configurable"], **({"checkpoint_id": checkpoint_id} if checkpoint_id else {})}}
+    await self.graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+
+  async def saved_messages(self) -> list[tuple[str, str]]:
+    state = await self.graph.aget_state(THREAD)
+    return [(message.type, message.content) for message in state.values.get("messages", [])]
+
+async def wait_idle(dispatcher: TelegramUpdateDispatcher) -> None:
+  while dispatcher.metrics()["in_flight"] or dispatcher.metrics()["queue_depth"]:
+    await asyncio.sleep(0.01)
+
+def test_update_before_turn_starts_cancels_and_merges():
+  async def scenario():
+    harness = ChatHarness()
+    harness.dispatcher.start()
+    harness.dispatcher.submit(make_update(1, "m1"))
+    await harness.admission_entered.wait()
+    # Still waiting for admission: nothing saved yet, so the turn is retried with both messages
+    harness.dispatcher.submit(make_update(2, "m2"))
+    harness.admitted.set()
+    harness.answer.set()
+    await wait_idle(harness.dispatcher)
+    await harness.dispatcher.stop()
+    return harness
+
+  harness = asyncio.run(scenario())
+  assert asyncio.run(harness.saved_messages()) == [("human", "m1\nm2"), ("ai", "answer to m1\nm2")]
+  metrics = harness.dispatcher.metrics()
+  assert metrics["superseded"] == 1
+  assert metrics["turns"] == 1
+
+def test_update_after_turn_starts_waits_and_saves_nothing_twice():
+  async def scenario():
+    harness = ChatHarness()
+    harness.admitted.set()
+    harness.dispatcher.start()
+    harness.dispatcher.submit(make_update(1, "m1"))
+    await harness.model_entered.wait()
+    # The turn already saved m1 to the checkpointer: it must finish instead of being retried
+    harness.dispatcher.submit(make_update(2, "m2"))
+    await asyncio.sleep(0.05)
+    harness.answer.set()
+    await wait_idle(harness.dispatcher)
+    await harness.dispatcher.stop()
+    return harness
+
+  harness = asyncio.run(scenario())
+  assert asyncio.run(harness.saved_messages()) == [
+    ("human", "m1"), ("ai", "answer to m1"), ("human", "m2"), ("ai", "answer to m2")
+  ]
+  metrics = harness.dispatcher.metrics()
+  assert metrics["superseded"] == 0
+  assert metrics["turns"] == 2
+
+def test_update_after_restartable_turn_starts_reruns_from_its_checkpoint():
+  async def scenario():
+    harness = ChatHarness(restartable=True)
+    harness.admitted.set()
+    harness.dispatcher.start()
+    harness.answer.set()
+    harness.dispatcher.submit(make_update(1, "m0"))
+    await wait_idle(harness.dispatcher)
+    harness.answer.clear()
+    harness.model_entered.clear()
+    harness.dispatcher.submit(make_update(2, "m1"))
+    await harness.model_entered.wait()
+    # m1 is already saved: the turn is cancelled and rerun with both messages from the checkpoint before m1
+    harness.dispatcher.submit(make_update(3, "m2"))
+    await asyncio.sleep(0.05)
+    harness.answer.set()
+    await wait_idle(harness.dispatcher)
+    await harness.dispatcher.stop()
+    return harness
+
+  harness = asyncio.run(scenario())
+  assert asyncio.run(harness.saved_messages()) == [
+    ("human", "m0"), ("ai", "answer to m0"), ("human", "m1\nm2"), ("ai", "answer to m1\nm2")
+  ]
+  metrics = harness.dispatcher.metrics()
+  assert metrics["superseded"] == 1
+  assert metrics["restarted"] == 1
+  assert metrics["turns"] == 2
+
+def test_restartable_turn_is_cancelled_at_most_max_superseded_times():
+  async def scenario():
+    harness = ChatHarness(restartable=True, max_superseded=1)
+    harness.admitted.set()
+    harness.dispatcher.start()
+    harness.dispatcher.submit(make_update(1, "m1"))
+    await harness.model_entered.wait()
+    harness.model_entered.clear()
+    harness.dispatcher.submit(make_update(2, "m2"))
+    await harness.model_entered.wait()
+    # The rerun of a new conversation starts from scratch, and is not cancelled a second time
+    harness.dispatcher.submit(make_update(3, "m3"))
+    await asyncio.sleep(0.05)
+    harness.answer.set()
+    await wait_idle(harness.dispatcher)
+    await harness.dispatcher.stop()
+    return harness
+
+  harness = asyncio.run(scenario())
+  assert asyncio.run(harness.saved_messages()) == [
+    ("human", "m1\nm2"), ("ai", "answer to m1\nm2"), ("human", "m3"), ("ai", "answer to m3")
+  ]
+  metrics = harness.dispatcher.metrics()
+  assert metrics["superseded"] == 1
+  assert metrics["restarted"] == 1
+  assert metrics["turns"] == 2